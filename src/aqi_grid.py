@@ -0,0 +1,197 @@
+# Purpose: Spatial AQI grid — fetch many coordinates per Open-Meteo request, parse straight
+# into a (points, hours, variables) cube, compute AQI over the whole cube vectorized and
+# persist a gridded store (memory-mapped .npy + JSON header) for the dashboard heatmap.
+
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import requests
+
+try:
+    from src.config import (
+        AQ_HOURLY, WX_HOURLY, GRID_BBOX, GRID_SHAPE, GRID_BATCH_POINTS,
+        GRID_FORECAST_DAYS, GRID_PATH, air_quality_url, weather_forecast_url
+    )
+    from src.aqi_utils import compute_hourly_aqi_array
+except Exception:
+    from config import (
+        AQ_HOURLY, WX_HOURLY, GRID_BBOX, GRID_SHAPE, GRID_BATCH_POINTS,
+        GRID_FORECAST_DAYS, GRID_PATH, air_quality_url, weather_forecast_url
+    )
+    from aqi_utils import compute_hourly_aqi_array
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AQ_VARS = AQ_HOURLY.split(",")
+WX_VARS = WX_HOURLY.split(",")
+
+
+def grid_points(bbox=GRID_BBOX, shape=GRID_SHAPE):
+    """Regular lat/lon grid over bbox → (points, 2) array, row-major (lat outer)."""
+    lat_min, lat_max, lon_min, lon_max = bbox
+    lats, lons = np.meshgrid(np.linspace(lat_min, lat_max, shape[0]),
+                             np.linspace(lon_min, lon_max, shape[1]), indexing="ij")
+    return np.column_stack([lats.ravel(), lons.ravel()]).round(4)
+
+
+def parse_batch(payloads, variables):
+    """Multi-location response (list of payloads) → (n, hours, vars) float array; null → NaN."""
+    if isinstance(payloads, dict):
+        payloads = [payloads]
+    cube = np.array([[p["hourly"][v] for v in variables] for p in payloads], dtype=float)
+    return cube.transpose(0, 2, 1), pd.to_datetime(payloads[0]["hourly"]["time"])
+
+
+def _fetch_json(session, url):
+    response = session.get(url, timeout=60)
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_grid(points, forecast_days=GRID_FORECAST_DAYS, batch_points=GRID_BATCH_POINTS,
+               aq_base=None, wx_base=None, workers=4):
+    """
+    Fetch AQ + weather for all points, `batch_points` coordinates per request.
+    Returns (times, cube, variables) with cube shaped (points, hours, len(variables)).
+    """
+    batches = [points[i:i + batch_points] for i in range(0, len(points), batch_points)]
+
+    def fetch_batch(batch):
+        lat = ",".join(f"{v:g}" for v in batch[:, 0])
+        lon = ",".join(f"{v:g}" for v in batch[:, 1])
+        with requests.Session() as session:
+            aq = _fetch_json(session, air_quality_url(lat, lon, forecast_days, base=aq_base))
+            wx = _fetch_json(session, weather_forecast_url(lat, lon, forecast_days, base=wx_base))
+        aq_cube, aq_times = parse_batch(aq, AQ_VARS)
+        wx_cube, wx_times = parse_batch(wx, WX_VARS)
+        # Both APIs return the same hourly axis for the same forecast_days; align defensively
+        hours = min(len(aq_times), len(wx_times))
+        return aq_times[:hours], np.concatenate([aq_cube[:, :hours], wx_cube[:, :hours]], axis=2)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(fetch_batch, batches))
+
+    hours = min(len(t) for t, _ in results)
+    cube = np.concatenate([c[:, :hours] for _, c in results], axis=0)
+    return results[0][0][:hours], cube, AQ_VARS + WX_VARS
+
+
+def compute_grid_aqi(cube, variables):
+    """AQI for every (point, hour) in one vectorized pass over the cube."""
+    conc = {v: cube[:, :, variables.index(v)] for v in AQ_VARS}
+    return compute_hourly_aqi_array(conc).astype(np.float32)
+
+
+# =============================================================
+# 🗺️ Gridded store (atomic replace, mmap reads)
+# =============================================================
+def _grid_dir(path=None):
+    return path or os.path.join(BASE_DIR, GRID_PATH)
+
+
+def save_grid(points, times, aqi, path=None, shape=GRID_SHAPE):
+    root = _grid_dir(path)
+    os.makedirs(root, exist_ok=True)
+    meta = {
+        "issued_at": str(pd.Timestamp.now().floor("s")),
+        "shape": list(shape),
+        "points": int(len(points)),
+        "times": [str(t) for t in pd.to_datetime(times)],
+    }
+    files = {"grid_aqi.npy": aqi.astype(np.float32), "grid_points.npy": np.asarray(points, dtype=np.float64)}
+    for name, arr in files.items():
+        with open(os.path.join(root, name + ".tmp"), "wb") as f:
+            np.save(f, arr)
+    with open(os.path.join(root, "grid_meta.json.tmp"), "w") as f:
+        json.dump(meta, f)
+    # Header last: readers only see a grid once all arrays are in place
+    for name in list(files) + ["grid_meta.json"]:
+        os.replace(os.path.join(root, name + ".tmp"), os.path.join(root, name))
+    return root
+
+
+def load_grid(path=None):
+    """Return {"points", "times", "aqi" (mmap, points × hours), "meta"} or None."""
+    root = _grid_dir(path)
+    meta_path = os.path.join(root, "grid_meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return {
+        "points": np.load(os.path.join(root, "grid_points.npy")),
+        "times": pd.to_datetime(meta["times"]),
+        "aqi": np.load(os.path.join(root, "grid_aqi.npy"), mmap_mode="r"),
+        "meta": meta,
+    }
+
+
+def grid_frame(grid, hour_index=0) -> pd.DataFrame:
+    """One hour of the grid as a (lat, lon, aqi) frame for map rendering."""
+    return pd.DataFrame({
+        "lat": grid["points"][:, 0],
+        "lon": grid["points"][:, 1],
+        "aqi": np.asarray(grid["aqi"][:, hour_index], dtype=float),
+    })
+
+
+def build_grid(points=None, aq_base=None, wx_base=None, path=None):
+    """Fetch → AQI → store; returns per-step timings (seconds)."""
+    points = grid_points() if points is None else points
+    t0 = time.perf_counter()
+    times, cube, variables = fetch_grid(points, aq_base=aq_base, wx_base=wx_base)
+    t1 = time.perf_counter()
+    aqi = compute_grid_aqi(cube, variables)
+    t2 = time.perf_counter()
+    save_grid(points, times, aqi, path)
+    t3 = time.perf_counter()
+    return {"points": len(points), "hours": len(times), "fetch_parse_s": t1 - t0,
+            "aqi_s": t2 - t1, "store_s": t3 - t2, "total_s": t3 - t0}
+
+
+# --- Run standalone ---
+#   python src/aqi_grid.py          → build the grid from Open-Meteo into GRID_PATH
+#   python src/aqi_grid.py --bench  → 500 points × 72 h against the local synthetic API
+if __name__ == "__main__":
+    import sys
+    import tempfile
+
+    if "--bench" in sys.argv:
+        try:
+            from src.synthetic_api import start_synthetic_server
+        except Exception:
+            from synthetic_api import start_synthetic_server
+
+        server, aq_base, wx_base, _ = start_synthetic_server()
+        points = grid_points()
+        with tempfile.TemporaryDirectory() as tmp:
+            timings = build_grid(points, aq_base, wx_base, tmp)
+            batched_requests = server.stats["requests"]
+
+            # Baseline: one request pair per point
+            t0 = time.perf_counter()
+            for lat, lon in points[:50]:
+                with requests.Session() as session:
+                    _fetch_json(session, air_quality_url(lat, lon, GRID_FORECAST_DAYS, base=aq_base))
+                    _fetch_json(session, weather_forecast_url(lat, lon, GRID_FORECAST_DAYS, base=wx_base))
+            per_point_s = (time.perf_counter() - t0) / 50 * len(points)
+
+            grid = load_grid(tmp)
+            assert grid["aqi"].shape == (len(points), timings["hours"])
+            assert not np.isnan(grid["aqi"]).any()
+        server.shutdown()
+
+        print(f"\n🗺️ Grid: {timings['points']} points × {timings['hours']} hours")
+        print(f"  fetch + parse : {timings['fetch_parse_s']:.2f} s ({batched_requests} requests, "
+              f"{GRID_BATCH_POINTS} points each)")
+        print(f"  AQI (cube)    : {timings['aqi_s'] * 1000:.1f} ms")
+        print(f"  store         : {timings['store_s'] * 1000:.1f} ms")
+        print(f"  total         : {timings['total_s']:.2f} s")
+        print(f"  one request pair per point (extrapolated from 50): {per_point_s:.2f} s")
+        print("✅ Grid benchmark complete")
+    else:
+        timings = build_grid()
+        print(f"✅ Grid saved → {_grid_dir()} ({timings['points']} points × {timings['hours']} h "
+              f"in {timings['total_s']:.2f}s)")
@@ -1,20 +1,50 @@
 LAT = 24.8607   # Karachi latitude
 LON = 67.0011   # Karachi longitude
+LOCATION = "karachi"
+
+# Base URLs for latest fetch (overridable to point at a local stand-in API)
+import os
+AIR_QUALITY_BASE = os.getenv("AIR_QUALITY_BASE", "https://air-quality-api.open-meteo.com/v1/air-quality")
+WEATHER_FORECAST_BASE = os.getenv("WEATHER_FORECAST_BASE", "https://api.open-meteo.com/v1/forecast")
+
+AQ_HOURLY = "pm10,pm2_5,carbon_monoxide,nitrogen_dioxide,ozone,sulphur_dioxide"
+WX_HOURLY = "temperature_2m,relative_humidity_2m,wind_speed_10m,wind_direction_10m"
+# Units Open-Meteo reports for each variable (payload validation rejects anything else)
+HOURLY_UNITS = {
+    "time": "iso8601",
+    "pm10": "μg/m³", "pm2_5": "μg/m³", "carbon_monoxide": "μg/m³",
+    "nitrogen_dioxide": "μg/m³", "ozone": "μg/m³", "sulphur_dioxide": "μg/m³",
+    "temperature_2m": "°C", "relative_humidity_2m": "%",
+    "wind_speed_10m": "km/h", "wind_direction_10m": "°",
+}
+
+
+# Days of already-fetched hours re-requested on each run, so upstream revisions are seen
+INGEST_PAST_DAYS = 1
+
+
+def air_quality_url(lat, lon, forecast_days=1, base=None, past_days=0):
+    return (
+        f"{base or AIR_QUALITY_BASE}"
+        f"?latitude={lat}&longitude={lon}"
+        f"&forecast_days={forecast_days}"
+        + (f"&past_days={past_days}" if past_days else "")
+        + f"&hourly={AQ_HOURLY}"
+    )
 
-# Base URLs for latest fetch
-AIR_QUALITY_URL = (
-    "https://air-quality-api.open-meteo.com/v1/air-quality"
-    f"?latitude={LAT}&longitude={LON}"
-    f"&forecast_days=1"
-    "&hourly=pm10,pm2_5,carbon_monoxide,nitrogen_dioxide,ozone,sulphur_dioxide"
-)
-
-WEATHER_FORECAST_URL = (
-    "https://api.open-meteo.com/v1/forecast"
-    f"?latitude={LAT}&longitude={LON}"
-    "&hourly=temperature_2m,relative_humidity_2m,wind_speed_10m,wind_direction_10m"
-    "&forecast_days=1"
-)
+
+def weather_forecast_url(lat, lon, forecast_days=1, base=None, past_days=0):
+    return (
+        f"{base or WEATHER_FORECAST_BASE}"
+        f"?latitude={lat}&longitude={lon}"
+        f"&hourly={WX_HOURLY}"
+        f"&forecast_days={forecast_days}"
+        + (f"&past_days={past_days}" if past_days else "")
+    )
+
+
+AIR_QUALITY_URL = air_quality_url(LAT, LON, past_days=INGEST_PAST_DAYS)
+WEATHER_FORECAST_URL = weather_forecast_url(LAT, LON, past_days=INGEST_PAST_DAYS)
 
 # base urls for historical data
 from datetime import datetime, timedelta
@@ -37,6 +67,103 @@ weather_historic_url = (
 RAW_PATH = "data/raw/"
 PROCESSED_PATH = "data/processed"
 HIST_PATH = "data/historical"
+RAW_ARCHIVE_PATH = "data/raw_archive"
+ONLINE_STORE_PATH = "data/online/online_features.db"
+FORECAST_PATH = "data/forecasts"
+FEATURE_DATASET_PATH = "data/final/features_dataset"
 
-import os
-SAVE_LOCAL = os.getenv("SAVE_LOCAL", "false").lower() in ("1", "true", "yes")
\ No newline at end of file
+SAVE_LOCAL = os.getenv("SAVE_LOCAL", "false").lower() in ("1", "true", "yes")
+
+# AQI method: "hourly" (breakpoints on instantaneous values) or "official" (NowCast / 8h / 24h averages)
+AQI_MODE = os.getenv("AQI_MODE", "hourly").lower()
+
+# Online store keeps only the latest N hours per location
+ONLINE_STORE_HOURS = int(os.getenv("ONLINE_STORE_HOURS", "168"))
+
+# Streaming ingestion: locations polled by ingest_daemon.py → (lat, lon, poll interval seconds)
+INGEST_POLL_SECONDS = int(os.getenv("INGEST_POLL_SECONDS", "900"))
+LOCATIONS = {
+    LOCATION: (LAT, LON, INGEST_POLL_SECONDS),
+}
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "32"))
+INGEST_BATCH_ROWS = int(os.getenv("INGEST_BATCH_ROWS", "24"))
+INGEST_FLUSH_SECONDS = float(os.getenv("INGEST_FLUSH_SECONDS", "60"))
+INGEST_STATE_PATH = "data/online/ingest_state.json"
+
+# Dashboard: render from local snapshots first, refresh remote data in the background
+APP_FAST_START = os.getenv("APP_FAST_START", "true").lower() in ("1", "true", "yes")
+APP_REFRESH_SECONDS = int(os.getenv("APP_REFRESH_SECONDS", "900"))
+SNAPSHOT_POLL_SECONDS = float(os.getenv("SNAPSHOT_POLL_SECONDS", "30"))
+
+# Out-of-core training: rows per streamed chunk (bounds training memory)
+TRAIN_CHUNK_ROWS = int(os.getenv("TRAIN_CHUNK_ROWS", "50000"))
+
+# Incremental (warm-start) retraining
+INCREMENTAL_HOLDOUT_HOURS = int(os.getenv("INCREMENTAL_HOLDOUT_HOURS", "6"))
+INCREMENTAL_TOLERANCE = float(os.getenv("INCREMENTAL_TOLERANCE", "0.10"))
+WARM_RECENT_HOURS = int(os.getenv("WARM_RECENT_HOURS", "720"))
+WARM_RF_TREES = int(os.getenv("WARM_RF_TREES", "20"))
+WARM_XGB_ROUNDS = int(os.getenv("WARM_XGB_ROUNDS", "20"))
+
+# Training cache: prepared split matrices keyed by data + preprocessing fingerprint
+TRAIN_CACHE_PATH = "data/cache/training"
+TRAIN_MATRIX_KEEP = 3                      # materialized training matrices kept (most recently used)
+
+# Streaming evaluation accumulators (per model version / horizon / hour bucket)
+EVAL_STORE_PATH = "data/eval/eval_accumulators.db"
+
+# Forecast prediction intervals: nominal coverage of the [lower, upper] band
+INTERVAL_COVERAGE = float(os.getenv("INTERVAL_COVERAGE", "0.9"))
+
+# Spatial AQI grid (neighbourhood heatmap): bbox = (lat_min, lat_max, lon_min, lon_max)
+GRID_BBOX = (24.75, 25.05, 66.95, 67.25)
+GRID_SHAPE = (20, 25)                      # 500 points
+GRID_BATCH_POINTS = int(os.getenv("GRID_BATCH_POINTS", "100"))   # coordinates per API request
+GRID_FORECAST_DAYS = 3                     # 72 hours
+GRID_PATH = "data/grid"
+
+# Materialized AQI rollups (hour / day / month / year) per location
+ROLLUP_STORE_PATH = "data/rollups/aqi_rollups.db"
+
+# Downsampling pyramids for long dashboard charts (bucket = FACTOR^k hours, k = 1..LEVELS)
+DOWNSAMPLE_PATH = "data/pyramids"
+DOWNSAMPLE_FACTOR = 4
+DOWNSAMPLE_LEVELS = 6                      # up to 4096-hour buckets
+
+# Revision-aware ingest: per-hour raw content hashes + invalidation windows
+REVISION_STATE_PATH = "data/ingest/raw_hours.db"
+INGEST_STATE_HOURS = 24 * 30               # raw hours kept for diffing / feature context
+REVISION_WINDOW_HOURS = 24                 # a changed hour invalidates the next 24h of lags / rolling values
+REVISION_CONTEXT_HOURS = 36                # history loaded before a span (24h rolling + 12h NowCast)
+
+# Clean + feature stages: "pandas" (eager) or "polars" (lazy plan over Arrow, optional dependency)
+PIPELINE_BACKEND = os.getenv("PIPELINE_BACKEND", "pandas").lower()
+
+# Feature-drift monitor: fixed training-set bins vs a sliding window of recent hours
+DRIFT_STORE_PATH = "data/drift/drift_window.db"
+DRIFT_BINS = 10                            # quantile bins per feature (fixed at training time)
+DRIFT_WINDOW_HOURS = int(os.getenv("DRIFT_WINDOW_HOURS", str(24 * 7)))
+DRIFT_MIN_ROWS = 48                        # fewer hours in the window → no verdict
+DRIFT_PSI_WARN = 0.1
+DRIFT_PSI_ALERT = 0.25
+DRIFT_KS_ALERT = 0.2
+# Calendar features are functions of the timestamp: a short window never matches their yearly spread
+DRIFT_EXCLUDE = ["month", "day", "hour", "weekday", "hour_sin"]
+
+# Model selection: RMSE × (1 + weight × relative serving cost), with hard serving budgets
+MODEL_COST_WEIGHT = float(os.getenv("MODEL_COST_WEIGHT", "0.02"))
+MODEL_MAX_SIZE_MB = float(os.getenv("MODEL_MAX_SIZE_MB", "100"))
+MODEL_MAX_LOAD_MS = float(os.getenv("MODEL_MAX_LOAD_MS", "2000"))
+MODEL_MAX_SINGLE_MS = float(os.getenv("MODEL_MAX_SINGLE_MS", "50"))      # one-row predict
+MODEL_MAX_BATCH_MS = float(os.getenv("MODEL_MAX_BATCH_MS", "100"))       # 72-row forecast
+MODEL_PROFILE_REPEATS = 20
+
+# Payload validation: checked before any DataFrame is built; failures land in <path>/quarantine
+VALIDATION_PATH = "data/validation"
+VALIDATION_MAX_NULL_RATIO = float(os.getenv("VALIDATION_MAX_NULL_RATIO", "0.5"))
+PHYSICAL_RANGES = {                        # Open-Meteo units (μg/m³, °C, %, km/h, °)
+    "pm10": (0, 5000), "pm2_5": (0, 3000), "carbon_monoxide": (0, 100000),
+    "nitrogen_dioxide": (0, 5000), "ozone": (0, 2000), "sulphur_dioxide": (0, 10000),
+    "temperature_2m": (-60, 60), "relative_humidity_2m": (0, 100),
+    "wind_speed_10m": (0, 400), "wind_direction_10m": (0, 360),
+}
@@ -0,0 +1,277 @@
+# Purpose: Multi-resolution min/max pyramids for long hourly series (actual vs predicted AQI),
+# so the dashboard can chart years of history with a payload sized to the chart width.
+# Level k aggregates 4^k hours per bucket; appends / revisions only rebuild the tail buckets.
+
+import os
+import numpy as np
+import pandas as pd
+
+try:
+    from src.config import DOWNSAMPLE_PATH, DOWNSAMPLE_FACTOR, DOWNSAMPLE_LEVELS, LOCATION
+except Exception:
+    from config import DOWNSAMPLE_PATH, DOWNSAMPLE_FACTOR, DOWNSAMPLE_LEVELS, LOCATION
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LEVEL_FIELDS = ["bucket", "count", "mean", "min", "max", "t_min", "t_max"]
+
+
+def _hours(times):
+    return np.asarray(pd.to_datetime(times), dtype="datetime64[h]").astype(np.int64)
+
+
+def _segments(hours, size):
+    """Start index of each run of equal hours // size (hours sorted)."""
+    b = hours // size
+    return np.concatenate([[0], np.flatnonzero(np.diff(b)) + 1]), b
+
+
+def _aggregate(hours, values, size):
+    """Bucket sorted (hour, value) pairs into `size`-hour buckets → dict of level arrays."""
+    if not len(hours):
+        return {f: np.empty(0, dtype=np.float64 if f in ("mean", "min", "max") else np.int64)
+                for f in LEVEL_FIELDS}
+    starts, b = _segments(hours, size)
+    seg = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(hours))))
+    count = np.diff(np.append(starts, len(hours)))
+    mins = np.minimum.reduceat(values, starts)
+    maxs = np.maximum.reduceat(values, starts)
+    # First hour in each bucket reaching its min / max
+    t_min = hours[np.flatnonzero(values == mins[seg])[np.unique(seg[values == mins[seg]], return_index=True)[1]]]
+    t_max = hours[np.flatnonzero(values == maxs[seg])[np.unique(seg[values == maxs[seg]], return_index=True)[1]]]
+    return {
+        "bucket": b[starts], "count": count, "mean": np.add.reduceat(values, starts) / count,
+        "min": mins, "max": maxs, "t_min": t_min, "t_max": t_max,
+    }
+
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: keep `n_out` points that preserve the visual shape."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = x.astype(np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_hi = edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[hi:nxt_hi].mean(), y[hi:nxt_hi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+class Pyramid:
+    """Raw hourly series + DOWNSAMPLE_LEVELS min/max levels (bucket = FACTOR^k hours)."""
+
+    def __init__(self, hours=None, values=None, levels=None):
+        self.hours = np.empty(0, dtype=np.int64) if hours is None else hours
+        self.values = np.empty(0, dtype=np.float64) if values is None else values
+        self.levels = levels or [_aggregate(self.hours, self.values, self.bucket_hours(k))
+                                 for k in range(1, DOWNSAMPLE_LEVELS + 1)]
+
+    @staticmethod
+    def bucket_hours(k):
+        return DOWNSAMPLE_FACTOR ** k
+
+    def update(self, times, values):
+        """Upsert hours (later values win) and rebuild only buckets at or after the first changed hour."""
+        new_h = _hours(times)
+        new_v = np.asarray(values, dtype=np.float64)
+        ok = ~np.isnan(new_v)
+        new_h, new_v = new_h[ok], new_v[ok]
+        if not len(new_h):
+            return 0
+        first = int(new_h.min())
+
+        if len(self.hours) and first > self.hours[-1]:
+            order = np.argsort(new_h, kind="stable")
+            uniq = np.unique(new_h[order][::-1], return_index=True)[1]
+            self.hours = np.concatenate([self.hours, new_h[order][::-1][uniq]])
+            self.values = np.concatenate([self.values, new_v[order][::-1][uniq]])
+        else:
+            # Reverse so np.unique's first occurrence is the newest value for that hour
+            all_h = np.concatenate([self.hours, new_h])[::-1]
+            all_v = np.concatenate([self.values, new_v])[::-1]
+            self.hours, idx = np.unique(all_h, return_index=True)
+            self.values = all_v[idx]
+
+        for k, level in enumerate(self.levels, start=1):
+            size = self.bucket_hours(k)
+            keep = np.searchsorted(level["bucket"], first // size)
+            tail = np.searchsorted(self.hours, (first // size) * size)
+            fresh = _aggregate(self.hours[tail:], self.values[tail:], size)
+            for f in LEVEL_FIELDS:
+                level[f] = np.concatenate([level[f][:keep], fresh[f]])
+        return len(new_h)
+
+    def view(self, start=None, end=None, width=1000, method="minmax"):
+        """
+        Points for start <= t < end sized for `width` pixels: the finest level with at most
+        `width` buckets in range, emitted as each bucket's min and max (≤ 2·width points).
+        Partial buckets at the edges come from raw hours, so range extremes are exact.
+        method="lttb" further reduces the chosen points to `width` with LTTB.
+        """
+        if not len(self.hours):
+            return pd.DataFrame({"datetime": pd.to_datetime([]), "value": []})
+        a = int(_hours([start])[0]) if start is not None else int(self.hours[0])
+        b = int(_hours([end])[0]) if end is not None else int(self.hours[-1]) + 1
+        span = max(b - a, 1)
+
+        k = next((k for k in range(1, DOWNSAMPLE_LEVELS + 1)
+                  if span / self.bucket_hours(k) <= width), DOWNSAMPLE_LEVELS)
+        if span <= 2 * width:
+            k = 0
+        self.last_level = k
+
+        if k == 0:
+            i, j = np.searchsorted(self.hours, [a, b])
+            t, v = self.hours[i:j], self.values[i:j]
+        else:
+            size = self.bucket_hours(k)
+            level = self.levels[k - 1]
+            full_lo, full_hi = -(-a // size), b // size
+
+            def raw(lo, hi):
+                ri, rj = np.searchsorted(self.hours, [lo, hi])
+                return _aggregate(self.hours[ri:rj], self.values[ri:rj], size)
+
+            if full_lo < full_hi:
+                i, j = np.searchsorted(level["bucket"], [full_lo, full_hi])
+                parts = [raw(a, full_lo * size), {f: level[f][i:j] for f in LEVEL_FIELDS}, raw(full_hi * size, b)]
+            else:
+                parts = [raw(a, b)]
+            t = np.concatenate([p["t_min"] for p in parts] + [p["t_max"] for p in parts])
+            v = np.concatenate([p["min"] for p in parts] + [p["max"] for p in parts])
+            t, idx = np.unique(t, return_index=True)
+            v = v[idx]
+
+        if method == "lttb" and len(t) > width:
+            keep = lttb(t, v, width)
+            t, v = t[keep], v[keep]
+        return pd.DataFrame({"datetime": t.astype("datetime64[h]").astype("datetime64[ns]"), "value": v})
+
+    # --- Persistence (one .npz per series, atomic replace) ---
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        arrays = {"hours": self.hours, "values": self.values}
+        for k, level in enumerate(self.levels, start=1):
+            arrays.update({f"l{k}_{f}": level[f] for f in LEVEL_FIELDS})
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as z:
+            levels = [{f: z[f"l{k}_{f}"] for f in LEVEL_FIELDS} for k in range(1, DOWNSAMPLE_LEVELS + 1)
+                      if f"l{k}_bucket" in z]
+            if len(levels) != DOWNSAMPLE_LEVELS:
+                return cls(z["hours"], z["values"])
+            return cls(z["hours"], z["values"], levels)
+
+
+def series_path(name, location=LOCATION, path=None):
+    return os.path.join(path or os.path.join(BASE_DIR, DOWNSAMPLE_PATH), f"{location}_{name}.npz")
+
+
+def update_series(name, times, values, location=LOCATION, path=None):
+    """Load → upsert → save one series pyramid; returns hours written."""
+    file = series_path(name, location, path)
+    pyramid = Pyramid.load(file)
+    n = pyramid.update(times, values)
+    if n:
+        pyramid.save(file)
+        print(f"🔺 Pyramid '{name}' updated → {n} hours for '{location}' ({len(pyramid.hours)} total)")
+    return n
+
+
+def latest_time(series=("actual", "predicted"), location=LOCATION, path=None):
+    """Newest hour across the given series (None when nothing is stored)."""
+    last = [p.hours[-1] for p in (Pyramid.load(series_path(n, location, path)) for n in series) if len(p.hours)]
+    return pd.Timestamp(np.datetime64(int(max(last)), "h")) if last else None
+
+
+def overlay(start=None, end=None, width=1000, series=("actual", "predicted"), location=LOCATION, path=None):
+    """Downsampled series side by side on one datetime index (NaN where a series has no point)."""
+    frames = []
+    for name in series:
+        view = Pyramid.load(series_path(name, location, path)).view(start, end, width)
+        frames.append(view.drop_duplicates("datetime").set_index("datetime")["value"].rename(name))
+    return pd.concat(frames, axis=1, sort=True)
+
+
+# --- Run standalone ---
+#   python src/downsample.py            → fidelity + payload / timing check on 5 years of hours
+#   python src/downsample.py --rebuild  → build 'actual' / 'predicted' from local features + forecast log
+if __name__ == "__main__":
+    import sys
+    import time
+    import tempfile
+
+    if "--rebuild" in sys.argv:
+        try:
+            from src.forecast_store import read_forecasts
+        except Exception:
+            from forecast_store import read_forecasts
+
+        features = pd.read_csv(os.path.join(BASE_DIR, "data", "final", "final_selected_features.csv"))
+        update_series("actual", features["datetime"], features["aqi"])
+        issued = read_forecasts().sort_values("issue_time")
+        if len(issued):
+            update_series("predicted", issued["target_time"], issued["predicted_aqi"])
+        sys.exit(0)
+
+    rng = np.random.default_rng(3)
+    hours = 24 * 365 * 5
+    times = pd.date_range("2021-01-01", periods=hours, freq="h")
+    actual = 90 + 40 * np.sin(np.arange(hours) / 300) + rng.gamma(2, 12, hours)
+    predicted = actual + rng.normal(0, 8, hours)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        update_series("actual", times[:-24], actual[:-24], path=tmp)
+        update_series("predicted", times[:-24], predicted[:-24], path=tmp)
+        build_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        update_series("actual", times[-24:], actual[-24:], path=tmp)
+        actual[-40] = 499.0                                           # upstream revision
+        update_series("actual", times[-40:-39], actual[-40:-39], path=tmp)
+        append_ms = (time.perf_counter() - t0) * 1000
+
+        pyramid = Pyramid.load(series_path("actual", path=tmp))
+        fresh = Pyramid(pyramid.hours, pyramid.values)
+        for inc, full in zip(pyramid.levels, fresh.levels):
+            for f in LEVEL_FIELDS:
+                assert np.array_equal(inc[f], full[f]), f"incremental level differs in {f}"
+
+        width = 1500
+        view_ms, sizes = [], []
+        for _ in range(100):
+            a, b = np.sort(rng.integers(0, hours, 2))
+            lo, hi = times[a], times[b] + pd.Timedelta(hours=1)
+            t0 = time.perf_counter()
+            view = pyramid.view(lo, hi, width)
+            view_ms.append((time.perf_counter() - t0) * 1000)
+            sizes.append(len(view))
+            raw = actual[a:b + 1]
+            assert len(view) <= 2 * width + 4
+            assert view["value"].max() == raw.max() and view["value"].min() == raw.min()
+            assert view["datetime"].between(lo, hi).all()
+
+        t0 = time.perf_counter()
+        both = overlay(width=width, path=tmp)
+        overlay_ms = (time.perf_counter() - t0) * 1000
+        smooth = pyramid.view(width=width, method="lttb")
+
+    print(f"🔺 Build 2 × {hours:,} hours: {build_s:.2f}s | 24h append + revision: {append_ms:.1f} ms")
+    print(f"📉 100 random ranges @ {width}px: median {np.median(view_ms):.2f} ms, "
+          f"≤ {max(sizes)} points (vs up to {hours:,} raw)")
+    print(f"📈 Full-history overlay: {len(both)} rows in {overlay_ms:.1f} ms | LTTB view: {len(smooth)} points")
+    print("✅ Pyramid views keep exact range min/max; incremental levels match a full rebuild")
@@ -0,0 +1,329 @@
+# Purpose: Feature-drift monitor. The training set's per-feature histograms over fixed
+# quantile bins are saved next to the model artifact; the feature pipeline folds each new
+# batch into running current-window counts (O(rows)), and PSI / binned KS scores are
+# computed from the two histograms without rescanning history.
+
+import os
+import json
+import sqlite3
+import numpy as np
+import pandas as pd
+
+try:
+    from src.config import (
+        DRIFT_STORE_PATH, DRIFT_BINS, DRIFT_WINDOW_HOURS, DRIFT_MIN_ROWS,
+        DRIFT_PSI_WARN, DRIFT_PSI_ALERT, DRIFT_KS_ALERT, DRIFT_EXCLUDE, LOCATION
+    )
+    from src.model_artifacts import MODEL_DIR
+except Exception:
+    from config import (
+        DRIFT_STORE_PATH, DRIFT_BINS, DRIFT_WINDOW_HOURS, DRIFT_MIN_ROWS,
+        DRIFT_PSI_WARN, DRIFT_PSI_ALERT, DRIFT_KS_ALERT, DRIFT_EXCLUDE, LOCATION
+    )
+    from model_artifacts import MODEL_DIR
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REFERENCE_FILE = "drift_reference.json"
+
+
+# =============================================================
+# 📐 Reference histograms (written by train_model.py)
+# =============================================================
+def build_reference(X: pd.DataFrame, features, bins=DRIFT_BINS):
+    """Quantile cut points per feature (fixed from here on) + the training counts in each bin."""
+    reference = {}
+    for f in [f for f in features if f not in DRIFT_EXCLUDE]:
+        values = pd.to_numeric(X[f], errors="coerce").to_numpy(dtype=float)
+        values = values[~np.isnan(values)]
+        cuts = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1])) if len(values) else np.array([])
+        counts = np.bincount(np.searchsorted(cuts, values, side="right"), minlength=len(cuts) + 1)
+        reference[f] = {"cuts": cuts.tolist(), "counts": counts.tolist()}
+    return reference
+
+
+def save_reference(reference, model_version, model_dir=MODEL_DIR):
+    os.makedirs(model_dir, exist_ok=True)
+    path = os.path.join(model_dir, REFERENCE_FILE)
+    with open(path, "w") as f:
+        json.dump({"model_version": model_version, "features": reference}, f)
+    return path
+
+
+def load_reference(model_dir=MODEL_DIR):
+    """(model_version, {feature: {"cuts", "counts"}}) or (None, None) when no model recorded bins."""
+    path = os.path.join(model_dir, REFERENCE_FILE)
+    if not os.path.exists(path):
+        return None, None
+    with open(path) as f:
+        doc = json.load(f)
+    return doc["model_version"], doc["features"]
+
+
+def bin_rows(df: pd.DataFrame, reference):
+    """(rows, features) bin index per value; -1 for missing values / absent columns."""
+    out = np.full((len(df), len(reference)), -1, dtype=np.int16)
+    for j, (f, ref) in enumerate(reference.items()):
+        if f not in df.columns:
+            continue
+        values = pd.to_numeric(df[f], errors="coerce").to_numpy(dtype=float)
+        idx = np.searchsorted(np.asarray(ref["cuts"], dtype=float), values, side="right")
+        out[:, j] = np.where(np.isnan(values), -1, idx)
+    return out
+
+
+# =============================================================
+# 📊 Scores
+# =============================================================
+def psi(ref_counts, cur_counts, eps=1e-4):
+    """Population Stability Index Σ (q − p)·ln(q / p) over bins (ε-smoothed)."""
+    p = np.asarray(ref_counts, dtype=float)
+    q = np.asarray(cur_counts, dtype=float)
+    p = np.clip(p / max(p.sum(), 1), eps, None)
+    q = np.clip(q / max(q.sum(), 1), eps, None)
+    return float(((q - p) * np.log(q / p)).sum())
+
+
+def binned_ks(ref_counts, cur_counts):
+    """Kolmogorov–Smirnov statistic evaluated at the bin edges."""
+    p = np.cumsum(ref_counts) / max(np.sum(ref_counts), 1)
+    q = np.cumsum(cur_counts) / max(np.sum(cur_counts), 1)
+    return float(np.abs(p - q).max())
+
+
+def drift_scores(reference, window_counts, n_rows):
+    """Per-feature PSI / KS / status for the current window."""
+    rows = []
+    for j, (f, ref) in enumerate(reference.items()):
+        cur = window_counts[j, :len(ref["counts"])]
+        n = int(cur.sum())
+        score_psi, score_ks = psi(ref["counts"], cur), binned_ks(ref["counts"], cur)
+        if n < DRIFT_MIN_ROWS:
+            status = "insufficient"
+        elif score_psi >= DRIFT_PSI_ALERT or score_ks >= DRIFT_KS_ALERT:
+            status = "drift"
+        elif score_psi >= DRIFT_PSI_WARN:
+            status = "warn"
+        else:
+            status = "ok"
+        rows.append({"feature": f, "psi": round(score_psi, 4), "ks": round(score_ks, 4), "n": n, "status": status})
+    return pd.DataFrame(rows, columns=["feature", "psi", "ks", "n", "status"])
+
+
+# =============================================================
+# 🗄️ Current window (SQLite)
+# =============================================================
+class DriftStore:
+    """
+    drift_hours keeps the raw feature vector of each hour in the window (so a new reference
+    can re-bin it once); drift_window keeps the running (features × bins) counts that each
+    batch adjusts in place: + new hours, ± revised hours, − hours that left the window.
+    """
+
+    def __init__(self, path=None, window_hours=DRIFT_WINDOW_HOURS):
+        self.path = path or os.path.join(BASE_DIR, DRIFT_STORE_PATH)
+        self.window_hours = window_hours
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS drift_hours ("
+            " location TEXT NOT NULL, hour INTEGER NOT NULL, payload TEXT NOT NULL,"
+            " PRIMARY KEY (location, hour)) WITHOUT ROWID"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS drift_window ("
+            " location TEXT PRIMARY KEY, model_version TEXT NOT NULL, counts BLOB NOT NULL)"
+        )
+        self.conn.commit()
+
+    def _counts(self, location, model_version, reference):
+        row = self.conn.execute(
+            "SELECT model_version, counts FROM drift_window WHERE location = ?", (location,)
+        ).fetchone()
+        shape = (len(reference), DRIFT_BINS + 1)
+        if row is not None and row[0] == model_version:
+            return np.frombuffer(row[1], dtype=np.int64).reshape(shape).copy()
+
+        # New reference bins → re-bin the hours already in the window once
+        counts = np.zeros(shape, dtype=np.int64)
+        stored = self._hour_frame(location)
+        if len(stored):
+            self._add(counts, bin_rows(stored, reference), +1)
+        return counts
+
+    @staticmethod
+    def _add(counts, bins, sign):
+        for j in range(bins.shape[1]):
+            valid = bins[:, j] >= 0
+            np.add.at(counts[j], bins[valid, j], sign)
+
+    def _hour_frame(self, location, hours=None):
+        if hours is None:
+            rows = self.conn.execute(
+                "SELECT hour, payload FROM drift_hours WHERE location = ?", (location,)).fetchall()
+        else:
+            marks = ",".join("?" * len(hours))
+            rows = self.conn.execute(
+                f"SELECT hour, payload FROM drift_hours WHERE location = ? AND hour IN ({marks})",
+                (location, *map(int, hours))).fetchall()
+        frame = pd.DataFrame([json.loads(p) for _, p in rows])
+        frame["hour_key"] = [h for h, _ in rows]
+        return frame
+
+    def update(self, df: pd.DataFrame, reference, model_version, location=LOCATION):
+        """Fold a batch of feature rows into the window counts; returns the counts array."""
+        counts = self._counts(location, model_version, reference)
+        times = pd.to_datetime(df["datetime"] if "datetime" in df.columns else df["datetime_str"])
+        hours = np.asarray(times, dtype="datetime64[h]").astype(np.int64)
+        features = list(reference)
+
+        # 1. Revised hours: remove their previous contribution first
+        old = self._hour_frame(location, np.unique(hours)) if len(hours) else pd.DataFrame()
+        if len(old):
+            self._add(counts, bin_rows(old, reference), -1)
+
+        # 2. Add the batch (one row per hour, last wins) and remember its raw values
+        batch = df.assign(hour_key=hours).drop_duplicates("hour_key", keep="last")
+        self._add(counts, bin_rows(batch, reference), +1)
+        payloads = batch.reindex(columns=features).to_dict(orient="records")
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO drift_hours VALUES (?, ?, ?)",
+            [(location, int(h), json.dumps(p, default=float)) for h, p in zip(batch["hour_key"], payloads)]
+        )
+
+        # 3. Evict hours that slid out of the window
+        newest = self.conn.execute("SELECT MAX(hour) FROM drift_hours WHERE location = ?", (location,)).fetchone()[0]
+        expired = [h for (h,) in self.conn.execute(
+            "SELECT hour FROM drift_hours WHERE location = ? AND hour <= ?",
+            (location, newest - self.window_hours)).fetchall()]
+        if expired:
+            self._add(counts, bin_rows(self._hour_frame(location, expired), reference), -1)
+            self.conn.execute("DELETE FROM drift_hours WHERE location = ? AND hour <= ?",
+                              (location, newest - self.window_hours))
+
+        self.conn.execute("INSERT OR REPLACE INTO drift_window VALUES (?, ?, ?)",
+                          (location, model_version, counts.tobytes()))
+        self.conn.commit()
+        return counts
+
+    def scores(self, reference, model_version, location=LOCATION):
+        counts = self._counts(location, model_version, reference)
+        return drift_scores(reference, counts, int(counts[0].sum()))
+
+    def close(self):
+        self.conn.close()
+
+
+def _log_path():
+    return os.path.join(os.path.dirname(os.path.join(BASE_DIR, DRIFT_STORE_PATH)), "drift_log.jsonl")
+
+
+def monitor_batch(df: pd.DataFrame, location=LOCATION, path=None, model_dir=MODEL_DIR):
+    """
+    Feature-pipeline hook: update the window with `df`, print + log per-feature drift.
+    Returns the scores frame (None when the current model recorded no reference bins).
+    """
+    model_version, reference = load_reference(model_dir)
+    if reference is None:
+        print("⚠️ No drift reference next to the model artifact — skipping drift check.")
+        return None
+
+    store = DriftStore(path)
+    try:
+        counts = store.update(df, reference, model_version, location)
+    finally:
+        store.close()
+    scores = drift_scores(reference, counts, int(counts[0].sum()))
+
+    flagged = scores[scores["status"].isin(["warn", "drift"])]
+    print(f"🌊 Drift vs model {model_version}: {len(flagged)} of {len(scores)} features flagged "
+          f"(window {int(scores['n'].max())} h)")
+    for _, r in flagged.iterrows():
+        print(f"   {'🚨' if r['status'] == 'drift' else '⚠️'} {r['feature']}: PSI {r['psi']:.3f}, KS {r['ks']:.3f}")
+
+    log = _log_path() if path is None else os.path.join(os.path.dirname(path), "drift_log.jsonl")
+    with open(log, "a") as f:
+        f.write(json.dumps({"run_at": str(pd.Timestamp.now().floor("s")), "location": location,
+                            "model_version": model_version,
+                            "features": scores.to_dict(orient="records")}) + "\n")
+    return scores
+
+
+def drift_detected(location=LOCATION, path=None, model_dir=MODEL_DIR):
+    """True when any feature of the current window is in 'drift' state (used by train_model.py)."""
+    model_version, reference = load_reference(model_dir)
+    store_path = path or os.path.join(BASE_DIR, DRIFT_STORE_PATH)
+    if reference is None or not os.path.exists(store_path):
+        return False, pd.DataFrame()
+    store = DriftStore(store_path)
+    try:
+        scores = store.scores(reference, model_version, location)
+    finally:
+        store.close()
+    return bool((scores["status"] == "drift").any()), scores
+
+
+# --- Run standalone ---
+#   python src/drift_monitor.py          → current drift scores for the saved model
+#   python src/drift_monitor.py --check  → synthetic monsoon shift: incremental counts vs rescan
+if __name__ == "__main__":
+    import sys
+    import time
+    import tempfile
+
+    if "--check" not in sys.argv:
+        drifted, scores = drift_detected()
+        print(scores.to_string(index=False) if len(scores) else "ℹ️ No drift window yet.")
+        print("🚨 Drift detected" if drifted else "✅ No drift")
+        sys.exit(0)
+
+    rng = np.random.default_rng(1)
+    n_train = 8760
+    times = pd.date_range("2024-01-01", periods=n_train + 24 * 60, freq="h")
+    frame = pd.DataFrame({
+        "datetime": times,
+        "pm2_5": rng.gamma(4, 9, len(times)),
+        "relative_humidity_2m": rng.normal(60, 10, len(times)),
+        "hour": times.hour,
+    })
+    # Monsoon after day 30 of the live period: humidity up, PM down
+    live = frame.iloc[n_train:].copy()
+    monsoon = live["datetime"] >= live["datetime"].iloc[0] + pd.Timedelta(days=30)
+    live.loc[monsoon, "relative_humidity_2m"] += 20
+    live.loc[monsoon, "pm2_5"] *= 0.5
+
+    features = ["pm2_5", "relative_humidity_2m", "hour"]
+    with tempfile.TemporaryDirectory() as tmp:
+        reference = build_reference(frame.iloc[:n_train], features)
+        save_reference(reference, "test", tmp)
+        db = os.path.join(tmp, "drift.db")
+
+        t0 = time.perf_counter()
+        for day in range(60):
+            batch = live.iloc[day * 24:(day + 1) * 24]
+            if day == 45:   # upstream revision of the previous day
+                batch = pd.concat([live.iloc[(day - 1) * 24:day * 24].assign(pm2_5=lambda d: d["pm2_5"] + 1), batch])
+                live.loc[live.index[(day - 1) * 24:day * 24], "pm2_5"] += 1
+            scores = monitor_batch(batch, path=db, model_dir=tmp) if day in (29, 59) else None
+            if scores is None:
+                store = DriftStore(db)
+                store.update(batch, reference, "test")
+                store.close()
+            if day == 29:
+                before = scores
+        per_day_ms = (time.perf_counter() - t0) / 60 * 1000
+
+        # Incremental counts == histogram of a full rescan of the last window
+        window = live.iloc[-DRIFT_WINDOW_HOURS:]
+        store = DriftStore(db)
+        incremental = store._counts(LOCATION, "test", reference)
+        store.close()
+        rescan = np.zeros_like(incremental)
+        DriftStore._add(rescan, bin_rows(window, reference), +1)
+        assert np.array_equal(incremental, rescan)
+
+    print(before.to_string(index=False))
+    print(scores.to_string(index=False))
+    assert (before["status"] != "drift").all()
+    assert set(scores.loc[scores["status"] == "drift", "feature"]) == {"pm2_5", "relative_humidity_2m"}
+    print(f"⚡ {per_day_ms:.1f} ms per daily batch | ✅ incremental window counts match a full rescan")
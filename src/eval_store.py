@@ -0,0 +1,220 @@
+# Purpose: Streaming evaluation — mergeable error accumulators per (model version, horizon,
+# hour bucket) in SQLite, so each run scores only newly arrived rows and rolling-window
+# metrics are a sum over buckets instead of a re-predict over the full history.
+
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+
+try:
+    from src.config import EVAL_STORE_PATH, LOCATION
+except Exception:
+    from config import EVAL_STORE_PATH, LOCATION
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROLLING_WINDOWS = {"24h": 24, "7d": 24 * 7, "30d": 24 * 30}
+_SUM_COLS = ["n", "sum_y", "sum_yy", "sum_err", "sum_err2", "sum_abs_err"]
+
+
+def accumulate(y, pred):
+    """Accumulator for one batch: count, Σy, Σy², Σe, Σe², Σ|e| with e = y − pred."""
+    y = np.asarray(y, dtype=np.float64)
+    err = y - np.asarray(pred, dtype=np.float64)
+    return dict(zip(_SUM_COLS, [len(y), y.sum(), (y * y).sum(), err.sum(),
+                                (err * err).sum(), np.abs(err).sum()]))
+
+
+def metrics_from(acc):
+    """RMSE / MAE / R² / bias from (merged) accumulators."""
+    n = acc["n"]
+    if not n:
+        return {"n": 0, "RMSE": np.nan, "MAE": np.nan, "R²": np.nan, "bias": np.nan}
+    sst = acc["sum_yy"] - acc["sum_y"] ** 2 / n
+    return {
+        "n": int(n),
+        "RMSE": float(np.sqrt(acc["sum_err2"] / n)),
+        "MAE": float(acc["sum_abs_err"] / n),
+        "R²": float(1 - acc["sum_err2"] / sst) if sst > 0 else np.nan,
+        "bias": float(acc["sum_err"] / n),
+    }
+
+
+class EvalStore:
+    """
+    One row per (location, model_version, horizon, bucket_hour) holding additive sums.
+    A per-location watermark records the newest observation already scored.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(BASE_DIR, EVAL_STORE_PATH)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS eval_buckets ("
+            " location TEXT NOT NULL, model_version TEXT NOT NULL,"
+            " horizon INTEGER NOT NULL, bucket_hour INTEGER NOT NULL,"
+            " n INTEGER NOT NULL, sum_y REAL NOT NULL, sum_yy REAL NOT NULL,"
+            " sum_err REAL NOT NULL, sum_err2 REAL NOT NULL, sum_abs_err REAL NOT NULL,"
+            " PRIMARY KEY (location, model_version, horizon, bucket_hour)"
+            ") WITHOUT ROWID"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS eval_watermark ("
+            " location TEXT PRIMARY KEY, last_datetime TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+    # --- Watermark ---
+    def watermark(self, location=LOCATION):
+        row = self.conn.execute(
+            "SELECT last_datetime FROM eval_watermark WHERE location = ?", (location,)
+        ).fetchone()
+        return pd.Timestamp(row[0]) if row else None
+
+    def set_watermark(self, ts, location=LOCATION):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO eval_watermark (location, last_datetime) VALUES (?, ?)",
+            (location, str(pd.Timestamp(ts)))
+        )
+        self.conn.commit()
+
+    # --- Accumulate ---
+    def update(self, times, y, pred, model_version, horizon=0, location=LOCATION):
+        """Merge a batch into its hourly buckets (horizon may be a scalar or per-row array)."""
+        y = np.asarray(y, dtype=np.float64)
+        err = y - np.asarray(pred, dtype=np.float64)
+        batch = pd.DataFrame({
+            "model_version": model_version,
+            "horizon": np.broadcast_to(np.asarray(horizon, dtype=np.int64), y.shape),
+            "bucket_hour": pd.to_datetime(times).to_numpy().astype("datetime64[h]").astype(np.int64),
+            "n": 1, "sum_y": y, "sum_yy": y * y,
+            "sum_err": err, "sum_err2": err * err, "sum_abs_err": np.abs(err),
+        })
+        grouped = batch.groupby(["model_version", "horizon", "bucket_hour"], as_index=False)[_SUM_COLS].sum()
+
+        rows = [(location, r.model_version, int(r.horizon), int(r.bucket_hour), int(r.n),
+                 r.sum_y, r.sum_yy, r.sum_err, r.sum_err2, r.sum_abs_err)
+                for r in grouped.itertuples(index=False)]
+        self.conn.executemany(
+            "INSERT INTO eval_buckets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (location, model_version, horizon, bucket_hour) DO UPDATE SET"
+            " n = n + excluded.n, sum_y = sum_y + excluded.sum_y,"
+            " sum_yy = sum_yy + excluded.sum_yy, sum_err = sum_err + excluded.sum_err,"
+            " sum_err2 = sum_err2 + excluded.sum_err2,"
+            " sum_abs_err = sum_abs_err + excluded.sum_abs_err",
+            rows
+        )
+        self.conn.commit()
+        return len(y)
+
+    # --- Query ---
+    def metrics(self, model_version=None, horizon=None, window_hours=None,
+                now=None, location=LOCATION):
+        """Merged metrics over buckets; `window_hours` counts back from `now` (default: watermark)."""
+        where, params = ["location = ?"], [location]
+        if model_version is not None:
+            where.append("model_version = ?")
+            params.append(model_version)
+        if horizon is not None:
+            where.append("horizon = ?")
+            params.append(int(horizon))
+        if window_hours is not None:
+            end = pd.Timestamp(now) if now is not None else self.watermark(location)
+            if end is None:
+                return metrics_from({"n": 0})
+            end_hour = int(np.datetime64(end.to_datetime64(), "h").astype(np.int64))
+            where.append("bucket_hour > ?")
+            params.append(end_hour - window_hours)
+
+        row = self.conn.execute(
+            f"SELECT {', '.join(f'COALESCE(SUM({c}), 0)' for c in _SUM_COLS)}"
+            f" FROM eval_buckets WHERE {' AND '.join(where)}", params
+        ).fetchone()
+        return metrics_from(dict(zip(_SUM_COLS, row)))
+
+    def rolling(self, model_version=None, horizon=0, now=None, location=LOCATION):
+        """Metrics for the last 24h / 7d / 30d plus all-time, one row per window."""
+        windows = {**ROLLING_WINDOWS, "all": None}
+        return pd.DataFrame({
+            name: self.metrics(model_version, horizon, hours, now, location)
+            for name, hours in windows.items()
+        }).T
+
+    def close(self):
+        self.conn.close()
+
+
+def evaluate_new_rows(df: pd.DataFrame, model, features, model_version,
+                      store=None, location=LOCATION, forecasts=None):
+    """
+    Score only rows newer than the store's watermark:
+      • horizon 0 → current model on the new observations
+      • horizons ≥ 1 → previously issued forecasts whose target hour just arrived
+        (`forecasts` = forecast_store.read_forecasts(...) frame, optional)
+    Returns the number of newly scored observations.
+    """
+    store = store or EvalStore()
+    wm = store.watermark(location)
+    new = df if wm is None else df[df["datetime"] > wm]
+    if new.empty:
+        return 0
+
+    store.update(new["datetime"], new["aqi"], model.predict(new[features]),
+                 model_version, horizon=0, location=location)
+
+    if forecasts is not None and not forecasts.empty:
+        actual = new[["datetime", "aqi"]].rename(columns={"datetime": "target_time"})
+        matched = forecasts[forecasts["horizon"] > 0].merge(actual, on="target_time")
+        for version, part in matched.groupby("model_version"):
+            store.update(part["target_time"], part["aqi"], part["predicted_aqi"],
+                         version, horizon=part["horizon"].to_numpy(), location=location)
+
+    store.set_watermark(new["datetime"].max(), location)
+    return len(new)
+
+
+# --- Run standalone check: incremental accumulators == full recomputation ---
+if __name__ == "__main__":
+    import time
+    import tempfile
+    from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+
+    rng = np.random.default_rng(0)
+    hours = 24 * 400
+    times = pd.date_range("2024-01-01", periods=hours, freq="h")
+    y = 100 + 30 * np.sin(np.arange(hours) / 24) + rng.normal(0, 5, hours)
+    pred = y + rng.normal(1, 8, hours)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EvalStore(os.path.join(tmp, "eval.db"))
+
+        # Daily runs: 24 new rows each
+        t0 = time.perf_counter()
+        for day in range(0, hours, 24):
+            sl = slice(day, day + 24)
+            store.update(times[sl], y[sl], pred[sl], "v1")
+            store.set_watermark(times[sl][-1])
+        per_run_ms = (time.perf_counter() - t0) / (hours / 24) * 1000
+
+        t0 = time.perf_counter()
+        rolling = store.rolling("v1")
+        query_ms = (time.perf_counter() - t0) * 1000
+        print(rolling)
+
+        full = {"RMSE": np.sqrt(mean_squared_error(y, pred)),
+                "MAE": mean_absolute_error(y, pred), "R²": r2_score(y, pred)}
+        last7 = slice(hours - 168, hours)
+        week = {"RMSE": np.sqrt(mean_squared_error(y[last7], pred[last7])),
+                "MAE": mean_absolute_error(y[last7], pred[last7])}
+        for k, v in full.items():
+            assert abs(rolling.loc["all", k] - v) < 1e-9, f"all-time {k} mismatch"
+        for k, v in week.items():
+            assert abs(rolling.loc["7d", k] - v) < 1e-9, f"7d {k} mismatch"
+        store.close()
+
+    print(f"\n⏱️ Update per daily run: {per_run_ms:.2f} ms | rolling query: {query_ms:.2f} ms")
+    print("✅ Accumulator metrics match full recomputation")
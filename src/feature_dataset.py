@@ -0,0 +1,199 @@
+# Purpose: On-disk feature dataset (chronological Parquet parts) streamed in bounded chunks
+
+import os
+import glob
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    from src.config import FEATURE_DATASET_PATH, TRAIN_CHUNK_ROWS
+except ModuleNotFoundError:
+    from config import FEATURE_DATASET_PATH, TRAIN_CHUNK_ROWS
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def dataset_dir(path=None):
+    return path or os.path.join(BASE_DIR, FEATURE_DATASET_PATH)
+
+
+def _part_range(file):
+    """(first, last) hour of a part from its Parquet column statistics (footer only)."""
+    pf = pq.ParquetFile(file)
+    col = pf.schema_arrow.get_field_index("datetime")
+    stats = [pf.metadata.row_group(i).column(col).statistics for i in range(pf.metadata.num_row_groups)]
+    if stats and all(s is not None and s.has_min_max for s in stats):
+        return pd.Timestamp(min(s.min for s in stats)), pd.Timestamp(max(s.max for s in stats))
+    hours = pd.to_datetime(pq.read_table(file, columns=["datetime"]).column(0).to_pandas())
+    return hours.min(), hours.max()
+
+
+def _next_seq(files):
+    return max((int(os.path.basename(f)[:-len(".parquet")].rsplit("-", 1)[1]) for f in files), default=-1) + 1
+
+
+def _write_part(df: pd.DataFrame, root, seq, row_group_rows):
+    first = df["datetime"].iloc[0].strftime("%Y%m%dT%H%M")
+    out = os.path.join(root, f"part-{first}-{seq:05d}.parquet")
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), out + ".tmp",
+                   row_group_size=row_group_rows, compression="zstd")
+    os.replace(out + ".tmp", out)
+    return out
+
+
+def append_to_dataset(df: pd.DataFrame, path=None, row_group_rows=TRAIN_CHUNK_ROWS):
+    """
+    Append a batch of feature rows, keeping parts non-overlapping, in time order, one row per
+    hour and at most `row_group_rows` rows each (part names start with the part's first hour).
+    Each batch row belongs to the part whose range it falls in (the tail part for newer hours);
+    only parts that receive rows are rewritten (the batch wins on duplicate hours), a full tail
+    part rolls over to a new part, so an append reads / writes O(batch + one part) rows
+    however long the history is.
+    """
+    root = dataset_dir(path)
+    os.makedirs(root, exist_ok=True)
+
+    df = df.copy()
+    if "datetime_str" in df.columns and "datetime" not in df.columns:
+        df["datetime"] = pd.to_datetime(df["datetime_str"])
+        df.drop(columns=["datetime_str"], inplace=True)
+    df["datetime"] = pd.to_datetime(df["datetime"])
+    df = df.drop_duplicates(subset=["datetime"], keep="last").sort_values("datetime")
+
+    # 1. Route every batch row to the part whose [first hour, next part's first hour) holds it
+    files = dataset_files(path)
+    ranges = [_part_range(f) for f in files]
+    seq = _next_seq(files)
+    groups = {}
+    if files:
+        firsts = np.array([first for first, _ in ranges], dtype="datetime64[ns]")
+        owner = np.clip(np.searchsorted(firsts, df["datetime"].to_numpy(), side="right") - 1, 0, None)
+        groups = {int(i): rows for i, rows in df.groupby(owner, sort=True)}
+
+        # A full tail part only absorbs hours it already covers; newer ones open new parts
+        tail = len(files) - 1
+        if tail in groups and pq.ParquetFile(files[tail]).metadata.num_rows >= row_group_rows:
+            rows = groups.pop(tail)
+            if (rows["datetime"] <= ranges[tail][1]).any():
+                groups[tail] = rows[rows["datetime"] <= ranges[tail][1]]
+            df = rows[rows["datetime"] > ranges[tail][1]]
+        else:
+            df = df.iloc[:0]
+
+    # 2. Rewrite only the parts that received rows, split at row_group_rows
+    written, replaced = [], []
+    for i, rows in groups.items():
+        merged = pd.concat([pd.read_parquet(files[i]), rows], ignore_index=True)
+        merged = merged.drop_duplicates(subset=["datetime"], keep="last").sort_values("datetime")
+        for lo in range(0, len(merged), row_group_rows):
+            written.append(_write_part(merged.iloc[lo:lo + row_group_rows], root, seq, row_group_rows))
+            seq += 1
+        replaced.append(files[i])
+
+    # 3. Hours past a full tail (or a first batch) → new parts
+    for lo in range(0, len(df), row_group_rows):
+        written.append(_write_part(df.iloc[lo:lo + row_group_rows], root, seq, row_group_rows))
+        seq += 1
+
+    # New parts are in place before the ones they replace disappear
+    for f in replaced:
+        os.remove(f)
+    return written[-1] if written else None
+
+
+def export_csv_to_dataset(csv_path, path=None, chunk_rows=TRAIN_CHUNK_ROWS):
+    """Convert a (possibly huge) features CSV into the Parquet dataset chunk by chunk."""
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        append_to_dataset(chunk, path, chunk_rows)
+
+
+def dataset_files(path=None):
+    return sorted(glob.glob(os.path.join(dataset_dir(path), "*.parquet")), key=os.path.basename)
+
+
+def count_rows(path=None):
+    """Row count from Parquet footers only (no data read)."""
+    return sum(pq.ParquetFile(f).metadata.num_rows for f in dataset_files(path))
+
+
+def iter_chunks(columns, path=None, chunk_rows=TRAIN_CHUNK_ROWS, start=0, stop=None):
+    """
+    Yield DataFrames of at most `chunk_rows` rows covering global rows [start, stop).
+    Only the requested columns are decoded; memory is bounded by chunk_rows.
+    """
+    offset = 0
+    for f in dataset_files(path):
+        pf = pq.ParquetFile(f)
+        n = pf.metadata.num_rows
+        if stop is not None and offset >= stop:
+            return
+        if offset + n <= start:
+            offset += n
+            continue
+        for batch in pf.iter_batches(batch_size=chunk_rows, columns=columns):
+            lo, hi = offset, offset + batch.num_rows
+            offset = hi
+            if hi <= start:
+                continue
+            if stop is not None and lo >= stop:
+                return
+            chunk = batch.to_pandas()
+            yield chunk.iloc[max(start - lo, 0):(None if stop is None else stop - lo)]
+
+
+# --- Run standalone: seed the dataset from the local features CSV ---
+#   python src/feature_dataset.py --check → overlapping / late / duplicate appends stay deduplicated
+if __name__ == "__main__":
+    import sys
+
+    csv_path = os.path.join(BASE_DIR, "data", "final", "final_selected_features.csv")
+    if "--check" in sys.argv:
+        import tempfile
+
+        cap, days = 100, 38
+        hours = pd.date_range("2025-01-01", periods=24 * (days + 1), freq="h")
+        batch = lambda idx, v: pd.DataFrame({"datetime": hours[idx], "aqi": np.full(len(idx), float(v))})
+
+        def read_all(tmp):
+            return pd.concat(iter_chunks(["datetime", "aqi"], tmp, chunk_rows=64), ignore_index=True)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            # Daily pipeline: each run re-sends the previous day (past_days=1) with revisions
+            for d in range(1, days + 1):
+                before = set(dataset_files(tmp))
+                append_to_dataset(batch(np.arange(24 * (d - 1), 24 * (d + 1)), d), tmp, row_group_rows=cap)
+                # 48h < cap → the batch spans at most the last two parts; history is never reread
+                assert len(before - set(dataset_files(tmp))) <= 2, "an append rewrote older parts"
+
+            # Late correction deep in history → only the part holding those hours is rewritten
+            before = set(dataset_files(tmp))
+            append_to_dataset(batch(np.arange(150, 160), -1), tmp, row_group_rows=cap)
+            assert len(before - set(dataset_files(tmp))) == 1
+
+            sizes = [pq.ParquetFile(f).metadata.num_rows for f in dataset_files(tmp)]
+            out = read_all(tmp)
+            assert out["datetime"].is_unique and out["datetime"].is_monotonic_increasing
+            assert len(out) == count_rows(tmp) == len(hours) and max(sizes) <= cap
+            assert (out.set_index("datetime")["aqi"].loc[hours[150:160]] == -1).all()
+            assert (out.set_index("datetime")["aqi"].loc[hours[24:48]] == 2).all()      # re-send won
+            print(f"✅ {days} overlapping daily appends → {len(sizes)} parts of ≤ {cap} rows, "
+                  f"{len(out)} unique hours in order (later writes win)")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            # Unsorted CSV: chunks land in their parts, parts stay bounded
+            shuffled = batch(np.arange(len(hours)), 0).sample(frac=1, random_state=0)
+            shuffled.to_csv(os.path.join(tmp, "shuffled.csv"), index=False)
+            export_csv_to_dataset(os.path.join(tmp, "shuffled.csv"), os.path.join(tmp, "ds"), chunk_rows=cap)
+            out = read_all(os.path.join(tmp, "ds"))
+            sizes = [pq.ParquetFile(f).metadata.num_rows for f in dataset_files(os.path.join(tmp, "ds"))]
+            assert out["datetime"].is_monotonic_increasing and len(out) == len(hours) and max(sizes) <= cap
+            print(f"✅ Unsorted CSV export → {len(sizes)} parts of ≤ {cap} rows, in time order")
+    elif dataset_files():
+        print(f"⚙️ Dataset already exists → {dataset_dir()} ({count_rows()} rows)")
+    elif os.path.exists(csv_path):
+        export_csv_to_dataset(csv_path)
+        print(f"✅ Exported {count_rows()} rows → {dataset_dir()}")
+    else:
+        print(f"❌ File not found → {csv_path}")
@@ -0,0 +1,87 @@
+# Purpose: File-backed stand-in for the parts of the `hopsworks` API the pipelines use
+# (login → project.get_feature_store() → feature groups with insert / read).
+# Each insert is one Parquet part; reads upsert by primary key (last write wins).
+
+import os
+import glob
+import json
+import time
+import pandas as pd
+
+STANDIN_ENV = "FEATURE_STORE_STANDIN_PATH"
+
+
+def _log(root, **event):
+    with open(os.path.join(root, "stats.jsonl"), "a") as f:
+        f.write(json.dumps(event) + "\n")
+
+
+class FeatureGroup:
+    def __init__(self, root, name, version, primary_key=None):
+        self.name, self.version = name, version
+        self.dir = os.path.join(root, f"{name}_v{version}")
+        self.root = root
+        meta_path = os.path.join(self.dir, "_meta.json")
+        if primary_key is not None and not os.path.exists(meta_path):
+            os.makedirs(self.dir, exist_ok=True)
+            with open(meta_path, "w") as f:
+                json.dump({"primary_key": list(primary_key)}, f)
+        with open(meta_path) as f:
+            self.primary_key = json.load(f)["primary_key"]
+
+    def insert(self, df: pd.DataFrame, write_options=None, **kwargs):
+        t0 = time.perf_counter()
+        n = len(glob.glob(os.path.join(self.dir, "part-*.parquet")))
+        df.to_parquet(os.path.join(self.dir, f"part-{n:06d}.parquet"), index=False)
+        _log(self.root, op="insert", fg=f"{self.name}_v{self.version}", rows=len(df),
+             seconds=time.perf_counter() - t0)
+        return None, None
+
+    def read(self, **kwargs) -> pd.DataFrame:
+        t0 = time.perf_counter()
+        parts = sorted(glob.glob(os.path.join(self.dir, "part-*.parquet")))
+        if not parts:
+            return pd.DataFrame()
+        df = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+        df = df.drop_duplicates(subset=self.primary_key, keep="last").reset_index(drop=True)
+        _log(self.root, op="read", fg=f"{self.name}_v{self.version}", rows=len(df),
+             seconds=time.perf_counter() - t0)
+        return df
+
+
+class FeatureStore:
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def get_feature_group(self, name, version=None):
+        version = version or 1
+        if not os.path.exists(os.path.join(self.root, f"{name}_v{version}", "_meta.json")):
+            raise ValueError(f"Feature group '{name}' version {version} does not exist")
+        return FeatureGroup(self.root, name, version)
+
+    def get_or_create_feature_group(self, name, version=None, primary_key=None, **kwargs):
+        return FeatureGroup(self.root, name, version or 1, primary_key or [])
+
+
+class Project:
+    def __init__(self, root):
+        self.root = root
+
+    def get_feature_store(self):
+        return FeatureStore(self.root)
+
+
+def login(api_key_value=None, **kwargs):
+    """Drop-in for hopsworks.login(); the store lives under $FEATURE_STORE_STANDIN_PATH."""
+    root = os.environ.get(STANDIN_ENV)
+    if not root:
+        raise RuntimeError(f"❌ {STANDIN_ENV} is not set")
+    return Project(root)
+
+
+def read_stats(root) -> pd.DataFrame:
+    path = os.path.join(root, "stats.jsonl")
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=["op", "fg", "rows", "seconds"])
+    return pd.read_json(path, lines=True)
@@ -1,8 +1,6 @@
-import os
 import requests
-import json
-from datetime import datetime
-from config import AIR_QUALITY_URL, WEATHER_FORECAST_URL, RAW_PATH, SAVE_LOCAL
+from config import AIR_QUALITY_URL, WEATHER_FORECAST_URL, SAVE_LOCAL
+from raw_archive import archive_raw
 
 def fetch_api_data(url: str):
     """Fetch data from given API endpoint."""
@@ -14,28 +12,11 @@ def fetch_api_data(url: str):
         print(f"❌ Error fetching data: {e}")
         return None
 
-def save_combined_raw(aq_data: dict, wx_data: dict, folder_path: str):
-    """Save Air Quality + Weather data together in one JSON file."""
+def save_combined_raw(aq_data: dict, wx_data: dict, folder_path: str = None):
+    """Archive Air Quality + Weather responses together as one compressed columnar chunk."""
     if SAVE_LOCAL:
-        os.makedirs(folder_path, exist_ok=True)
-        
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        filename = f"raw_combined_{timestamp}.json"
-        filepath = os.path.join(folder_path, filename)
-
-        combined = {
-            "metadata": {
-                "saved_at": timestamp,
-                "source": "Open-Meteo APIs",
-            },
-            "air_quality": aq_data,
-            "weather": wx_data
-        }
-
-        with open(filepath, "w") as f:
-            json.dump(combined, f, indent=2)
-
-        print(f"Saved combined data → {filepath}")
+        entry = archive_raw(aq_data, wx_data, path=folder_path)
+        print(f"Archived combined data → {entry['file']} ({entry['rows']} hours, {entry['bytes']} bytes)")
     else:
         print("Skipping local save (running in cloud/CI mode).")
 
@@ -47,7 +28,7 @@ def main():
     wx_data = fetch_api_data(WEATHER_FORECAST_URL)
 
     if aq_data and wx_data:
-        save_combined_raw(aq_data, wx_data, RAW_PATH)
+        save_combined_raw(aq_data, wx_data)
     else:
         print("Could not fetch one or more APIs, skipping save.")
 
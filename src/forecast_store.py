@@ -0,0 +1,174 @@
+# Purpose: Persist every issued forecast (append-only Parquet log) + a memory-mapped
+# "latest forecast" snapshot per location for instant serving.
+# The snapshot is an immutable, versioned .npy per issue plus one JSON pointer
+# (latest_<location>.json: metadata + file name); swapping the pointer is the only
+# step readers can observe, so the array and its metadata always change together.
+
+import os
+import json
+import glob
+import numpy as np
+import pandas as pd
+
+try:
+    from src.config import FORECAST_PATH, LOCATION
+except Exception:
+    from config import FORECAST_PATH, LOCATION
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Fixed-layout record for the mmap snapshot (one row per horizon)
+LATEST_DTYPE = np.dtype([
+    ("horizon", "<i2"),
+    ("target_time", "<M8[s]"),
+    ("predicted_aqi", "<f4"),
+    ("lower_aqi", "<f4"),
+    ("upper_aqi", "<f4"),
+])
+
+
+def _store_dir(path=None):
+    return path or os.path.join(BASE_DIR, FORECAST_PATH)
+
+
+def _issue_key(issue_time):
+    return pd.Timestamp(issue_time).strftime("%Y%m%dT%H%M%S")
+
+
+def append_forecast(forecast: pd.DataFrame, issue_time, model_version: str,
+                    location: str = LOCATION, origin=None, path=None):
+    """
+    Append one issued forecast to the log and refresh the latest snapshot.
+    `forecast` needs 'datetime' (target time) and 'predicted_AQI' columns
+    (plus optional 'lower_AQI' / 'upper_AQI' interval bounds); horizons are counted in hours from `origin` (the last observed hour,
+    defaults to the issue time). Returns the path of the written log part.
+    """
+    root = _store_dir(path)
+    issue_time = pd.Timestamp(issue_time)
+    origin = pd.Timestamp(origin) if origin is not None else issue_time
+
+    target = pd.to_datetime(forecast["datetime"])
+    records = pd.DataFrame({
+        "issue_time": issue_time,
+        "location": location,
+        "horizon": ((target - origin) / pd.Timedelta(hours=1)).round().astype("int16"),
+        "target_time": target,
+        "predicted_aqi": forecast["predicted_AQI"].astype("float32"),
+        "model_version": model_version,
+    })
+    if "lower_AQI" in forecast.columns and "upper_AQI" in forecast.columns:
+        records["lower_aqi"] = forecast["lower_AQI"].astype("float32").to_numpy()
+        records["upper_aqi"] = forecast["upper_AQI"].astype("float32").to_numpy()
+
+    # 1. Append-only log: one immutable Parquet part per issue, file name = issue time
+    #    → listing the partition is the issue-time index
+    part_dir = os.path.join(root, "log", f"location={location}", f"issue_date={issue_time.date()}")
+    os.makedirs(part_dir, exist_ok=True)
+    part_path = os.path.join(part_dir, f"forecast_{_issue_key(issue_time)}.parquet")
+    if os.path.exists(part_path):
+        raise FileExistsError(f"❌ Forecast already issued at {issue_time} for '{location}'")
+    records.to_parquet(part_path, index=False, compression="zstd")
+
+    # 2. Latest snapshot (only moves forward in issue time)
+    current = load_latest_meta(location, path)
+    if current is None or pd.Timestamp(current["issue_time"]) <= issue_time:
+        write_latest(records, location, path)
+
+    return part_path
+
+
+def write_latest(records: pd.DataFrame, location: str = LOCATION, path=None, keep=2):
+    """Write a versioned fixed-layout .npy, then atomically swap the JSON pointer to it."""
+    root = _store_dir(path)
+    os.makedirs(root, exist_ok=True)
+
+    arr = np.empty(len(records), dtype=LATEST_DTYPE)
+    arr["horizon"] = records["horizon"].to_numpy()
+    arr["target_time"] = pd.to_datetime(records["target_time"]).to_numpy().astype("datetime64[s]")
+    arr["predicted_aqi"] = records["predicted_aqi"].to_numpy()
+    for col in ("lower_aqi", "upper_aqi"):
+        arr[col] = records[col].to_numpy() if col in records.columns else np.nan
+
+    issue_time = records["issue_time"].iloc[0]
+    npy_file = f"latest_{location}_{_issue_key(issue_time)}.npy"
+    npy_path = os.path.join(root, npy_file)
+    meta_path = os.path.join(root, f"latest_{location}.json")
+    meta = {
+        "issue_time": str(issue_time),
+        "model_version": str(records["model_version"].iloc[0]),
+        "location": location,
+        "rows": int(len(arr)),
+        "file": npy_file,
+    }
+
+    # 1. The versioned array is complete on disk before anything points at it
+    with open(npy_path + ".tmp", "wb") as f:
+        np.save(f, arr)
+    os.replace(npy_path + ".tmp", npy_path)
+
+    # 2. One rename publishes array + metadata together
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+
+    # 3. Drop old versions (the previous one stays for readers that just read the old pointer)
+    others = sorted((f for f in glob.glob(os.path.join(root, f"latest_{location}_*.npy"))
+                     if os.path.basename(f) != npy_file), key=os.path.basename)
+    for old in others[:max(len(others) - (keep - 1), 0)]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass   # still mapped by a reader (Windows) → removed on a later write
+
+
+def load_latest_meta(location: str = LOCATION, path=None):
+    meta_path = os.path.join(_store_dir(path), f"latest_{location}.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def load_latest(location: str = LOCATION, path=None):
+    """
+    Return the current forecast as a DataFrame (datetime, horizon, predicted_AQI
+    [, lower_AQI, upper_AQI]) backed by a memory-mapped array, plus its metadata — or (None, None).
+    """
+    meta = load_latest_meta(location, path)
+    if meta is None:
+        return None, None
+    # Pointers written before versioned snapshots name no file → the old fixed name
+    npy_path = os.path.join(_store_dir(path), meta.get("file", f"latest_{location}.npy"))
+    if not os.path.exists(npy_path):
+        return None, None
+
+    arr = np.load(npy_path, mmap_mode="r")
+    df = pd.DataFrame({
+        "datetime": arr["target_time"].astype("datetime64[ns]"),
+        "horizon": arr["horizon"],
+        "predicted_AQI": arr["predicted_aqi"].astype(float),
+    })
+    # Snapshots written before intervals existed have no bound fields
+    if "lower_aqi" in arr.dtype.names:
+        df["lower_AQI"] = arr["lower_aqi"].astype(float)
+        df["upper_AQI"] = arr["upper_aqi"].astype(float)
+    return df, meta
+
+
+def read_forecasts(start=None, end=None, location: str = LOCATION, path=None) -> pd.DataFrame:
+    """Read issued forecasts with start <= issue_time <= end (file names are the index)."""
+    pattern = os.path.join(_store_dir(path), "log", f"location={location}", "issue_date=*", "forecast_*.parquet")
+    files = sorted(glob.glob(pattern), key=os.path.basename)
+
+    lo = _issue_key(start) if start is not None else None
+    hi = _issue_key(end) if end is not None else None
+    selected = []
+    for f in files:
+        key = os.path.basename(f)[len("forecast_"):-len(".parquet")]
+        if (lo is None or key >= lo) and (hi is None or key <= hi):
+            selected.append(f)
+
+    if not selected:
+        return pd.DataFrame(columns=["issue_time", "location", "horizon",
+                                     "target_time", "predicted_aqi", "model_version"])
+    return pd.concat([pd.read_parquet(f) for f in selected], ignore_index=True)
@@ -0,0 +1,319 @@
+# Purpose: Always-on streaming ingestion — polls Open-Meteo per location and
+# micro-batches only new hours into the feature store.
+
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import requests
+import pandas as pd
+
+try:
+    from src.config import (
+        LOCATIONS, INGEST_QUEUE_SIZE, INGEST_BATCH_ROWS, INGEST_FLUSH_SECONDS,
+        INGEST_STATE_PATH, REVISION_CONTEXT_HOURS, air_quality_url, weather_forecast_url
+    )
+    from src.polars_backend import clean_and_add_features
+    from src.payload_validation import check_fetch
+except ModuleNotFoundError:
+    from config import (
+        LOCATIONS, INGEST_QUEUE_SIZE, INGEST_BATCH_ROWS, INGEST_FLUSH_SECONDS,
+        INGEST_STATE_PATH, REVISION_CONTEXT_HOURS, air_quality_url, weather_forecast_url
+    )
+    from polars_backend import clean_and_add_features
+    from payload_validation import check_fetch
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Raw context kept per location: 24h rolling / lag features, plus in AQI_MODE=official the
+# 12h NowCast (and 8h / 24h averages) behind the oldest of those hours → same as revision ingest
+CONTEXT_HOURS = REVISION_CONTEXT_HOURS
+
+
+def hopsworks_sink(location: str, df: pd.DataFrame):
+    """Default sink: insert into the location's Hopsworks feature group (+ local online store)."""
+    try:
+        from src.upload_to_hopswork import upload_to_hopsworks
+    except ModuleNotFoundError:
+        from upload_to_hopswork import upload_to_hopsworks
+    upload_to_hopsworks(df, location=location)
+
+
+class IngestDaemon:
+    """
+    Long-running asyncio service:
+      • one poller task per location fetches the AQ + weather APIs every interval
+      • only hours newer than the checkpoint go through AQI + feature engineering
+        (with the last 24 raw hours as context for rolling/lag features)
+      • a bounded queue applies backpressure to pollers when writes fall behind
+      • a writer task micro-batches rows per location into the sink
+      • state (last written hour + context) is checkpointed after every flush
+      • a failed write bumps the location's generation: rows polled on top of the failed
+        batch are discarded and re-fetched from the rolled-back cursor
+    """
+
+    def __init__(self, locations=None, sink=None, state_path=None,
+                 queue_size=INGEST_QUEUE_SIZE, batch_rows=INGEST_BATCH_ROWS,
+                 flush_seconds=INGEST_FLUSH_SECONDS, aq_base=None, wx_base=None,
+                 include_future=False):
+        self.locations = locations or LOCATIONS
+        self.sink = sink or hopsworks_sink
+        self.state_path = state_path or os.path.join(BASE_DIR, INGEST_STATE_PATH)
+        self.queue_size = queue_size
+        self.batch_rows = batch_rows
+        self.flush_seconds = flush_seconds
+        self.aq_base = aq_base
+        self.wx_base = wx_base
+        self.include_future = include_future
+
+        self.state = self._load_state()
+        self.seen = {loc: s["last_hour"] for loc, s in self.state.items() if s.get("last_hour")}
+        self.context = {loc: pd.DataFrame(s.get("context", [])) for loc, s in self.state.items()}
+        self.generation = {}
+
+        self.metrics = {
+            "polls": 0,
+            "fetch_errors": 0,
+            "rows_ingested": 0,
+            "batches_written": 0,
+            "write_errors": 0,
+            "rows_discarded": 0,
+            "backpressure_waits": 0,
+            "queue_depth": 0,
+            "freshness_lag_seconds": {},   # now - newest hour written, per location
+            "e2e_latency_seconds": {},     # fetch → written, per location (last batch)
+        }
+        self._stop = None
+        self._queue = None
+
+    # --- State checkpointing ---
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, default=str)
+        os.replace(tmp, self.state_path)
+
+    # --- Fetch + incremental features ---
+    def _fetch(self, lat, lon):
+        aq = requests.get(air_quality_url(lat, lon, base=self.aq_base), timeout=15)
+        wx = requests.get(weather_forecast_url(lat, lon, base=self.wx_base), timeout=15)
+        aq.raise_for_status()
+        wx.raise_for_status()
+        check_fetch(aq.json(), wx.json())
+
+        aq_df = pd.DataFrame(aq.json()["hourly"])
+        wx_df = pd.DataFrame(wx.json()["hourly"])
+        raw = pd.merge(aq_df, wx_df, on="time", how="inner")
+        raw.rename(columns={"time": "datetime"}, inplace=True)
+        raw["datetime"] = pd.to_datetime(raw["datetime"], errors="coerce")
+        return raw.dropna(subset=["datetime"])
+
+    def _new_rows(self, location, raw):
+        """Return (engineered rows, new cursor, new context) for hours after the cursor, or None."""
+        if not self.include_future:
+            now = pd.Timestamp.now(tz="UTC").tz_localize(None).floor("h")
+            raw = raw[raw["datetime"] <= now]
+
+        last = self.seen.get(location)
+        new = raw if last is None else raw[raw["datetime"] > pd.Timestamp(last)]
+        if new.empty:
+            return None
+
+        context = self.context.get(location, pd.DataFrame())
+        if not context.empty:
+            context = context.assign(datetime=pd.to_datetime(context["datetime"]))
+        window = pd.concat([context, new], ignore_index=True)
+        window = window.drop_duplicates(subset=["datetime"], keep="last")
+
+        featured = clean_and_add_features(window)
+        featured = featured[featured["datetime"].isin(new["datetime"])]
+
+        context = window.sort_values("datetime").tail(CONTEXT_HOURS).reset_index(drop=True)
+        return featured, str(new["datetime"].max()), context
+
+    async def _poll_location(self, location, lat, lon, interval, max_polls=None):
+        polls = 0
+        while not self._stop.is_set():
+            fetched_at = time.time()
+            generation = self.generation.get(location, 0)
+            try:
+                raw = await asyncio.to_thread(self._fetch, lat, lon)
+                result = await asyncio.to_thread(self._new_rows, location, raw)
+                self.metrics["polls"] += 1
+                # A write failed meanwhile → the cursor was rolled back, these rows are stale
+                if result is not None and not self._is_stale(location, generation):
+                    rows, cursor, context = result
+                    # Advance the in-memory cursor + context (committed to disk after the write)
+                    self.seen[location] = cursor
+                    self.context[location] = context
+                    if not rows.empty:
+                        if self._queue.full():
+                            self.metrics["backpressure_waits"] += 1
+                        await self._queue.put((location, rows, fetched_at, generation))
+                        self.metrics["queue_depth"] = self._queue.qsize()
+            except Exception as e:
+                self.metrics["fetch_errors"] += 1
+                print(f"⚠️ [{location}] poll failed: {e}")
+
+            polls += 1
+            if max_polls is not None and polls >= max_polls:
+                break
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+    # --- Micro-batched writer ---
+    def _is_stale(self, location, generation):
+        return generation != self.generation.get(location, 0)
+
+    async def _flush(self, pending):
+        for location, items in pending.items():
+            self.metrics["rows_discarded"] += sum(len(rows) for rows, _, g in items if self._is_stale(location, g))
+            items = [item for item in items if not self._is_stale(location, item[2])]
+            if not items:
+                continue
+            df = pd.concat([rows for rows, _, _ in items], ignore_index=True)
+            df = df.drop_duplicates(subset=["datetime"], keep="last")
+            try:
+                await asyncio.to_thread(self.sink, location, df.copy())
+            except Exception as e:
+                self.metrics["write_errors"] += 1
+                print(f"❌ [{location}] write failed, rows will be re-fetched: {e}")
+                # Roll back the cursor to the last committed hour and invalidate everything
+                # polled on top of it (queued or in flight), so nothing checkpoints past the gap
+                self.generation[location] = self.generation.get(location, 0) + 1
+                committed = self.state.get(location, {})
+                self.seen[location] = committed.get("last_hour")
+                self.context[location] = pd.DataFrame(committed.get("context", []))
+                continue
+
+            now = time.time()
+            newest = df["datetime"].max()
+            self.metrics["rows_ingested"] += len(df)
+            self.metrics["batches_written"] += 1
+            self.metrics["freshness_lag_seconds"][location] = round(
+                (pd.Timestamp.now(tz="UTC").tz_localize(None) - newest).total_seconds(), 1)
+            self.metrics["e2e_latency_seconds"][location] = round(
+                now - min(fetched_at for _, fetched_at, _ in items), 3)
+
+            context = self.context.get(location, pd.DataFrame())
+            self.state[location] = {
+                "last_hour": str(newest),
+                "context": context.astype({"datetime": str}).to_dict(orient="records") if not context.empty else [],
+                "updated_at": now,
+            }
+        self._save_state()
+
+    async def _writer(self):
+        pending, rows, deadline = {}, 0, None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                item = None
+
+            if item is not None:
+                if item == "STOP":
+                    break
+                location, df, fetched_at, generation = item
+                if self._is_stale(location, generation):
+                    self.metrics["rows_discarded"] += len(df)
+                    continue
+                pending.setdefault(location, []).append((df, fetched_at, generation))
+                rows += len(df)
+                deadline = deadline or time.monotonic() + self.flush_seconds
+                self.metrics["queue_depth"] = self._queue.qsize()
+
+            if pending and (rows >= self.batch_rows or time.monotonic() >= deadline):
+                await self._flush(pending)
+                pending, rows, deadline = {}, 0, None
+
+        # Drain on shutdown
+        if pending:
+            await self._flush(pending)
+
+    # --- Lifecycle ---
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    async def run(self, max_polls=None, install_signal_handlers=True):
+        self._stop = asyncio.Event()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+
+        if install_signal_handlers:
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.add_signal_handler(sig, self.stop)
+                except (NotImplementedError, RuntimeError):
+                    pass  # e.g. Windows / non-main thread
+
+        print(f"🚀 Ingestion daemon started for {list(self.locations)}")
+        writer = asyncio.create_task(self._writer())
+        pollers = [
+            asyncio.create_task(self._poll_location(loc, lat, lon, interval, max_polls))
+            for loc, (lat, lon, interval) in self.locations.items()
+        ]
+
+        await asyncio.gather(*pollers)
+        await self._queue.put("STOP")
+        await writer
+        self._save_state()
+        print(f"🛑 Ingestion daemon stopped. Metrics: {json.dumps(self.metrics)}")
+        return self.metrics
+
+
+# --- Run standalone ---
+#   python src/ingest_daemon.py            → poll the real APIs until SIGINT/SIGTERM
+#   python src/ingest_daemon.py --replay   → short run against the local replay API
+if __name__ == "__main__":
+    if "--replay" in sys.argv:
+        import tempfile
+        try:
+            from src.replay_api import start_replay_server
+        except ModuleNotFoundError:
+            from replay_api import start_replay_server
+
+        server, aq_base, wx_base = start_replay_server(step_hours=6)
+        written, calls = [], []
+
+        def memory_sink(location, df):
+            calls.append(len(df))
+            if len(calls) == 2:                # one transient store outage
+                raise ConnectionError("feature store unavailable")
+            written.append(df)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            state_path = os.path.join(tmp, "state.json")
+            locations = {name: (lat, lon, 0.05) for name, (lat, lon, _) in LOCATIONS.items()}
+
+            daemon = IngestDaemon(locations, sink=memory_sink, state_path=state_path,
+                                  batch_rows=12, flush_seconds=0.2,
+                                  aq_base=aq_base, wx_base=wx_base)
+            metrics = asyncio.run(daemon.run(max_polls=4))
+
+            # Restart from the checkpoint: nothing new may be re-ingested
+            resumed = IngestDaemon(locations, sink=memory_sink, state_path=state_path,
+                                   aq_base=aq_base, wx_base=wx_base)
+            print(f"🔁 Resumed checkpoint: {resumed.seen}")
+        server.shutdown()
+
+        out = pd.concat(written, ignore_index=True)
+        assert out["datetime"].is_unique, "duplicate hours were written"
+        gaps = out["datetime"].sort_values().diff().dropna() != pd.Timedelta(hours=1)
+        assert metrics["write_errors"] == 1 and not gaps.any(), "a failed batch left a gap"
+        print(f"✅ Replay run wrote {len(out)} unique hours in {metrics['batches_written']} batches")
+    else:
+        asyncio.run(IngestDaemon().run())
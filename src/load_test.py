@@ -0,0 +1,199 @@
+# Purpose: End-to-end load test — run the real backfill, feature pipeline, training and
+# prediction code against local stand-ins (synthetic Open-Meteo + file-backed feature store)
+# at N× volume and report throughput, per-stage latency and peak memory.
+# N× = N× the history for backfill / train / predict (one location, as in production) and
+# N locations for the feature pipeline, each written to its own feature group.
+# Usage: python src/load_test.py [--scales 1,10,100] [--stages backfill,...] [--out report.json]
+
+import os
+import sys
+import json
+import glob
+import shutil
+import tempfile
+import subprocess
+from datetime import datetime, timedelta
+import pandas as pd
+
+try:
+    from src.config import LOCATION, LAT, LON, AQ_HOURLY, WX_HOURLY, air_quality_url, weather_forecast_url
+    from src.synthetic_api import start_synthetic_server
+    from src.feature_store_standin import STANDIN_ENV, read_stats
+except ModuleNotFoundError:
+    from config import LOCATION, LAT, LON, AQ_HOURLY, WX_HOURLY, air_quality_url, weather_forecast_url
+    from synthetic_api import start_synthetic_server
+    from feature_store_standin import STANDIN_ENV, read_stats
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+STAGES = ["backfill", "backfill_upload", "feature_pipeline", "train", "predict"]
+
+# Runs inside a fresh interpreter per stage → peak RSS is per stage.
+# Each run applies "module.attr" patches (e.g. per-location URLs) and executes the real script.
+RUNNER = r"""
+import sys, json, time, runpy, resource, importlib
+spec = json.loads(sys.argv[1])
+t0 = time.perf_counter()
+for patches in spec["runs"]:
+    for target, value in patches.items():
+        module, attr = target.rsplit(".", 1)
+        setattr(importlib.import_module(module), attr, value)
+    try:
+        if spec.get("script"):
+            runpy.run_path(spec["script"], run_name="__main__")
+        else:
+            exec(spec["code"], {"__name__": "__main__"})
+    except SystemExit:
+        pass
+print("STAGE_JSON " + json.dumps({
+    "seconds": time.perf_counter() - t0,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+BACKFILL_UPLOAD = """
+import pandas as pd
+from clean_data import clean_data
+from process_features import add_features
+from upload_to_hopswork import upload_to_hopsworks
+df = pd.read_csv("data/historical/historical_karachi_1y.csv")
+upload_to_hopsworks(add_features(clean_data(df)))
+"""
+
+
+def _historic_url(base, lat, lon, start, end, hourly):
+    return f"{base}?latitude={lat}&longitude={lon}&start_date={start}&end_date={end}&hourly={hourly}"
+
+
+def _locations(n):
+    """n distinct (name, lat, lon) on a 0.1° grid around Karachi; the first one is LOCATION itself."""
+    side = int(n ** 0.5) + 1
+    return [(LOCATION if i == 0 else f"{LOCATION}_grid{i}",
+             round(LAT + 0.1 * (i // side), 4), round(LON + 0.1 * (i % side), 4)) for i in range(n)]
+
+
+def make_sandbox(root):
+    """Copy of src/ whose data/ + models/ live under `root`, plus the `hopsworks` shim."""
+    src = os.path.join(root, "src")
+    os.makedirs(src)
+    for f in glob.glob(os.path.join(SRC_DIR, "*.py")):
+        shutil.copy(f, src)
+    shim = os.path.join(root, "shim")
+    os.makedirs(shim)
+    with open(os.path.join(shim, "hopsworks.py"), "w") as f:
+        f.write("from feature_store_standin import login  # load-test stand-in\n")
+    return src, shim
+
+
+def run_stage(name, spec, sandbox_src, env, fs_root, api_stats):
+    before_fs = len(read_stats(fs_root))
+    before_api = dict(api_stats)
+
+    proc = subprocess.run([sys.executable, "-c", RUNNER, json.dumps(spec)],
+                          cwd=sandbox_src, env=env, capture_output=True, text=True)
+    line = [l for l in proc.stdout.splitlines() if l.startswith("STAGE_JSON ")]
+    result = json.loads(line[-1][len("STAGE_JSON "):]) if line else {"seconds": None, "peak_rss_mb": None}
+
+    fs = read_stats(fs_root).iloc[before_fs:]
+    rows = int(fs.loc[fs["op"] == ("read" if name in ("train", "predict") else "insert"), "rows"].sum()) if len(fs) else 0
+    if name == "backfill":
+        hist = os.path.join(sandbox_src, "data", "historical", "historical_karachi_1y.csv")
+        rows = sum(1 for _ in open(hist)) - 1 if os.path.exists(hist) else 0
+
+    errors = [l.strip() for l in proc.stdout.splitlines() if "❌" in l or "Traceback" in l]
+    if proc.returncode != 0:
+        errors.append(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}")
+
+    seconds = result["seconds"]
+    return {
+        "stage": name,
+        "seconds": round(seconds, 3) if seconds is not None else None,
+        "rows": rows,
+        "rows_per_s": round(rows / seconds, 1) if seconds and rows else None,
+        "peak_rss_mb": round(result["peak_rss_mb"], 1) if result["peak_rss_mb"] else None,
+        "api_requests": api_stats["requests"] - before_api["requests"],
+        "api_mb": round((api_stats["bytes"] - before_api["bytes"]) / 1e6, 2),
+        "errors": errors[:3],
+    }
+
+
+def run_load_test(scale, stages=STAGES, base_years=1):
+    """One full pass at `scale`× volume: scale locations, scale×base_years of history."""
+    server, aq_base, wx_base, archive_base = start_synthetic_server()
+    n_locations, years = scale, scale * base_years
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix=f"aqi_load_{scale}x_") as root:
+            sandbox_src, shim = make_sandbox(root)
+            fs_root = os.path.join(root, "feature_store")
+            env = {k: v for k, v in os.environ.items() if k != "TRAIN_MODE"}
+            env.update({
+                "PYTHONPATH": shim,
+                STANDIN_ENV: fs_root,
+                "HOPSWORKS_API_KEY": "load-test",
+                "SAVE_LOCAL": "false",
+                "AIR_QUALITY_BASE": aq_base,
+                "WEATHER_FORECAST_BASE": wx_base,
+            })
+
+            end = (datetime.now() - timedelta(days=1)).date()
+            start = end - timedelta(days=int(365 * years))
+            specs = {
+                "backfill": {"script": "backfill_data.py", "runs": [{
+                    "config.aq_historic_url": _historic_url(aq_base, LAT, LON, start, end, AQ_HOURLY),
+                    "config.weather_historic_url": _historic_url(archive_base, LAT, LON, start, end, WX_HOURLY),
+                }]},
+                "backfill_upload": {"code": BACKFILL_UPLOAD, "runs": [{}]},
+                # Per-location name → own revision hashes + own feature group (no overwrites)
+                "feature_pipeline": {"script": "run_feature_pipeline.py", "runs": [{
+                    "config.LOCATION": name,
+                    "config.AIR_QUALITY_URL": air_quality_url(lat, lon, base=aq_base),
+                    "config.WEATHER_FORECAST_URL": weather_forecast_url(lat, lon, base=wx_base),
+                } for name, lat, lon in _locations(n_locations)]},
+                "train": {"script": "train_model.py", "runs": [{}]},
+                "predict": {"script": "predict_evaluate.py", "runs": [{}]},
+            }
+
+            for name in stages:
+                print(f"⏳ [{scale}x] {name} ...", flush=True)
+                res = run_stage(name, specs[name], sandbox_src, env, fs_root, server.stats)
+                res.update({"scale": scale, "locations": n_locations if name == "feature_pipeline" else 1,
+                            "history_years": years})
+                results.append(res)
+                print(f"   {res['seconds']}s | rows {res['rows']} | peak {res['peak_rss_mb']} MB"
+                      + (f" | ⚠️ {res['errors']}" if res["errors"] else ""), flush=True)
+    finally:
+        server.shutdown()
+    return results
+
+
+def main():
+    def arg(flag, default):
+        return sys.argv[sys.argv.index(flag) + 1] if flag in sys.argv else default
+
+    scales = [int(s) for s in arg("--scales", "1,10").split(",")]
+    stages = arg("--stages", ",".join(STAGES)).split(",")
+    out = arg("--out", None)
+
+    results = []
+    for scale in scales:
+        results.extend(run_load_test(scale, stages))
+
+    report = pd.DataFrame(results)[["scale", "locations", "history_years", "stage", "seconds",
+                                    "rows", "rows_per_s", "peak_rss_mb", "api_requests", "api_mb"]]
+    print("\n📈 Load-test report")
+    print(report.to_string(index=False))
+
+    failed = [r for r in results if r["errors"]]
+    for r in failed:
+        print(f"⚠️ [{r['scale']}x] {r['stage']}: {r['errors']}")
+
+    if out:
+        with open(out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Report saved → {out}")
+    sys.exit(1 if failed else 0)
+
+
+# --- Run standalone ---
+if __name__ == "__main__":
+    main()
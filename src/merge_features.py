@@ -4,11 +4,13 @@ import pandas as pd
 def merge_all():
     hist = pd.read_csv("data/historical/historical_karachi_1y.csv")
 
-    processed_files = glob.glob("data/processed/*.csv")
+    # Oldest fetch first, so later fetches (upstream revisions) win on duplicate hours
+    processed_files = sorted(glob.glob("data/processed/*.csv"), key=os.path.getmtime)
     latest = pd.concat([pd.read_csv(f) for f in processed_files]) if processed_files else pd.DataFrame()
 
     df = pd.concat([hist, latest])
-    df.drop_duplicates(subset=["datetime"], inplace=True)
+    df["datetime"] = pd.to_datetime(df["datetime"])
+    df.drop_duplicates(subset=["datetime"], keep="last", inplace=True)
     df.sort_values("datetime", inplace=True)
 
     os.makedirs("data/final", exist_ok=True)
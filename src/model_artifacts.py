@@ -0,0 +1,84 @@
+# Purpose: Save / load the trained model together with its metadata (feature list, metrics)
+
+import os
+import json
+from datetime import datetime
+from joblib import dump, load
+
+try:
+    from src.process_features import MODEL_FEATURES
+except Exception:
+    from process_features import MODEL_FEATURES
+
+MODEL_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../models"))
+METADATA_FILE = "model_metadata.json"
+DEFAULT_MODEL_FILE = "best_model_random_forest.pkl"
+
+
+def model_filename(model_name: str) -> str:
+    return f"best_model_{model_name.strip().replace(' ', '_').lower()}.pkl"
+
+
+def save_model_artifact(model, model_name, features, metrics=None, scaler=None,
+                        extra=None, model_dir=MODEL_DIR):
+    """
+    Dump the model (and scaler, if any) and write model_metadata.json next to it.
+    The metadata records the exact feature list the model was trained on so
+    inference requests the same columns from process_features.add_features.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+
+    model_file = model_filename(model_name)
+    dump(model, os.path.join(model_dir, model_file))
+
+    scaler_file = None
+    if scaler is not None:
+        scaler_file = "scaler.pkl"
+        dump(scaler, os.path.join(model_dir, scaler_file))
+
+    trained_at = datetime.now()
+    metadata = {
+        "model_name": model_name,
+        "model_version": trained_at.strftime("%Y%m%d%H%M%S"),
+        "model_file": model_file,
+        "scaler_file": scaler_file,
+        "features": list(features),
+        "metrics": {k: float(v) for k, v in (metrics or {}).items()},
+        "trained_at": trained_at.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    metadata.update(extra or {})
+
+    with open(os.path.join(model_dir, METADATA_FILE), "w") as f:
+        json.dump(metadata, f, indent=2)
+
+    return metadata
+
+
+def load_model_metadata(model_dir=MODEL_DIR):
+    """Read model_metadata.json, falling back to the legacy Random Forest artifact."""
+    path = os.path.join(model_dir, METADATA_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {
+        "model_name": "Random Forest",
+        "model_version": "legacy",
+        "model_file": DEFAULT_MODEL_FILE,
+        "scaler_file": None,
+        "features": list(MODEL_FEATURES),
+        "metrics": {},
+    }
+
+
+def load_model_artifact(model_dir=MODEL_DIR):
+    """Return (model, metadata) for the current best model."""
+    metadata = load_model_metadata(model_dir)
+    model = load(os.path.join(model_dir, metadata["model_file"]))
+
+    # Ridge is trained on scaled inputs → serve it behind its scaler
+    if metadata.get("scaler_file"):
+        from sklearn.pipeline import Pipeline
+        scaler = load(os.path.join(model_dir, metadata["scaler_file"]))
+        model = Pipeline([("scaler", scaler), ("model", model)])
+
+    return model, metadata
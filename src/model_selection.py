@@ -0,0 +1,167 @@
+# Purpose: Latency- and size-aware model selection. Each trained candidate is profiled the
+# way it will be served (serialized size, load time, 1-row / 72-row predict latency, peak
+# inference memory); candidates over a hard budget are dropped and the rest are ranked on
+# RMSE × (1 + MODEL_COST_WEIGHT × relative cost).
+
+import io
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from joblib import dump, load
+
+try:
+    from src.config import (
+        MODEL_COST_WEIGHT, MODEL_MAX_SIZE_MB, MODEL_MAX_LOAD_MS,
+        MODEL_MAX_SINGLE_MS, MODEL_MAX_BATCH_MS, MODEL_PROFILE_REPEATS
+    )
+except Exception:
+    from config import (
+        MODEL_COST_WEIGHT, MODEL_MAX_SIZE_MB, MODEL_MAX_LOAD_MS,
+        MODEL_MAX_SINGLE_MS, MODEL_MAX_BATCH_MS, MODEL_PROFILE_REPEATS
+    )
+
+BATCH_ROWS = 72                            # one 3-day hourly forecast
+PROFILE_COLUMNS = ["size_mb", "load_ms", "single_ms", "batch_ms", "peak_mb"]
+# Below these, differences are measurement noise (keeps a near-zero cost from dominating the ratios)
+COST_FLOORS = {"size_mb": 0.01, "load_ms": 0.1, "single_ms": 0.1, "batch_ms": 0.1, "peak_mb": 0.01}
+BUDGETS = {
+    "size_mb": MODEL_MAX_SIZE_MB,
+    "load_ms": MODEL_MAX_LOAD_MS,
+    "single_ms": MODEL_MAX_SINGLE_MS,
+    "batch_ms": MODEL_MAX_BATCH_MS,
+}
+
+
+def selection_config():
+    """Everything that can change which model wins (part of the training fingerprint)."""
+    return {"cost_weight": MODEL_COST_WEIGHT, "budgets": BUDGETS, "batch_rows": BATCH_ROWS}
+
+
+def _median_ms(fn, repeats):
+    fn()                                   # warm-up (lazy init, caches)
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times) * 1000)
+
+
+def profile_model(model, X: pd.DataFrame, repeats=MODEL_PROFILE_REPEATS):
+    """
+    Serving cost of a fitted model (pass Ridge as its scaler Pipeline, i.e. as served).
+    Size and load time come from an in-memory joblib round trip; latencies are medians;
+    peak_mb is the Python/numpy heap peak of a 72-row predict (tracemalloc).
+    """
+    buffer = io.BytesIO()
+    dump(model, buffer)
+    blob = buffer.getvalue()
+    load_ms = _median_ms(lambda: load(io.BytesIO(blob)), max(1, repeats // 4))
+
+    single = X.iloc[-1:]
+    batch = X.iloc[-BATCH_ROWS:]
+    single_ms = _median_ms(lambda: model.predict(single), repeats)
+    batch_ms = _median_ms(lambda: model.predict(batch), repeats)
+
+    tracemalloc.start()
+    model.predict(batch)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "size_mb": round(len(blob) / 2**20, 3),
+        "load_ms": round(load_ms, 3),
+        "single_ms": round(single_ms, 3),
+        "batch_ms": round(batch_ms, 3),
+        "peak_mb": round(peak / 2**20, 3),
+    }
+
+
+def select_model(results: pd.DataFrame, profiles: pd.DataFrame, cost_weight=MODEL_COST_WEIGHT, budgets=None):
+    """
+    results: RMSE / MAE / R² per model; profiles: profile_model() per model.
+    Returns (best model name, table with cost / score / within_budget per candidate).
+    relative_cost is the mean log2 ratio of each cost to the cheapest candidate's, so a
+    model 2× bigger and slower everywhere pays cost_weight × RMSE; cost_weight = 0 ranks
+    on RMSE alone. If no candidate fits the budgets, the best-scoring one is still picked.
+    """
+    budgets = BUDGETS if budgets is None else budgets
+    table = results.join(profiles, how="inner")
+
+    within = pd.Series(True, index=table.index)
+    for col, limit in budgets.items():
+        if limit is not None:
+            within &= table[col] <= limit
+    table["within_budget"] = within
+
+    costs = table[PROFILE_COLUMNS].astype(float).clip(lower=pd.Series(COST_FLOORS), axis=1)
+    table["relative_cost"] = np.log2(costs / costs.min()).mean(axis=1).round(4)
+    table["score"] = table["RMSE"] * (1 + cost_weight * table["relative_cost"])
+
+    ranked = table.sort_values(["within_budget", "score"], ascending=[False, True])
+    if not ranked["within_budget"].iloc[0]:
+        print("⚠️ No candidate fits the latency / size budgets → picking the best score anyway")
+    return ranked.index[0], ranked
+
+
+def selection_metadata(best, table, cost_weight=MODEL_COST_WEIGHT, budgets=None):
+    """JSON-friendly record of the decision for model_metadata.json."""
+    return {
+        "selected_by": "rmse_x_cost",
+        "cost_weight": cost_weight,
+        "budgets": BUDGETS if budgets is None else budgets,
+        "serving_profile": {k: float(table.loc[best, k]) for k in PROFILE_COLUMNS},
+        "candidates": {
+            name: {k: (bool(v) if k == "within_budget" else round(float(v), 4)) for k, v in row.items()}
+            for name, row in table[["RMSE"] + PROFILE_COLUMNS + ["relative_cost", "score", "within_budget"]].iterrows()
+        },
+    }
+
+
+# --- Run standalone: profile + select on the local feature snapshot ---
+if __name__ == "__main__":
+    import os
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.linear_model import Ridge
+    from sklearn.metrics import mean_squared_error
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    from xgboost import XGBRegressor
+
+    try:
+        from src.process_features import MODEL_FEATURES
+    except Exception:
+        from process_features import MODEL_FEATURES
+
+    base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    df = pd.read_csv(os.path.join(base, "data/final/final_selected_features.csv")).sort_values("datetime")
+    features = [c for c in MODEL_FEATURES if c in df.columns]
+    split = int(len(df) * 0.8)
+    X_train, y_train = df[features].iloc[:split], df["aqi"].iloc[:split]
+    X_test, y_test = df[features].iloc[split:], df["aqi"].iloc[split:]
+
+    candidates = {
+        "Ridge Regression": make_pipeline(StandardScaler(), Ridge(alpha=1.0)),
+        "Random Forest": RandomForestRegressor(n_estimators=200, random_state=42),
+        "Random Forest (depth 12)": RandomForestRegressor(n_estimators=60, max_depth=12, random_state=42),
+        "XGBoost": XGBRegressor(n_estimators=200, learning_rate=0.1, max_depth=6, subsample=0.8,
+                                colsample_bytree=0.8, random_state=42, tree_method="hist"),
+    }
+    results, profiles = {}, {}
+    for name, model in candidates.items():
+        model.fit(X_train, y_train)
+        results[name] = {"RMSE": float(np.sqrt(mean_squared_error(y_test, model.predict(X_test))))}
+        profiles[name] = profile_model(model, X_test)
+
+    results, profiles = pd.DataFrame(results).T, pd.DataFrame(profiles).T
+    by_rmse = results["RMSE"].idxmin()
+    best, table = select_model(results, profiles)
+    print(table.drop(columns="within_budget").round(3).to_string())
+    print(f"\n🎯 RMSE only → {by_rmse} | cost-aware (weight {MODEL_COST_WEIGHT}) → {best}")
+
+    # cost_weight = 0 must reproduce the plain RMSE ranking; a tight budget must exclude
+    assert select_model(results, profiles, cost_weight=0.0, budgets={})[0] == by_rmse
+    tight = {"size_mb": float(profiles["size_mb"].min())}
+    assert select_model(results, profiles, budgets=tight)[0] == profiles["size_mb"].astype(float).idxmin()
+    print("✅ Budgets are hard limits and cost_weight = 0 reproduces RMSE-only selection")
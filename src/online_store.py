@@ -0,0 +1,137 @@
+# Purpose: Local online store (SQLite) for low-latency latest-feature lookups
+
+import os
+import json
+import sqlite3
+import pandas as pd
+
+try:
+    from src.config import ONLINE_STORE_PATH, ONLINE_STORE_HOURS, LOCATION
+except Exception:
+    from config import ONLINE_STORE_PATH, ONLINE_STORE_HOURS, LOCATION
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class OnlineStore:
+    """
+    Embedded key-value store holding the latest N hours of feature vectors
+    per location, keyed by (location, datetime_str).
+    Each row stores the feature vector as a small JSON document, so a point
+    lookup is a single primary-key seek plus one json.loads.
+    """
+
+    def __init__(self, path=None, max_hours=ONLINE_STORE_HOURS):
+        self.path = path or os.path.join(BASE_DIR, ONLINE_STORE_PATH)
+        self.max_hours = max_hours
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS features ("
+            " location TEXT NOT NULL,"
+            " datetime_str TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " PRIMARY KEY (location, datetime_str)"
+            ") WITHOUT ROWID"
+        )
+        self.conn.commit()
+
+    def write(self, df: pd.DataFrame, location=LOCATION):
+        """Upsert feature rows for a location and trim it to the latest N hours."""
+        df = df.copy()
+        if "datetime_str" not in df.columns:
+            df["datetime_str"] = pd.to_datetime(df["datetime"]).astype(str)
+            df.drop(columns=["datetime"], inplace=True)
+        df["datetime_str"] = pd.to_datetime(df["datetime_str"]).astype(str)
+
+        # Only the newest window is ever served → don't write older rows
+        df = df.sort_values("datetime_str").tail(self.max_hours)
+
+        records = df.to_dict(orient="records")
+        rows = [(location, r["datetime_str"], json.dumps(r, default=float)) for r in records]
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO features (location, datetime_str, payload) VALUES (?, ?, ?)",
+            rows
+        )
+
+        # Trim: keep only the latest max_hours keys for this location
+        self.conn.execute(
+            "DELETE FROM features WHERE location = ? AND datetime_str < ("
+            " SELECT MIN(datetime_str) FROM ("
+            "  SELECT datetime_str FROM features WHERE location = ?"
+            "  ORDER BY datetime_str DESC LIMIT ?))",
+            (location, location, self.max_hours)
+        )
+        self.conn.commit()
+        return len(rows)
+
+    def get_latest(self, location=LOCATION):
+        """Return the newest feature vector for a location as a dict (or None)."""
+        row = self.conn.execute(
+            "SELECT payload FROM features WHERE location = ?"
+            " ORDER BY datetime_str DESC LIMIT 1",
+            (location,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_window(self, location=LOCATION, hours=24):
+        """Return the newest `hours` feature vectors for a location, oldest first."""
+        rows = self.conn.execute(
+            "SELECT payload FROM features WHERE location = ?"
+            " ORDER BY datetime_str DESC LIMIT ?",
+            (location, hours)
+        ).fetchall()
+        return [json.loads(r[0]) for r in reversed(rows)]
+
+    def close(self):
+        self.conn.close()
+
+
+def write_online_features(df: pd.DataFrame, location=LOCATION, path=None):
+    """Convenience wrapper used by the feature pipeline after each upload."""
+    store = OnlineStore(path)
+    try:
+        n = store.write(df, location)
+        print(f"⚡ Online store updated → {n} rows for '{location}' ({store.path})")
+        return n
+    finally:
+        store.close()
+
+
+# --- Run standalone benchmark: online lookups vs reading the offline table ---
+if __name__ == "__main__":
+    import time
+    import tempfile
+
+    offline_path = os.path.join(BASE_DIR, "data", "final", "final_selected_features.csv")
+    if not os.path.exists(offline_path):
+        print(f"❌ File not found → {offline_path}")
+        raise SystemExit(1)
+
+    def best_of(fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - t0)
+        return min(timings) * 1e6, sorted(timings)[len(timings) // 2] * 1e6
+
+    # Offline path: read the full table, take the last row (what the dashboard did)
+    offline_best, offline_median = best_of(lambda: pd.read_csv(offline_path).iloc[-1:], 5)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = OnlineStore(os.path.join(tmp, "bench.db"))
+        store.write(pd.read_csv(offline_path))
+
+        latest_best, latest_median = best_of(lambda: store.get_latest(), 2000)
+        window_best, window_median = best_of(lambda: store.get_window(hours=24), 2000)
+        store.close()
+
+    print("\n⏱️ Latency (best / median, µs)")
+    print(f"Offline read_csv + iloc[-1:] : {offline_best:12.1f} / {offline_median:12.1f}")
+    print(f"Online get_latest()          : {latest_best:12.1f} / {latest_median:12.1f}")
+    print(f"Online get_window(24h)       : {window_best:12.1f} / {window_median:12.1f}")
+    print(f"Speed-up (latest vs offline) : {offline_median / latest_median:,.0f}x")
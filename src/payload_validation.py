@@ -0,0 +1,220 @@
+# Purpose: Fast-fail validation of Open-Meteo payloads before any DataFrame is built.
+# Each endpoint's expectations (variables, units, physical ranges, null budget) are compiled
+# once into arrays; a payload is then checked in a few vectorized passes over one
+# (variables × hours) matrix. Broken structure is rejected, implausible data is quarantined.
+
+import os
+import json
+import time
+import numpy as np
+import pandas as pd
+
+try:
+    from src.config import (
+        AQ_HOURLY, WX_HOURLY, HOURLY_UNITS, VALIDATION_PATH, VALIDATION_MAX_NULL_RATIO, PHYSICAL_RANGES
+    )
+except Exception:
+    from config import (
+        AQ_HOURLY, WX_HOURLY, HOURLY_UNITS, VALIDATION_PATH, VALIDATION_MAX_NULL_RATIO, PHYSICAL_RANGES
+    )
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def compile_spec(variables, max_null_ratio=VALIDATION_MAX_NULL_RATIO):
+    """Per-endpoint expectations as arrays aligned with `variables` (built once at import)."""
+    variables = list(variables)
+    return {
+        "variables": variables,
+        "units": {v: HOURLY_UNITS[v] for v in ["time"] + variables},
+        "lo": np.array([PHYSICAL_RANGES[v][0] for v in variables], dtype=float),
+        "hi": np.array([PHYSICAL_RANGES[v][1] for v in variables], dtype=float),
+        "max_null": float(max_null_ratio),
+    }
+
+
+AQ_SPEC = compile_spec(AQ_HOURLY.split(","))
+WX_SPEC = compile_spec(WX_HOURLY.split(","))
+
+
+def validate_payload(payload, spec):
+    """
+    Check one endpoint response. Returns (report, values matrix or None, hour index or None):
+    report["status"] is "ok", "quarantine" (well-formed but implausible) or "reject"
+    (unusable structure); report["errors"] lists every failed check.
+    """
+    errors = []
+
+    # 1. Schema: hourly block with a time axis and every requested variable
+    hourly = payload.get("hourly") if isinstance(payload, dict) else None
+    if not isinstance(hourly, dict) or not isinstance(hourly.get("time"), list):
+        return {"status": "reject", "errors": ["schema: missing hourly.time"], "hours": 0}, None, None
+    missing = [v for v in spec["variables"] if v not in hourly]
+    if missing:
+        errors.append(f"schema: missing variables {missing}")
+
+    # 2. Units metadata (a silent switch, e.g. ppm or °F, would corrupt every AQI downstream)
+    units = payload.get("hourly_units") or {}
+    changed = {v: units.get(v) for v, unit in spec["units"].items() if v in hourly and units.get(v) != unit}
+    if changed:
+        errors.append(f"units: {changed} (expected {[spec['units'][v] for v in changed]})")
+
+    # 3. Array lengths: every variable spans the time axis
+    n = len(hourly["time"])
+    present = [v for v in spec["variables"] if v in hourly]
+    lengths = np.fromiter((len(hourly[v]) if isinstance(hourly[v], list) else -1 for v in present),
+                          dtype=np.int64, count=len(present))
+    if n == 0:
+        errors.append("length: empty time axis")
+    if (lengths != n).any():
+        errors.append(f"length: {dict(zip(np.array(present)[lengths != n].tolist(), lengths[lengths != n].tolist()))} vs {n} hours")
+    if errors:
+        return {"status": "reject", "errors": errors, "hours": n}, None, None
+
+    # One conversion for all variables: (variables, hours), None → NaN
+    try:
+        values = np.array([hourly[v] for v in spec["variables"]], dtype=float)
+        hours = np.array(hourly["time"], dtype="datetime64[m]")
+    except (TypeError, ValueError) as e:
+        return {"status": "reject", "errors": [f"types: {e}"], "hours": n}, None, None
+
+    # 4. Null ratios per variable (all-null arrays always fail)
+    nulls = np.isnan(values)
+    null_ratio = nulls.mean(axis=1)
+    bad = (null_ratio > spec["max_null"]) | nulls.all(axis=1)
+    if bad.any():
+        errors.append(f"nulls: {dict(zip(np.array(spec['variables'])[bad].tolist(), null_ratio[bad].round(3).tolist()))}")
+
+    # 5. Physical ranges (NaN compares False → nulls are not range violations)
+    out_of_range = ((values < spec["lo"][:, None]) | (values > spec["hi"][:, None])).sum(axis=1)
+    if out_of_range.any():
+        errors.append(f"range: {dict(zip(np.array(spec['variables'])[out_of_range > 0].tolist(), out_of_range[out_of_range > 0].tolist()))} values outside physical limits")
+
+    # 6. Hour continuity: strictly hourly, increasing, no gaps or duplicates
+    steps = np.diff(hours).astype(np.int64)
+    if (steps != 60).any():
+        errors.append(f"continuity: {int((steps != 60).sum())} non-hourly steps (gaps / duplicates / disorder)")
+
+    report = {"status": "quarantine" if errors else "ok", "errors": errors, "hours": n,
+              "null_ratio": dict(zip(spec["variables"], null_ratio.round(4).tolist()))}
+    return report, values, hours
+
+
+def validate_fetch(aq_json, wx_json, quarantine=True, path=None):
+    """
+    Validate both responses of one fetch (plus their shared time axis) and log the cost.
+    Anything not "ok" is written to <VALIDATION_PATH>/quarantine/ for inspection / replay.
+    """
+    t0 = time.perf_counter()
+    aq_report, _, aq_hours = validate_payload(aq_json, AQ_SPEC)
+    wx_report, _, wx_hours = validate_payload(wx_json, WX_SPEC)
+
+    statuses = {aq_report["status"], wx_report["status"]}
+    status = "reject" if "reject" in statuses else "quarantine" if "quarantine" in statuses else "ok"
+    errors = [f"air_quality {e}" for e in aq_report["errors"]] + [f"weather {e}" for e in wx_report["errors"]]
+    if aq_hours is not None and wx_hours is not None and not np.intersect1d(aq_hours, wx_hours).size:
+        status = "reject"
+        errors.append("alignment: air quality and weather share no hours")
+
+    report = {
+        "checked_at": str(pd.Timestamp.now().floor("s")),
+        "status": status,
+        "errors": errors,
+        "hours": {"air_quality": aq_report["hours"], "weather": wx_report["hours"]},
+        "validation_ms": round((time.perf_counter() - t0) * 1000, 3),
+    }
+    if status != "ok" and quarantine:
+        report["quarantined"] = _quarantine(aq_json, wx_json, report, path)
+    _log_report(report, path)
+    return report
+
+
+def check_fetch(aq_json, wx_json, path=None):
+    """validate_fetch that raises ValueError on anything but a clean batch (for pipelines)."""
+    report = validate_fetch(aq_json, wx_json, path=path)
+    if report["status"] != "ok":
+        verdict = "rejected" if report["status"] == "reject" else "quarantined"
+        raise ValueError(f"❌ Payload {verdict} ({report['validation_ms']:.1f} ms): " + "; ".join(report["errors"]))
+    return report
+
+
+def _root(path=None):
+    return path or os.path.join(BASE_DIR, VALIDATION_PATH)
+
+
+def _quarantine(aq_json, wx_json, report, path=None):
+    folder = os.path.join(_root(path), "quarantine")
+    os.makedirs(folder, exist_ok=True)
+    out = os.path.join(folder, f"{report['status']}_{pd.Timestamp.now().strftime('%Y%m%dT%H%M%S%f')}.json")
+    with open(out, "w") as f:
+        json.dump({"report": report, "air_quality": aq_json, "weather": wx_json}, f, default=str)
+    return out
+
+
+def _log_report(report, path=None):
+    os.makedirs(_root(path), exist_ok=True)
+    with open(os.path.join(_root(path), "validation_log.jsonl"), "a") as f:
+        f.write(json.dumps(report) + "\n")
+
+
+def read_validation_log(path=None) -> pd.DataFrame:
+    file = os.path.join(_root(path), "validation_log.jsonl")
+    if not os.path.exists(file):
+        return pd.DataFrame(columns=["checked_at", "status", "errors", "hours", "validation_ms"])
+    return pd.read_json(file, lines=True)
+
+
+# --- Run standalone: clean + corrupted payloads, and the cost per batch ---
+if __name__ == "__main__":
+    import copy
+    import tempfile
+
+    try:
+        from src.synthetic_api import synthetic_hourly
+    except Exception:
+        from synthetic_api import synthetic_hourly
+
+    times = pd.date_range("2025-06-01", periods=48, freq="h")
+
+    def response(spec):
+        return {"hourly_units": dict(spec["units"]),
+                "hourly": synthetic_hourly(24.86, 67.0, times, spec["variables"])}
+
+    aq, wx = response(AQ_SPEC), response(WX_SPEC)
+    wx["hourly"]["relative_humidity_2m"] = np.clip(wx["hourly"]["relative_humidity_2m"], 0, 100).tolist()
+    wx["hourly"]["wind_direction_10m"] = np.mod(wx["hourly"]["wind_direction_10m"], 360).tolist()
+
+    def corrupt(kind, fn):
+        payload = copy.deepcopy(aq if kind == "aq" else wx)
+        fn(payload)
+        return (payload, wx) if kind == "aq" else (aq, payload)
+
+    cases = {
+        "clean": ((aq, wx), "ok"),
+        "all-null pm2_5": (corrupt("aq", lambda p: p["hourly"].update(pm2_5=[None] * 48)), "quarantine"),
+        "short ozone array": (corrupt("aq", lambda p: p["hourly"]["ozone"].pop()), "reject"),
+        "CO switched to mg/m³": (corrupt("aq", lambda p: p["hourly_units"].update(carbon_monoxide="mg/m³")), "reject"),
+        "humidity 140%": (corrupt("wx", lambda p: p["hourly"]["relative_humidity_2m"].__setitem__(5, 140.0)), "quarantine"),
+        "missing hour": (corrupt("wx", lambda p: [p["hourly"][k].pop(10) for k in p["hourly"]]), "quarantine"),
+        "no hourly block": ((aq, {"error": True, "reason": "rate limited"}), "reject"),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, ((aq_case, wx_case), expected) in cases.items():
+            report = validate_fetch(aq_case, wx_case, path=tmp)
+            assert report["status"] == expected, (name, report)
+            print(f"{report['status']:>10}  {name:<22} {report['validation_ms']:6.2f} ms  {'; '.join(report['errors'])[:90]}")
+        assert len(os.listdir(os.path.join(tmp, "quarantine"))) == len(cases) - 1
+
+        # Cost on a long backfill-sized batch (1 year of hours), vs. just building the DataFrames
+        long_times = pd.date_range("2024-01-01", periods=24 * 365, freq="h")
+        big_aq = {"hourly_units": dict(AQ_SPEC["units"]),
+                  "hourly": synthetic_hourly(24.86, 67.0, long_times, AQ_SPEC["variables"])}
+        big_wx = {"hourly_units": dict(WX_SPEC["units"]),
+                  "hourly": synthetic_hourly(24.86, 67.0, long_times, WX_SPEC["variables"])}
+        report = validate_fetch(big_aq, big_wx, quarantine=False, path=tmp)
+        t0 = time.perf_counter()
+        pd.merge(pd.DataFrame(big_aq["hourly"]), pd.DataFrame(big_wx["hourly"]), on="time")
+        frame_ms = (time.perf_counter() - t0) * 1000
+    print(f"⚡ {len(long_times):,}-hour batch validated in {report['validation_ms']:.1f} ms "
+          f"(building + merging its DataFrames alone: {frame_ms:.1f} ms)")
+    print("✅ Every corrupted payload was caught before a DataFrame was built")
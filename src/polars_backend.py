@@ -0,0 +1,322 @@
+# Purpose: Lazy Polars backend for clean_data() + add_features(). The same transformations
+# are expressed as one Polars query plan over Arrow data: it runs multi-threaded, and
+# projection pushdown means unrequested features (and unused source columns) are never computed.
+# Select with PIPELINE_BACKEND=polars; clean_and_add_features() dispatches between backends.
+
+import os
+import io
+import contextlib
+import numpy as np
+import pandas as pd
+
+try:
+    from src.config import PIPELINE_BACKEND, AQI_MODE
+    from src.clean_data import clean_data
+    from src.process_features import add_features, resolve_features, FEATURE_GRAPH, STORE_FEATURES, AQI_SUB_INDICES
+    from src.aqi_utils import (
+        MW, BP_PM25, BP_PM10, BP_O3_8H, BP_O3_1H, BP_NO2_1H, BP_SO2_1H, BP_CO_8H,
+        _TRUNC_DECIMALS, compute_official_aqi
+    )
+except Exception:
+    from config import PIPELINE_BACKEND, AQI_MODE
+    from clean_data import clean_data
+    from process_features import add_features, resolve_features, FEATURE_GRAPH, STORE_FEATURES, AQI_SUB_INDICES
+    from aqi_utils import (
+        MW, BP_PM25, BP_PM10, BP_O3_8H, BP_O3_1H, BP_NO2_1H, BP_SO2_1H, BP_CO_8H,
+        _TRUNC_DECIMALS, compute_official_aqi
+    )
+
+try:
+    import polars as pl
+except ImportError:  # optional dependency: the pandas backend stays the default
+    pl = None
+
+POLLUTANT_COLS = ["pm10", "pm2_5", "carbon_monoxide", "nitrogen_dioxide", "ozone", "sulphur_dioxide"]
+WEATHER_COLS = ["temperature_2m", "relative_humidity_2m", "wind_speed_10m", "wind_direction_10m"]
+OUTLIER_COLS = ["pm2_5", "pm10", "carbon_monoxide"]
+
+
+def _require_polars():
+    if pl is None:
+        raise ImportError("❌ PIPELINE_BACKEND=polars needs the 'polars' package (pip install polars)")
+
+
+# =============================================================
+# 🧮 AQI as native expressions (mirrors compute_hourly_aqi_array)
+# =============================================================
+def _div(expr, divisor):
+    """
+    expr / divisor with true IEEE division. Polars evaluates `column / scalar` as a multiply
+    by the reciprocal, which can land 1 ulp off NumPy (55.4 → 55.400000000000006) and push
+    truncated concentrations across EPA breakpoints; a broadcast divisor column avoids that.
+    """
+    return expr / (pl.int_range(pl.len(), dtype=pl.Int64) * 0 + divisor).cast(pl.Float64)
+
+
+def _truncate(expr, pollutant):
+    scale = 10.0 ** _TRUNC_DECIMALS[pollutant]
+    return _div((expr * scale).floor(), scale)
+
+
+def _aqi_from_conc(conc, breakpoints):
+    """Breakpoint lookup + linear interpolation; null stays null, gaps / out of range → 500."""
+    chain = pl.when(conc.is_null()).then(None)
+    for c_low, c_high, i_low, i_high in breakpoints:
+        interp = (i_high - i_low) / (c_high - c_low) * (conc - c_low) + i_low
+        chain = chain.when(conc <= c_high).then(pl.when(conc >= c_low).then(interp).otherwise(500.0))
+    return chain.otherwise(500.0)
+
+
+def _hourly_aqi_exprs(temp_c=25.0, pressure_hpa=1013.25):
+    """Expressions for the final AQI and every sub-index (hourly method)."""
+    def gas(name, mw):
+        # Row version skips missing *and* zero readings
+        c = pl.col(name).cast(pl.Float64)
+        return pl.when(c == 0).then(None).otherwise(c) * (24.45 / mw) * ((temp_c + 273.15) / 298.15) * (1013.25 / pressure_hpa)
+
+    e = {
+        "no2_ppb": _truncate(gas("nitrogen_dioxide", MW["no2"]), "no2"),
+        "o3_ppb": _truncate(gas("ozone", MW["o3"]), "o3"),
+        "so2_ppb": _truncate(gas("sulphur_dioxide", MW["so2"]), "so2"),
+        "co_ppm": _truncate(_div(gas("carbon_monoxide", MW["co"]), 1000.0), "co"),
+    }
+    e["aqi_pm25"] = _aqi_from_conc(_truncate(pl.col("pm2_5").cast(pl.Float64), "pm25"), BP_PM25)
+    e["aqi_pm10"] = _aqi_from_conc(_truncate(pl.col("pm10").cast(pl.Float64), "pm10"), BP_PM10)
+    e["aqi_no2"] = _aqi_from_conc(e["no2_ppb"], BP_NO2_1H)
+    e["aqi_so2"] = _aqi_from_conc(e["so2_ppb"], BP_SO2_1H)
+    e["aqi_co"] = _aqi_from_conc(e["co_ppm"], BP_CO_8H)
+    o3_8h = _aqi_from_conc(e["o3_ppb"], BP_O3_8H)
+    e["aqi_o3_1h"] = pl.when(o3_8h > 300).then(_aqi_from_conc(e["o3_ppb"], BP_O3_1H)).otherwise(None)
+    e["aqi_o3"] = pl.when(o3_8h > 300).then(pl.max_horizontal(o3_8h, e["aqi_o3_1h"])).otherwise(o3_8h)
+    e["aqi"] = pl.max_horizontal(
+        e["aqi_pm25"], e["aqi_pm10"], e["aqi_no2"], e["aqi_o3"], e["aqi_so2"], e["aqi_co"]
+    ).round(0, mode="half_to_even")
+    return e
+
+
+def _official_aqi_expr(columns):
+    """Official (NowCast / 8h / 24h) AQI needs trailing windows over gaps: run the NumPy kernel per batch."""
+    def kernel(s):
+        frame = s.struct.unnest().to_pandas()
+        out = compute_official_aqi(frame).reindex(columns=columns)
+        return pl.DataFrame(out.to_dict(orient="list")).fill_nan(None).to_struct()
+
+    return pl.struct(["datetime"] + POLLUTANT_COLS).map_batches(
+        kernel, return_dtype=pl.Struct({c: pl.Float64 for c in columns})
+    )
+
+
+# Row-wise and window features: name → expression (inputs already present as columns)
+def _feature_exprs():
+    aqi = pl.col("aqi")
+    return {
+        "hour": pl.col("datetime").dt.hour().cast(pl.Int32),
+        "day": pl.col("datetime").dt.day().cast(pl.Int32),
+        "month": pl.col("datetime").dt.month().cast(pl.Int32),
+        "weekday": (pl.col("datetime").dt.weekday() - 1).cast(pl.Int32),
+        "hour_sin": _div(2 * np.pi * pl.col("hour"), 24).sin(),
+        "hour_cos": _div(2 * np.pi * pl.col("hour"), 24).cos(),
+        "aqi_change_rate": aqi.diff(),
+        "aqi_roll_mean_3h": aqi.rolling_mean(window_size=3, min_samples=1),
+        "aqi_roll_mean_6h": aqi.rolling_mean(window_size=6, min_samples=1),
+        "aqi_rolling_24h": aqi.rolling_mean(window_size=24, min_samples=1),
+        **{f"aqi_lag_{lag}h": aqi.shift(lag) for lag in [1, 3, 6]},
+        "pm_ratio": pl.col("pm2_5") / (pl.col("pm10") + 1e-6),
+        "temp_humidity_ratio": pl.col("temperature_2m") / (pl.col("relative_humidity_2m") + 1e-6),
+        "wind_effect": pl.col("wind_speed_10m") * (pl.col("wind_direction_10m") * (np.pi / 180)).cos(),
+        "high_pollution_flag": pl.when(aqi > 150).then(1).otherwise(0).cast(pl.Int64),
+    }
+
+
+# =============================================================
+# 🦥 Lazy plan
+# =============================================================
+def clean_lazy(lf):
+    """
+    clean_data() as a lazy plan: parse/sort datetime, numeric coercion, ffill/bfill, 1%/99%
+    capping. The >50%-NaN column drop is not mirrored: after ffill/bfill only all-missing
+    columns remain, and a requested all-missing source column surfaces as nulls instead.
+    """
+    schema = lf.collect_schema()
+    if "time" in schema and "datetime" not in schema:
+        lf = lf.rename({"time": "datetime"})
+        schema = lf.collect_schema()
+
+    dt = pl.col("datetime")
+    if schema["datetime"] == pl.String:
+        dt = dt.str.to_datetime(strict=False)
+    lf = lf.with_columns(dt.cast(pl.Datetime("ns")).alias("datetime")).drop_nulls("datetime").sort("datetime")
+
+    # Strings are coerced like pd.to_numeric(errors="coerce"); numeric columns keep their dtype
+    coerce = [pl.col(c).cast(pl.Float64, strict=False) for c in POLLUTANT_COLS + WEATHER_COLS
+              if c in schema and schema[c] == pl.String]
+    if coerce:
+        lf = lf.with_columns(coerce)
+    # NaN and null are both "missing" to pandas; fill both forward then backward
+    lf = lf.with_columns(pl.col(pl.Float32, pl.Float64).fill_nan(None))
+    lf = lf.with_columns(pl.all().forward_fill().backward_fill())
+    return lf.with_columns([
+        pl.col(c).clip(pl.col(c).quantile(0.01, interpolation="linear"),
+                       pl.col(c).quantile(0.99, interpolation="linear"))
+        for c in OUTLIER_COLS if c in schema
+    ])
+
+
+def features_lazy(lf, features=None):
+    """add_features() as a lazy plan over the cleaned frame; only requested nodes are added."""
+    features = list(features) if features is not None else list(STORE_FEATURES)
+    schema = lf.collect_schema()
+    exprs = _feature_exprs()
+
+    for name in resolve_features(features):
+        node = FEATURE_GRAPH.get(name)
+        if node is None:
+            if name not in schema:
+                raise ValueError(f"❌ Unknown feature or missing source column: '{name}'")
+            continue
+        if node["fn"] is None:
+            continue
+        if name == "aqi":
+            wanted = ["aqi"] + [c for c in AQI_SUB_INDICES if c in features]
+            if AQI_MODE == "official":
+                lf = lf.with_columns(_official_aqi_expr(wanted).alias("_aqi")).unnest("_aqi")
+            else:
+                aqi_exprs = _hourly_aqi_exprs()
+                lf = lf.with_columns([aqi_exprs[c].alias(c) for c in wanted])
+        else:
+            lf = lf.with_columns(exprs[name].alias(name))
+        if node.get("dropna"):
+            lf = lf.drop_nulls(name)
+
+    out = ["datetime"] + [f for f in features if f != "datetime"]
+    return lf.select(out).with_columns(pl.all().forward_fill().backward_fill())
+
+
+def scan_source(source):
+    """LazyFrame over a pandas frame, Arrow table, or a .parquet / .csv path (scans push projections down)."""
+    _require_polars()
+    if isinstance(source, str):
+        if source.endswith(".parquet"):
+            return pl.scan_parquet(source)
+        return pl.scan_csv(source, try_parse_dates=False)
+    if isinstance(source, pd.DataFrame):
+        return pl.from_pandas(source).lazy()
+    return pl.from_arrow(source).lazy()
+
+
+def clean_and_add_features_polars(source, features=None) -> pd.DataFrame:
+    lf = features_lazy(clean_lazy(scan_source(source)), features)
+    df = lf.collect().to_pandas()
+    print(f"🦥 Polars plan collected — shape: {df.shape}")
+    return df
+
+
+def clean_and_add_features(df, features=None, backend=None) -> pd.DataFrame:
+    """clean_data() → add_features() on the configured backend ("pandas" or "polars")."""
+    backend = (backend or PIPELINE_BACKEND).lower()
+    if backend == "polars":
+        return clean_and_add_features_polars(df, features)
+    if isinstance(df, str):
+        df = pd.read_parquet(df) if df.endswith(".parquet") else pd.read_csv(df)
+    return add_features(clean_data(df), features)
+
+
+# =============================================================
+# 🧪 Parity with the pandas path (usable at any row count)
+# =============================================================
+def synthetic_raw(rows, seed=0):
+    """Raw hourly frame with the gaps, zero readings and outliers clean_data() has to handle."""
+    try:
+        from src.synthetic_api import synthetic_hourly
+    except Exception:
+        from synthetic_api import synthetic_hourly
+
+    times = pd.date_range("1900-01-01", periods=rows, freq="h")
+    df = pd.DataFrame(synthetic_hourly(24.86, 67.0, times, POLLUTANT_COLS + WEATHER_COLS))
+    df = df.rename(columns={"time": "datetime"})
+    rng = np.random.default_rng(seed)
+    for col in ["pm2_5", "ozone", "temperature_2m"]:                 # gaps to fill
+        df.loc[rng.random(rows) < 0.01, col] = np.nan
+    df.loc[rng.random(rows) < 0.002, "nitrogen_dioxide"] = 0.0        # zero readings
+    df.loc[rng.random(rows) < 0.002, "pm10"] *= 8                     # outliers to cap
+    return df
+
+
+def assert_same_output(a: pd.DataFrame, b: pd.DataFrame, label="frame"):
+    """Same columns, rows and values (NaN-aware, 1e-9 tolerance) — raises AssertionError otherwise."""
+    assert list(a.columns) == list(b.columns), f"{label}: columns differ"
+    assert len(a) == len(b), f"{label}: {len(a)} vs {len(b)} rows"
+    for col in a.columns:
+        if col == "datetime":
+            assert (pd.to_datetime(a[col]).to_numpy() == pd.to_datetime(b[col]).to_numpy()).all(), f"{label}: datetime differs"
+            continue
+        x = pd.to_numeric(a[col], errors="coerce").to_numpy(dtype=float)
+        y = pd.to_numeric(b[col], errors="coerce").to_numpy(dtype=float)
+        assert np.allclose(x, y, rtol=1e-9, atol=1e-9, equal_nan=True), f"{label}: '{col}' differs"
+
+
+def check_parity(source=None, features=None, rows=500):
+    """
+    Run clean_and_add_features on both backends and assert identical output.
+    source: pandas frame or .parquet / .csv path (default: synthetic_raw(rows));
+    features: default every graph feature, AQI sub-indices included. Returns the pandas output.
+    """
+    _require_polars()
+    source = synthetic_raw(rows) if source is None else source
+    features = features or [c for c in FEATURE_GRAPH if c != "hour_cos"] + ["hour_cos"]
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = clean_and_add_features(source, features, backend="pandas")
+        actual = clean_and_add_features(source, features, backend="polars")
+    assert_same_output(expected, actual, source if isinstance(source, str) else "frame")
+    return expected
+
+
+# --- Run standalone ---
+#   python src/polars_backend.py [--rows 1000000]  → output parity vs pandas + benchmark
+if __name__ == "__main__":
+    import sys
+    import time
+    import tempfile
+
+    try:
+        from src.process_features import MODEL_FEATURES
+    except Exception:
+        from process_features import MODEL_FEATURES
+
+    def quiet(fn, *args, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn(*args, **kwargs)
+
+    # 1. Parity on every graph feature (incl. AQI sub-indices): tiny + 20k-row frames and a CSV source
+    for n in (48, 20_000):
+        expected = check_parity(rows=n)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "raw.csv")
+        synthetic_raw(20_000).to_csv(csv_path, index=False)
+        check_parity(csv_path)
+    print(f"✅ Parity: {expected.shape[1] - 1} features × {len(expected):,} rows identical to the pandas path")
+
+    # 2. Benchmark at 1M+ rows from Parquet (store schema and model-only projection)
+    rows = int(sys.argv[sys.argv.index("--rows") + 1]) if "--rows" in sys.argv else 1_000_000
+    big = synthetic_raw(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "raw.parquet")
+        big.to_parquet(path, index=False)
+        del big
+
+        timings, polars_out = {}, {}
+        for backend in ["polars", "pandas"]:
+            for label, feats in [("store", STORE_FEATURES), ("model", MODEL_FEATURES)]:
+                t0 = time.perf_counter()
+                out = quiet(clean_and_add_features, path, feats, backend=backend)
+                timings[(backend, label)] = time.perf_counter() - t0
+                if backend == "polars":
+                    polars_out[label] = out
+                else:
+                    assert_same_output(out, polars_out.pop(label), f"{label} @ {rows:,}")
+
+        print(f"\n⏱️ clean + features on {rows:,} rows (Parquet source, {os.cpu_count()} cores)")
+        for label in ["store", "model"]:
+            p, q = timings[("pandas", label)], timings[("polars", label)]
+            print(f"  {label:<6} pandas {p:7.2f}s | polars lazy {q:6.2f}s | ×{p / q:.1f}")
+    print("✅ Polars backend matches pandas at benchmark scale")
@@ -3,9 +3,25 @@ import hopsworks
 import pandas as pd
 import numpy as np
 import os
-from joblib import load
 from datetime import timedelta
 
+try:
+    from src.model_artifacts import load_model_artifact
+    from src.forecast_store import append_forecast, read_forecasts
+    from src.eval_store import EvalStore, evaluate_new_rows
+    from src.downsample import update_series
+    from src.prediction_intervals import predict_with_intervals
+    from src.training_cache import training_matrix, matrix_frame
+    from src.attributions import explain, save_attributions
+except ModuleNotFoundError:
+    from model_artifacts import load_model_artifact
+    from forecast_store import append_forecast, read_forecasts
+    from eval_store import EvalStore, evaluate_new_rows
+    from downsample import update_series
+    from prediction_intervals import predict_with_intervals
+    from training_cache import training_matrix, matrix_frame
+    from attributions import explain, save_attributions
+
 # 1. Connect to Hopsworks Feature Store
 print("🔗 Connecting to Hopsworks Feature Store...")
 import dotenv
@@ -15,46 +31,40 @@ api_key = os.getenv("HOPSWORKS_API_KEY")
 project = hopsworks.login(api_key_value=api_key)
 fs = project.get_feature_store()
 
-fg = fs.get_feature_group("aqi_features", version=1)
+fg = fs.get_feature_group("aqi_features", version=2)
 df = fg.read()
 print("✅ Data fetched from Hopsworks successfully!")
 
 print(f"Initial shape: {df.shape}")
 
-# 2. Prepare data
-if "datetime_str" in df.columns:
-    df["datetime"] = pd.to_datetime(df["datetime_str"])
-    df.drop(columns=["datetime_str"], inplace=True)
-
-df["datetime"] = pd.to_datetime(df["datetime"])
-df = df.sort_values("datetime").reset_index(drop=True)
+# 2. Load trained model + the feature list it was trained on
+model, metadata = load_model_artifact()
+features = metadata["features"]
+print(f"Loaded trained model: {metadata['model_name']} ({metadata['model_file']})")
 
-# 3. Drop leakage features (must match training) 
-leakage_features = ["aqi_rolling_24h", "aqi_lag_1h", "high_pollution_flag"]
-for col in leakage_features:
-    if col in df.columns:
-        df.drop(columns=[col], inplace=True)
-        print(f"⚠️ Dropped leakage feature: {col}")
+# 3. Prepare data: parsed, sorted float32 matrix shared with training (memory-mapped,
+#    materialized only when the feature group has changed since the last run)
+matrix = training_matrix(df, features)
+df = matrix_frame(matrix)
+print(f"🗂️ Training matrix {matrix['key']} → {matrix['rows']} rows")
 
-# 4. Split features and labels for evaluation
-X = df.drop(columns=["aqi", "datetime"], errors="ignore")
+# 4. Split features and labels for evaluation (same columns as training)
+X = df[features]
 y = df["aqi"]
 
-# 5. Load trained model 
-model_path = os.path.join(os.path.dirname(__file__), "../models/best_model_random_forest.pkl")
-model = load(model_path)
-print(f"Loaded trained model from {model_path}")
+# 6. Evaluate incrementally: score only rows newer than the last run, merge into accumulators
+eval_store = EvalStore()
+model_version = metadata.get("model_version", "legacy")
+watermark = eval_store.watermark()
+issued_since = watermark - timedelta(hours=72) if watermark is not None else None
+scored = evaluate_new_rows(
+    df, model, features, model_version, store=eval_store,
+    forecasts=read_forecasts(start=issued_since)
+)
+print(f"\n🧮 Scored {scored} new rows (previous watermark: {watermark})")
 
-# 6. Evaluate model on existing data
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-
-preds = model.predict(X)
-rmse = np.sqrt(mean_squared_error(y, preds))
-mae = mean_absolute_error(y, preds)
-r2 = r2_score(y, preds)
-
-print("\n📊 Model Evaluation on Full Data ---")
-print(f"RMSE: {rmse:.3f}, MAE: {mae:.3f}, R²: {r2:.3f}")
+print("\n📊 Model Evaluation (rolling windows, horizon 0) ---")
+print(eval_store.rolling(model_version, horizon=0).to_string(float_format=lambda v: f"{v:.3f}"))
 
 # 7. Predict next 3 days AQI (72 hours ahead) 
 print("\n📆 Generating next 3 days hourly AQI predictions...")
@@ -78,12 +88,12 @@ for col in vary_cols:
         future_data[col] = future_data[col] * (1 + noise)
 
 future_data["datetime"] = future_dates
-future_preds = model.predict(future_data.drop(columns=["datetime"], errors="ignore"))
+# Point forecast + prediction interval for all 72 horizons in one batched pass
+future_band = predict_with_intervals(
+    model, metadata, future_data.drop(columns=["datetime"], errors="ignore")
+).reset_index(drop=True)
 
-future_results = pd.DataFrame({
-    "datetime": future_dates,
-    "predicted_AQI": future_preds
-})
+future_results = pd.concat([pd.DataFrame({"datetime": future_dates}), future_band], axis=1)
 
 # 8. Save hourly predictions
 output_path = os.path.join(os.path.dirname(__file__), "../data/predictions/next_3_days_predictions.csv")
@@ -91,6 +101,39 @@ os.makedirs(os.path.dirname(output_path), exist_ok=True)
 future_results.to_csv(output_path, index=False)
 print(f"💾 Saved hourly predictions to {output_path}")
 
+# 8b. Persist the issued forecast (horizon 0 = current hour) + refresh the latest snapshot
+current_band = predict_with_intervals(model, metadata, X.iloc[-1:]).reset_index(drop=True)
+issued = pd.concat([
+    pd.concat([pd.DataFrame({"datetime": [last_date]}), current_band], axis=1),
+    future_results
+], ignore_index=True)
+issue_time = pd.Timestamp.now().floor("s")
+part_path = append_forecast(
+    issued,
+    issue_time=issue_time,
+    model_version=metadata.get("model_version", "legacy"),
+    origin=last_date,
+)
+print(f"🗄️ Forecast issued → {part_path}")
+
+# 8c. Explain every issued hour once, in one batch, and store it next to the forecast
+#     (same issue time + model version) so the dashboard never re-evaluates the model
+try:
+    issued_X = pd.concat([X.iloc[-1:], future_data[features]], ignore_index=True)
+    contribs, base_values = explain(model, metadata, issued_X)
+    if contribs is not None:
+        attr_path = save_attributions(contribs, base_values, issued["datetime"], issued["predicted_AQI"],
+                                      issue_time, metadata.get("model_version", "legacy"), origin=last_date)
+        print(f"🔍 Feature attributions stored → {attr_path}")
+except Exception as e:
+    print(f"⚠️ Could not compute feature attributions: {e}")
+
+# 8d. Fold the issued hours into the 'predicted' chart pyramid (newest forecast per hour wins)
+try:
+    update_series("predicted", issued["datetime"], issued["predicted_AQI"])
+except Exception as e:
+    print(f"⚠️ Could not update predicted pyramid: {e}")
+
 # 9. Print daily averages 
 future_results["date"] = future_results["datetime"].dt.date
 daily_avg = future_results.groupby("date")["predicted_AQI"].mean().reset_index()
@@ -0,0 +1,183 @@
+# Purpose: Prediction intervals in one batched pass —
+#   • Random Forest → spread of all tree outputs, from one (n_trees, n_rows) array
+#     (trees are compiled once into padded node arrays and traversed level by level)
+#   • XGBoost → companion multi-quantile model (reg:quantileerror), one predict call
+#   • anything else → Gaussian band from the model's holdout RMSE
+
+import os
+import weakref
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from joblib import dump, load
+
+try:
+    from src.config import INTERVAL_COVERAGE
+    from src.model_artifacts import MODEL_DIR
+except Exception:
+    from config import INTERVAL_COVERAGE
+    from model_artifacts import MODEL_DIR
+
+_COMPILED = weakref.WeakKeyDictionary()
+
+
+# =============================================================
+# 🌲 Vectorized forest traversal
+# =============================================================
+def compile_forest(forest):
+    """Pack every tree into (n_trees, max_nodes) arrays; cached per fitted model."""
+    cached = _COMPILED.get(forest)
+    if cached is not None:
+        return cached
+
+    trees = [est.tree_ for est in forest.estimators_]
+    n_trees, max_nodes = len(trees), max(t.node_count for t in trees)
+    left = np.full((n_trees, max_nodes), -1, dtype=np.int32)
+    right = np.full((n_trees, max_nodes), -1, dtype=np.int32)
+    feature = np.zeros((n_trees, max_nodes), dtype=np.int32)
+    threshold = np.zeros((n_trees, max_nodes), dtype=np.float64)
+    value = np.zeros((n_trees, max_nodes), dtype=np.float64)
+    for i, t in enumerate(trees):
+        n = t.node_count
+        left[i, :n], right[i, :n] = t.children_left, t.children_right
+        feature[i, :n] = np.maximum(t.feature, 0)   # leaves store -2
+        threshold[i, :n] = t.threshold
+        value[i, :n] = t.value[:, 0, 0]
+
+    compiled = {
+        "left": left, "right": right, "feature": feature, "threshold": threshold,
+        "value": value, "max_depth": max(t.max_depth for t in trees),
+    }
+    _COMPILED[forest] = compiled
+    return compiled
+
+
+def forest_member_predictions(forest, X):
+    """All trees' outputs as one (n_trees, n_rows) array — no loop over estimators_."""
+    c = compile_forest(forest)
+    # sklearn compares float32 features against the stored thresholds
+    Xf = np.asarray(X, dtype=np.float32)
+    n_trees, n_rows = c["left"].shape[0], Xf.shape[0]
+    t_idx = np.arange(n_trees)[:, None]
+    r_idx = np.arange(n_rows)[None, :]
+
+    node = np.zeros((n_trees, n_rows), dtype=np.int32)
+    for _ in range(c["max_depth"]):
+        lft = c["left"][t_idx, node]
+        is_leaf = lft == -1
+        if is_leaf.all():
+            break
+        go_left = Xf[r_idx, c["feature"][t_idx, node]] <= c["threshold"][t_idx, node]
+        node = np.where(is_leaf, node, np.where(go_left, lft, c["right"][t_idx, node]))
+    return c["value"][t_idx, node]
+
+
+# =============================================================
+# 📏 Intervals
+# =============================================================
+def _bounds(coverage):
+    alpha = 1 - coverage
+    return alpha / 2, 1 - alpha / 2
+
+
+def fit_interval_model(params, X_train, y_train, coverage=INTERVAL_COVERAGE):
+    """Companion XGBoost model predicting the lower/upper quantiles in one pass."""
+    from xgboost import XGBRegressor
+    params = {k: v for k, v in params.items() if k not in ("objective", "quantile_alpha")}
+    model = XGBRegressor(objective="reg:quantileerror",
+                         quantile_alpha=np.array(_bounds(coverage)), **params)
+    model.fit(X_train, y_train)
+    return model
+
+
+def update_interval_model(interval_file, X_recent, y_recent, rounds, model_dir=MODEL_DIR):
+    """Continue boosting the saved quantile companion on recent rows (incremental retrain)."""
+    from xgboost import XGBRegressor
+    path = os.path.join(model_dir, interval_file)
+    model = load(path)
+    params = model.get_params()
+    params["n_estimators"] = rounds
+    updated = XGBRegressor(**params)
+    updated.fit(X_recent, y_recent, xgb_model=model.get_booster())
+    dump(updated, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    return updated
+
+
+def predict_with_intervals(model, metadata, X, coverage=INTERVAL_COVERAGE, model_dir=MODEL_DIR):
+    """
+    Point forecast + [lower, upper] band as a DataFrame
+    (predicted_AQI, lower_AQI, upper_AQI), aligned with X's rows.
+    """
+    lo_q, hi_q = _bounds(coverage)
+    name = metadata.get("model_name", "")
+    interval_file = metadata.get("interval_model_file")
+
+    if name == "Random Forest" and hasattr(model, "estimators_"):
+        members = forest_member_predictions(model, X)
+        point = members.mean(axis=0)
+        lower, upper = np.quantile(members, [lo_q, hi_q], axis=0)
+    elif interval_file and os.path.exists(os.path.join(model_dir, interval_file)):
+        point = model.predict(X)
+        quantiles = load(os.path.join(model_dir, interval_file)).predict(X)
+        lower, upper = np.minimum(quantiles[:, 0], point), np.maximum(quantiles[:, 1], point)
+    else:
+        point = model.predict(X)
+        rmse = metadata.get("metrics", {}).get("RMSE")
+        half = NormalDist().inv_cdf(hi_q) * rmse if rmse else np.nan
+        lower, upper = point - half, point + half
+
+    return pd.DataFrame({"predicted_AQI": point, "lower_AQI": lower, "upper_AQI": upper},
+                        index=getattr(X, "index", None))
+
+
+# --- Run standalone benchmark: interval overhead on top of the 72-hour point forecast ---
+if __name__ == "__main__":
+    import time
+    from sklearn.ensemble import RandomForestRegressor
+    from xgboost import XGBRegressor
+
+    rng = np.random.default_rng(42)
+    n_train, n_feat, horizons = 12000, 18, 72
+    X_train = rng.normal(size=(n_train, n_feat))
+    y_train = 100 + 20 * X_train[:, 0] + 10 * np.sin(X_train[:, 1]) + rng.normal(0, 5, n_train)
+    X_future = rng.normal(size=(horizons, n_feat))
+
+    def best_of(fn, repeat=20):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        return best * 1000
+
+    # Random Forest: tree spread
+    rf = RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=-1).fit(X_train, y_train)
+    rf_meta = {"model_name": "Random Forest"}
+    compile_forest(rf)  # one-off per loaded model
+
+    loop = np.stack([est.predict(X_future) for est in rf.estimators_])
+    batched = forest_member_predictions(rf, X_future)
+    assert np.allclose(loop, batched), "vectorized traversal disagrees with estimators_"
+    assert np.allclose(batched.mean(axis=0), rf.predict(X_future))
+
+    point_ms = best_of(lambda: rf.predict(X_future))
+    loop_ms = best_of(lambda: np.stack([est.predict(X_future) for est in rf.estimators_]), 5)
+    interval_ms = best_of(lambda: predict_with_intervals(rf, rf_meta, X_future))
+    print(f"🌲 RF ({len(rf.estimators_)} trees, {horizons} horizons)")
+    print(f"   point forecast          : {point_ms:7.2f} ms")
+    print(f"   loop over estimators_   : {loop_ms:7.2f} ms")
+    print(f"   point + interval (batch): {interval_ms:7.2f} ms")
+
+    # XGBoost: multi-quantile companion model
+    params = dict(n_estimators=200, learning_rate=0.1, max_depth=6, tree_method="hist", random_state=42)
+    xgb_model = XGBRegressor(**params).fit(X_train, y_train)
+    q_model = fit_interval_model(params, X_train, y_train)
+    xgb_point_ms = best_of(lambda: xgb_model.predict(X_future))
+    xgb_int_ms = best_of(lambda: (xgb_model.predict(X_future), q_model.predict(X_future)))
+    print(f"🚀 XGBoost point: {xgb_point_ms:.2f} ms | point + quantiles: {xgb_int_ms:.2f} ms")
+
+    band = predict_with_intervals(rf, rf_meta, X_future)
+    assert (band["lower_AQI"] <= band["upper_AQI"]).all()
+    print(band.head())
+    print("✅ Interval benchmark complete")
@@ -44,20 +44,16 @@ def process_latest_json(raw_df):
     return df
 
 
-# --- Run standalone test ---
+# --- Run standalone test: process the most recent archived fetch ---
 if __name__ == "__main__":
-    import json
-
-    # Example test file 
-    sample_path = os.path.join("data", "raw", "raw_combined_sample.json")
-    if os.path.exists(sample_path):
-        with open(sample_path, "r") as f:
-            sample_data = json.load(f)
-        sample_df = pd.concat([
-            pd.DataFrame(sample_data.get("air_quality", {}).get("hourly", {})),
-            pd.DataFrame(sample_data.get("weather", {}).get("hourly", {}))
-        ], axis=1)
-        processed = process_latest_json(sample_df)
-        print(processed.head())
+    from raw_archive import read_manifest, replay
+
+    manifest = read_manifest()
+    if len(manifest):
+        latest = manifest["fetched_at"].max()
+        for entry, sample_df in replay(start=latest, end=latest):
+            print(f"🗄️ Using archived fetch {entry['file']}")
+            processed = process_latest_json(sample_df)
+            print(processed.head())
     else:
-        print("⚠️ No sample file found for standalone test.")
\ No newline at end of file
+        print("⚠️ No archived fetches found (run fetch_data.py with SAVE_LOCAL=true) for standalone test.")
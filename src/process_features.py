@@ -6,20 +6,122 @@ import os
 
 # Safe import for compute_aqi function
 try:
-    from src.aqi_utils import compute_aqi_from_row
-    from src.config import SAVE_LOCAL
+    from src.aqi_utils import compute_aqi_from_row, compute_official_aqi
+    from src.config import SAVE_LOCAL, AQI_MODE
 except Exception:
-    from aqi_utils import compute_aqi_from_row
-    from config import SAVE_LOCAL
+    from aqi_utils import compute_aqi_from_row, compute_official_aqi
+    from config import SAVE_LOCAL, AQI_MODE
 
 
-def add_features(df: pd.DataFrame) -> pd.DataFrame:
+# =============================================================
+# 🧩 Feature graph
+# =============================================================
+# Every engineered feature is a named node with the inputs it needs and a
+# builder that returns a Series (or a DataFrame for multi-output nodes).
+# Nodes with fn=None are emitted by their single input node.
+# Columns not listed here are treated as source columns from the cleaned data.
+
+POLLUTANT_COLS = ["pm10", "pm2_5", "carbon_monoxide",
+                  "nitrogen_dioxide", "ozone", "sulphur_dioxide"]
+
+AQI_SUB_INDICES = [
+    "aqi_pm25", "aqi_pm10", "no2_ppb", "o3_ppb", "so2_ppb", "co_ppm",
+    "aqi_no2", "aqi_o3", "aqi_so2", "aqi_co", "aqi_o3_1h"
+]
+
+
+def _compute_aqi(df):
+    if AQI_MODE == "official":
+        print("⚙️ Computing AQI and sub-indices (official NowCast / 8h averaging)...")
+        return compute_official_aqi(df).reindex(columns=AQI_SUB_INDICES + ["aqi"])
+
+    print("⚙️ Computing AQI and sub-indices...")
+    aqi_results = df.apply(lambda row: compute_aqi_from_row(row), axis=1)
+    aqi_expanded = pd.DataFrame(list(aqi_results), index=df.index)
+    aqi_expanded = aqi_expanded.apply(pd.to_numeric, errors="coerce")
+    return aqi_expanded.reindex(columns=AQI_SUB_INDICES + ["aqi"])
+
+
+FEATURE_GRAPH = {
+    # AQI (drops rows where it can't be computed)
+    "aqi": {"inputs": POLLUTANT_COLS, "fn": _compute_aqi, "dropna": True},
+    **{c: {"inputs": ["aqi"], "fn": None} for c in AQI_SUB_INDICES},
+
+    # Time-based features
+    "hour": {"inputs": ["datetime"], "fn": lambda df: df["datetime"].dt.hour},
+    "day": {"inputs": ["datetime"], "fn": lambda df: df["datetime"].dt.day},
+    "month": {"inputs": ["datetime"], "fn": lambda df: df["datetime"].dt.month},
+    "weekday": {"inputs": ["datetime"], "fn": lambda df: df["datetime"].dt.weekday},
+    "hour_sin": {"inputs": ["hour"], "fn": lambda df: np.sin(2 * np.pi * df["hour"] / 24)},
+    "hour_cos": {"inputs": ["hour"], "fn": lambda df: np.cos(2 * np.pi * df["hour"] / 24)},
+
+    # Derived AQI features
+    "aqi_change_rate": {"inputs": ["aqi"], "fn": lambda df: df["aqi"].diff()},
+    "aqi_roll_mean_3h": {"inputs": ["aqi"], "fn": lambda df: df["aqi"].rolling(window=3, min_periods=1).mean()},
+    "aqi_roll_mean_6h": {"inputs": ["aqi"], "fn": lambda df: df["aqi"].rolling(window=6, min_periods=1).mean()},
+    "aqi_rolling_24h": {"inputs": ["aqi"], "fn": lambda df: df["aqi"].rolling(window=24, min_periods=1).mean()},
+    **{f"aqi_lag_{lag}h": {"inputs": ["aqi"], "fn": (lambda df, lag=lag: df["aqi"].shift(lag))}
+       for lag in [1, 3, 6]},
+
+    # Pollutant ratio + meteorological combinations
+    "pm_ratio": {"inputs": ["pm2_5", "pm10"], "fn": lambda df: df["pm2_5"] / (df["pm10"] + 1e-6)},
+    "temp_humidity_ratio": {"inputs": ["temperature_2m", "relative_humidity_2m"],
+                            "fn": lambda df: df["temperature_2m"] / (df["relative_humidity_2m"] + 1e-6)},
+    "wind_effect": {"inputs": ["wind_speed_10m", "wind_direction_10m"],
+                    "fn": lambda df: df["wind_speed_10m"] * np.cos(np.deg2rad(df["wind_direction_10m"]))},
+
+    # High pollution flag
+    "high_pollution_flag": {"inputs": ["aqi"], "fn": lambda df: pd.Series(np.where(df["aqi"] > 150, 1, 0), index=df.index)},
+}
+
+# Feature Group schema (EDA-2 selection), in upload order
+STORE_FEATURES = [
+    "pm10", "pm2_5", "carbon_monoxide", "nitrogen_dioxide", "ozone", "sulphur_dioxide",
+    "temperature_2m", "relative_humidity_2m", "wind_speed_10m", "month", "aqi",
+    "hour", "day", "weekday", "hour_sin", "aqi_change_rate", "aqi_rolling_24h",
+    "aqi_lag_1h", "pm_ratio", "temp_humidity_ratio", "wind_effect", "high_pollution_flag"
+]
+
+# Model inputs: store features minus the target and the leakage features
+# (aqi_rolling_24h, aqi_lag_1h, high_pollution_flag) dropped before training
+MODEL_FEATURES = [
+    "pm10", "pm2_5", "carbon_monoxide", "nitrogen_dioxide", "ozone", "sulphur_dioxide",
+    "temperature_2m", "relative_humidity_2m", "wind_speed_10m", "month",
+    "hour", "day", "weekday", "hour_sin", "aqi_change_rate",
+    "pm_ratio", "temp_humidity_ratio", "wind_effect"
+]
+
+
+def resolve_features(features):
+    """Return the requested features plus all their ancestors, in build order."""
+    order, seen = [], set()
+
+    def visit(name, path=()):
+        if name in seen:
+            return
+        if name in path:
+            raise ValueError(f"❌ Cycle in feature graph at '{name}'")
+        node = FEATURE_GRAPH.get(name)
+        if node is not None:
+            for dep in node["inputs"]:
+                visit(dep, path + (name,))
+        seen.add(name)
+        order.append(name)
+
+    for f in features:
+        visit(f)
+    return order
+
+
+def add_features(df: pd.DataFrame, features=None) -> pd.DataFrame:
     """
-    Compute AQI, time-based, and derived features for ML training.
-    Includes both Phase-1 (feature creation) and Phase-2 (feature refinement from EDA-2).
+    Compute the requested features (and only their ancestors) for ML training.
+    `features` defaults to the Feature Group schema (STORE_FEATURES); the
+    returned frame holds 'datetime' followed by the requested columns.
     """
 
     df = df.copy()
+    features = list(features) if features is not None else list(STORE_FEATURES)
 
     #1. Normalize datetime column
     if "time" in df.columns and "datetime" not in df.columns:
@@ -30,81 +132,37 @@ def add_features(df: pd.DataFrame) -> pd.DataFrame:
     df.sort_values("datetime", inplace=True)
     df.reset_index(drop=True, inplace=True)
 
-    # 2.Compute AQI (using compute_aqi_from_row)
-    print("⚙️ Computing AQI and sub-indices...")
-    aqi_results = df.apply(lambda row: compute_aqi_from_row(row), axis=1)
-
-    # Expand dict results into DataFrame
-    if isinstance(aqi_results.iloc[0], dict):
-        aqi_expanded = pd.DataFrame(list(aqi_results))
-        aqi_expanded = aqi_expanded.apply(pd.to_numeric, errors="coerce")
-        df = pd.concat([df.reset_index(drop=True), aqi_expanded.reset_index(drop=True)], axis=1)
-    else:
-        df["aqi"] = pd.to_numeric(aqi_results, errors="coerce")
-
-    # Ensure 'aqi' column exists
-    if "aqi" not in df.columns:
-        sub_cols = [c for c in df.columns if c.startswith("aqi_")]
-        df["aqi"] = df[sub_cols].max(axis=1) if sub_cols else np.nan
-
-    # Drop rows where AQI couldn't be computed
-    df.dropna(subset=["aqi"], inplace=True)
-
-    # 3. Time-based features
-    df["hour"] = df["datetime"].dt.hour
-    df["day"] = df["datetime"].dt.day
-    df["month"] = df["datetime"].dt.month
-    df["weekday"] = df["datetime"].dt.weekday
-
-    # Cyclic encoding (sin/cos for hour)
-    df["hour_sin"] = np.sin(2 * np.pi * df["hour"] / 24)
-    df["hour_cos"] = np.cos(2 * np.pi * df["hour"] / 24)
-
-    # 4. Derived features 
-    df["aqi_change_rate"] = df["aqi"].diff()
-    df["aqi_roll_mean_3h"] = df["aqi"].rolling(window=3, min_periods=1).mean()
-    df["aqi_roll_mean_6h"] = df["aqi"].rolling(window=6, min_periods=1).mean()
-    df["aqi_rolling_24h"] = df["aqi"].rolling(window=24, min_periods=1).mean()
-
-    # 5. Lag features
-    for lag in [1, 3, 6]:
-        df[f"aqi_lag_{lag}h"] = df["aqi"].shift(lag)
-
-    # 6. Pollutant ratio features
-    df["pm_ratio"] = df["pm2_5"] / (df["pm10"] + 1e-6)
-
-    # 7. Meteorological combination features
-    df["temp_humidity_ratio"] = df["temperature_2m"] / (df["relative_humidity_2m"] + 1e-6)
-    df["wind_effect"] = df["wind_speed_10m"] * np.cos(np.deg2rad(df["wind_direction_10m"]))
-
-    # 8. High pollution flag
-    df["high_pollution_flag"] = np.where(df["aqi"] > 150, 1, 0)
-
-    # 9. Handle NaNs from lags/ratios 
-    df.ffill(inplace=True)
-    df.bfill(inplace=True)
-
-    print("🧠 Base feature engineering complete! Proceeding with EDA-2 refinement...")
-
-    # =============================================================
-    # ✨ PHASE-2: Feature Refinement (EDA-2 Logic)
-    # =============================================================
-
-    drop_cols = [
-        # Redundant pollutant sub-indices
-        'aqi_pm25', 'aqi_pm10', 'no2_ppb', 'o3_ppb', 'so2_ppb', 'co_ppm',
-        'aqi_no2', 'aqi_so2', 'aqi_co', 'aqi_o3',
-
-        # Weak correlation / low variance
-        'aqi_o3_1h', 'hour_cos', 'wind_direction_10m',
-
-        # Redundant time-based aggregates
-        'aqi_roll_mean_3h', 'aqi_roll_mean_6h', 'aqi_lag_3h', 'aqi_lag_6h'
-    ]
-
-    df_refined = df.drop(columns=[c for c in drop_cols if c in df.columns], errors='ignore')
-
-    print("✅ Feature refinement done.")
+    # 2. Walk the graph in dependency order, building only what is needed
+    plan = resolve_features(features)
+    for name in plan:
+        node = FEATURE_GRAPH.get(name)
+        if node is None:
+            if name not in df.columns:
+                raise ValueError(f"❌ Unknown feature or missing source column: '{name}'")
+            continue
+        if node["fn"] is None:
+            continue
+
+        out = node["fn"](df)
+        if isinstance(out, pd.DataFrame):
+            for col in out.columns:
+                df[col] = out[col]
+        else:
+            df[name] = out
+
+        if node.get("dropna"):
+            df.dropna(subset=[name], inplace=True)
+            df.reset_index(drop=True, inplace=True)
+
+    built = [n for n in plan if n in FEATURE_GRAPH]
+    print(f"🧠 Built {len(built)} graph features for {len(features)} requested columns.")
+
+    # 3. Keep only requested columns, then handle NaNs from lags/ratios
+    df_refined = df[["datetime"] + [f for f in features if f != "datetime"]].copy()
+    df_refined.ffill(inplace=True)
+    df_refined.bfill(inplace=True)
+
+    print("✅ Feature engineering done.")
     print(f"Final selected shape: {df_refined.shape}")
     print(f"Final columns: {df_refined.columns.tolist()}")
 
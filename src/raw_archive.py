@@ -0,0 +1,228 @@
+# Purpose: Archive raw Open-Meteo responses as zstd Parquet chunks partitioned by
+# fetch date + location (with a JSONL manifest) and replay them without the network.
+
+import os
+import glob
+import json
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    from src.config import RAW_ARCHIVE_PATH, LOCATION
+except Exception:
+    from config import RAW_ARCHIVE_PATH, LOCATION
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MANIFEST_FILE = "manifest.jsonl"
+_META_KEY = b"open_meteo"
+
+
+def archive_dir(path=None):
+    return path or os.path.join(BASE_DIR, RAW_ARCHIVE_PATH)
+
+
+def _response_meta(payload):
+    """Everything in a response except the hourly arrays (coords, units, timezone, ...)."""
+    return {k: v for k, v in (payload or {}).items() if k != "hourly"}
+
+
+def archive_raw(aq_data: dict, wx_data: dict, location: str = LOCATION,
+                fetched_at=None, path=None):
+    """
+    Store one fetch (air-quality + weather responses) as a single columnar chunk:
+    one row per hour, one column per hourly variable. Non-hourly response fields
+    ride along as Parquet schema metadata so the payloads can be rebuilt exactly.
+    Returns the manifest entry.
+    """
+    root = archive_dir(path)
+    fetched_at = pd.Timestamp(fetched_at or datetime.now()).floor("s")
+
+    aq = pd.DataFrame(aq_data["hourly"])
+    wx = pd.DataFrame(wx_data["hourly"])
+    df = pd.merge(aq, wx, on="time", how="outer")
+    df["time"] = pd.to_datetime(df["time"])
+    df = df.sort_values("time").reset_index(drop=True)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    meta = {
+        "fetched_at": str(fetched_at),
+        "location": location,
+        "air_quality": _response_meta(aq_data),
+        "weather": _response_meta(wx_data),
+        "aq_columns": list(aq.columns),
+        "wx_columns": list(wx.columns),
+    }
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           _META_KEY: json.dumps(meta).encode()})
+
+    rel = os.path.join(f"fetch_date={fetched_at.date()}", f"location={location}",
+                       f"fetch_{fetched_at.strftime('%Y%m%dT%H%M%S')}.parquet")
+    out = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    pq.write_table(table, out, compression="zstd")
+
+    entry = {
+        "file": rel,
+        "location": location,
+        "fetch_date": str(fetched_at.date()),
+        "fetched_at": str(fetched_at),
+        "rows": len(df),
+        "time_min": str(df["time"].min()),
+        "time_max": str(df["time"].max()),
+        "bytes": os.path.getsize(out),
+    }
+    with open(os.path.join(root, MANIFEST_FILE), "a") as f:
+        f.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def read_manifest(path=None) -> pd.DataFrame:
+    manifest = os.path.join(archive_dir(path), MANIFEST_FILE)
+    if not os.path.exists(manifest):
+        return pd.DataFrame(columns=["file", "location", "fetch_date", "fetched_at",
+                                     "rows", "time_min", "time_max", "bytes"])
+    df = pd.read_json(manifest, lines=True, dtype={"fetch_date": str})
+    df["fetched_at"] = pd.to_datetime(df["fetched_at"])
+    return df.sort_values("fetched_at", kind="mergesort").reset_index(drop=True)
+
+
+def replay(start=None, end=None, location=None, columns=None, as_numpy=False, path=None):
+    """
+    Yield (manifest_entry, chunk) for archived fetches with start <= fetched_at <= end,
+    in fetch order. Selection uses the manifest only; just the requested columns
+    are decoded. `chunk` is a DataFrame, or a dict of NumPy arrays if `as_numpy`.
+    """
+    root = archive_dir(path)
+    manifest = read_manifest(path)
+    if location is not None:
+        manifest = manifest[manifest["location"] == location]
+    if start is not None:
+        manifest = manifest[manifest["fetched_at"] >= pd.Timestamp(start)]
+    if end is not None:
+        manifest = manifest[manifest["fetched_at"] <= pd.Timestamp(end)]
+
+    read_cols = None if columns is None else ["time"] + [c for c in columns if c != "time"]
+    for entry in manifest.to_dict(orient="records"):
+        table = pq.ParquetFile(os.path.join(root, entry["file"])).read(columns=read_cols)
+        if as_numpy:
+            yield entry, {name: table.column(name).to_numpy() for name in table.column_names}
+        else:
+            yield entry, table.to_pandas()
+
+
+def load_payloads(entry, path=None):
+    """Rebuild the original (air_quality, weather) JSON payloads of one archived fetch."""
+    table = pq.ParquetFile(os.path.join(archive_dir(path), entry["file"])).read()
+    meta = json.loads(table.schema.metadata[_META_KEY])
+    df = table.to_pandas()
+    df["time"] = df["time"].dt.strftime("%Y-%m-%dT%H:%M")
+
+    def payload(kind, cols):
+        hourly = {c: [None if pd.isna(v) else v for v in df[c].tolist()] for c in cols}
+        return {**meta[kind], "hourly": hourly}
+
+    return payload("air_quality", meta["aq_columns"]), payload("weather", meta["wx_columns"])
+
+
+def migrate_json_raw(folder, location: str = LOCATION, path=None):
+    """Convert legacy raw_combined_*.json files (indent=2 JSON) into the archive."""
+    entries = []
+    for f in sorted(glob.glob(os.path.join(folder, "raw_combined_*.json"))):
+        with open(f) as fh:
+            rec = json.load(fh)
+        saved_at = rec.get("metadata", {}).get("saved_at")
+        fetched_at = datetime.strptime(saved_at, "%Y-%m-%d_%H-%M-%S") if saved_at else None
+        entries.append(archive_raw(rec["air_quality"], rec["weather"], location, fetched_at, path))
+    return entries
+
+
+# --- Run standalone ---
+#   python src/raw_archive.py --migrate <folder>   → import legacy raw_combined_*.json files
+#   python src/raw_archive.py --bench              → archive vs JSON size + replay speed
+#   python src/raw_archive.py                      → re-run process → clean → features over the archive
+if __name__ == "__main__":
+    import sys
+    import time
+    import tempfile
+
+    if "--migrate" in sys.argv:
+        folder = sys.argv[sys.argv.index("--migrate") + 1]
+        print(f"📦 Migrated {len(migrate_json_raw(folder))} fetches into {archive_dir()}")
+
+    elif "--bench" in sys.argv:
+        # Synthetic daily fetches, a week of hourly values each (random → worst case for compression)
+        rng = np.random.default_rng(0)
+        n_fetches, hours = 365, 24 * 7
+        aq_vars = ["pm10", "pm2_5", "carbon_monoxide", "nitrogen_dioxide", "ozone", "sulphur_dioxide"]
+        wx_vars = ["temperature_2m", "relative_humidity_2m", "wind_speed_10m", "wind_direction_10m"]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            json_dir, arch_dir = os.path.join(tmp, "json"), os.path.join(tmp, "archive")
+            os.makedirs(json_dir)
+            t0 = pd.Timestamp("2025-01-01")
+            for i in range(n_fetches):
+                fetched = t0 + pd.Timedelta(days=i)
+                times = pd.date_range(fetched - pd.Timedelta(days=2), periods=hours, freq="h")
+                t_str = times.strftime("%Y-%m-%dT%H:%M").tolist()
+                aq = {"latitude": 24.86, "longitude": 67.0, "timezone": "GMT",
+                      "hourly": {"time": t_str, **{v: np.round(rng.gamma(2, 20, hours), 1).tolist() for v in aq_vars}}}
+                wx = {"latitude": 24.86, "longitude": 67.0, "timezone": "GMT",
+                      "hourly": {"time": t_str, **{v: np.round(rng.normal(25, 5, hours), 1).tolist() for v in wx_vars}}}
+                with open(os.path.join(json_dir, f"raw_combined_{fetched:%Y-%m-%d_%H-%M-%S}.json"), "w") as f:
+                    json.dump({"metadata": {"saved_at": f"{fetched:%Y-%m-%d_%H-%M-%S}"},
+                               "air_quality": aq, "weather": wx}, f, indent=2)
+                archive_raw(aq, wx, fetched_at=fetched, path=arch_dir)
+
+            json_files = glob.glob(os.path.join(json_dir, "*.json"))
+            json_bytes = sum(os.path.getsize(f) for f in json_files)
+            arch_bytes = int(read_manifest(arch_dir)["bytes"].sum())
+
+            t = time.perf_counter()
+            for f in sorted(json_files):
+                with open(f) as fh:
+                    rec = json.load(fh)
+                pd.merge(pd.DataFrame(rec["air_quality"]["hourly"]),
+                         pd.DataFrame(rec["weather"]["hourly"]), on="time")
+            json_s = time.perf_counter() - t
+
+            t = time.perf_counter()
+            rows = sum(len(chunk) for _, chunk in replay(path=arch_dir))
+            replay_s = time.perf_counter() - t
+
+            t = time.perf_counter()
+            for _, arrays in replay(columns=["pm2_5"], as_numpy=True, path=arch_dir):
+                arrays["pm2_5"].mean()
+            column_s = time.perf_counter() - t
+
+            # Round trip: rebuilt payloads equal the originals
+            entry = read_manifest(arch_dir).iloc[-1].to_dict()
+            aq_back, wx_back = load_payloads(entry, arch_dir)
+            assert aq_back == aq and wx_back == wx, "payload round trip mismatch"
+
+        print(f"\n🗄️ {n_fetches} fetches × {hours} hours ({rows:,} rows)")
+        print(f"  indent=2 JSON : {json_bytes / 1e6:8.2f} MB | parse+merge all : {json_s:6.2f} s")
+        print(f"  zstd Parquet  : {arch_bytes / 1e6:8.2f} MB | replay all       : {replay_s:6.2f} s")
+        print(f"  one column as NumPy across all fetches: {column_s:.2f} s")
+        print(f"  size ratio {json_bytes / arch_bytes:.1f}x, replay speedup {json_s / replay_s:.1f}x")
+        print("✅ Payload round trip exact")
+
+    else:
+        try:
+            from src.process_data import process_latest_json
+            from src.clean_data import clean_data
+            from src.process_features import add_features
+        except ModuleNotFoundError:
+            from process_data import process_latest_json
+            from clean_data import clean_data
+            from process_features import add_features
+
+        t = time.perf_counter()
+        n = 0
+        for entry, chunk in replay():
+            features = add_features(clean_data(process_latest_json(chunk)))
+            n += 1
+            print(f"🎞️ {entry['fetched_at']} ({entry['location']}) → {features.shape}")
+        print(f"✅ Replayed {n} archived fetches through the pipeline in {time.perf_counter() - t:.2f}s")
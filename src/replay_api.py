@@ -0,0 +1,147 @@
+# Purpose: Local stand-in for the Open-Meteo forecast APIs that replays recorded payloads
+
+import os
+import glob
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import pandas as pd
+
+try:
+    from src.config import AQ_HOURLY, WX_HOURLY, HOURLY_UNITS
+    from src.raw_archive import MANIFEST_FILE, replay
+except Exception:
+    from config import AQ_HOURLY, WX_HOURLY, HOURLY_UNITS
+    from raw_archive import MANIFEST_FILE, replay
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_recordings(path=None) -> pd.DataFrame:
+    """
+    Load recorded hours to replay. Accepts the raw archive (folder with a manifest,
+    as written by raw_archive.archive_raw), a folder of legacy raw_combined_*.json
+    files, or a CSV of merged hourly rows.
+    """
+    path = path or os.path.join(BASE_DIR, "data", "processed")
+
+    if os.path.exists(os.path.join(path, MANIFEST_FILE)):
+        # Later fetches win for overlapping hours (newest values)
+        df = pd.concat([chunk for _, chunk in replay(path=path)], ignore_index=True)
+        df = df.iloc[::-1]
+    elif os.path.isdir(path):
+        frames = []
+        for f in sorted(glob.glob(os.path.join(path, "raw_combined_*.json"))):
+            with open(f) as fh:
+                rec = json.load(fh)
+            aq = pd.DataFrame(rec["air_quality"]["hourly"])
+            wx = pd.DataFrame(rec["weather"]["hourly"])
+            frames.append(pd.merge(aq, wx, on="time", how="inner"))
+        if not frames:
+            frames = [pd.read_csv(f) for f in sorted(glob.glob(os.path.join(path, "*.csv")))]
+        df = pd.concat(frames, ignore_index=True)
+    else:
+        df = pd.read_csv(path)
+
+    if "datetime" in df.columns:
+        df.rename(columns={"datetime": "time"}, inplace=True)
+    df["time"] = pd.to_datetime(df["time"]).dt.strftime("%Y-%m-%dT%H:%M")
+    df = df.drop_duplicates(subset=["time"]).sort_values("time").reset_index(drop=True)
+    return df
+
+
+class _ReplayState:
+    """Per-coordinate cursor over the recorded hours (forecast_days=1 → 24h window)."""
+
+    def __init__(self, frame, window_hours=24, step_hours=1):
+        self.frame = frame
+        self.window_hours = window_hours
+        self.step_hours = step_hours
+        self.cursors = {}
+        self.served = {}
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def window(self, key, advance):
+        """Advancing requests move to the next window; others repeat the last one served."""
+        with self.lock:
+            self.requests += 1
+            if advance:
+                start = self.cursors.get(key, 0)
+                self.served[key] = start
+                self.cursors[key] = min(start + self.step_hours,
+                                        max(len(self.frame) - self.window_hours, 0))
+            else:
+                start = self.served.get(key, 0)
+            return self.frame.iloc[start:start + self.window_hours]
+
+
+def _make_handler(state):
+    class ReplayHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            qs = parse_qs(url.query)
+            key = (qs.get("latitude", ["0"])[0], qs.get("longitude", ["0"])[0])
+
+            if url.path.endswith("/air-quality"):
+                variables = AQ_HOURLY.split(",")
+                # Air-quality is requested first each poll → it moves the cursor
+                rows = state.window(key, advance=True)
+            elif url.path.endswith("/forecast"):
+                variables = WX_HOURLY.split(",")
+                rows = state.window(key, advance=False)
+            else:
+                self.send_error(404)
+                return
+
+            hourly = {"time": rows["time"].tolist()}
+            for v in variables:
+                hourly[v] = rows[v].where(rows[v].notna(), None).tolist() if v in rows else [None] * len(rows)
+
+            body = json.dumps({
+                "latitude": float(key[0]), "longitude": float(key[1]),
+                "hourly_units": {k: HOURLY_UNITS[k] for k in ["time"] + variables},
+                "hourly": hourly,
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return ReplayHandler
+
+
+def start_replay_server(frame=None, port=0, window_hours=24, step_hours=1):
+    """
+    Start the stand-in API in a background thread.
+    Returns (server, air_quality_base, weather_forecast_base); call server.shutdown() to stop.
+    """
+    frame = load_recordings() if frame is None else frame
+    state = _ReplayState(frame, window_hours, step_hours)
+    server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(state))
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    host, port = server.server_address
+    base = f"http://{host}:{port}/v1"
+    return server, f"{base}/air-quality", f"{base}/forecast"
+
+
+# --- Run standalone: serve recorded payloads until interrupted ---
+if __name__ == "__main__":
+    import time
+
+    server, aq_base, wx_base = start_replay_server(port=8765)
+    print(f"🎞️ Replaying {len(server.state.frame)} recorded hours")
+    print(f"AIR_QUALITY_BASE={aq_base}")
+    print(f"WEATHER_FORECAST_BASE={wx_base}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,218 @@
+# Purpose: Warm-start daily retraining — update the current best model with the hours
+# that arrived since it was trained, guarded by a holdout check (full refit on failure).
+
+import os
+import time
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+from sklearn.linear_model import Ridge
+from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+
+try:
+    from src.config import (
+        INCREMENTAL_HOLDOUT_HOURS, INCREMENTAL_TOLERANCE,
+        WARM_RECENT_HOURS, WARM_RF_TREES, WARM_XGB_ROUNDS
+    )
+    from src.model_artifacts import load_model_artifact, save_model_artifact, MODEL_DIR
+    from src.prediction_intervals import update_interval_model
+except ModuleNotFoundError:
+    from config import (
+        INCREMENTAL_HOLDOUT_HOURS, INCREMENTAL_TOLERANCE,
+        WARM_RECENT_HOURS, WARM_RF_TREES, WARM_XGB_ROUNDS
+    )
+    from model_artifacts import load_model_artifact, save_model_artifact, MODEL_DIR
+    from prediction_intervals import update_interval_model
+
+RIDGE_STATS_FILE = "ridge_stats.npz"
+RIDGE_ALPHA = 1.0
+# Written fresh by save_model_artifact → never carried over from the previous metadata
+ARTIFACT_KEYS = ("model_name", "model_version", "model_file", "scaler_file", "features", "metrics", "trained_at")
+
+
+# =============================================================
+# 📐 Ridge sufficient statistics (exact StandardScaler + Ridge refit)
+# =============================================================
+def ridge_stats(X, y):
+    """Raw moments: n, Σx, Σy, XᵀX, Xᵀy — mergeable by addition."""
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    return {"n": np.float64(len(y)), "sx": X.sum(axis=0), "sy": y.sum(),
+            "xtx": X.T @ X, "xty": X.T @ y}
+
+
+def merge_ridge_stats(a, b):
+    return {k: a[k] + b[k] for k in a}
+
+
+def save_ridge_stats(stats, model_dir=MODEL_DIR):
+    np.savez(os.path.join(model_dir, RIDGE_STATS_FILE), **stats)
+
+
+def load_ridge_stats(model_dir=MODEL_DIR):
+    path = os.path.join(model_dir, RIDGE_STATS_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as f:
+        return {k: f[k] for k in f.files}
+
+
+def ridge_from_stats(stats, features, alpha=RIDGE_ALPHA):
+    """
+    Rebuild the (StandardScaler, Ridge) pair train_model.py would fit on the
+    same rows, from moments alone: (ZᵀZ + αI) w = Zᵀy on standardized Z.
+    """
+    n, mean = stats["n"], stats["sx"] / stats["n"]
+    y_mean = stats["sy"] / n
+    cov = stats["xtx"] / n - np.outer(mean, mean)
+    var = np.clip(np.diag(cov), 0.0, None)
+    scale = np.where(var > 0, np.sqrt(var), 1.0)
+
+    ztz = n * cov / np.outer(scale, scale)
+    zty = (stats["xty"] - n * mean * y_mean) / scale
+    coef = np.linalg.solve(ztz + alpha * np.eye(len(scale)), zty)
+
+    scaler = StandardScaler()
+    scaler.mean_, scaler.var_, scaler.scale_ = mean, var, scale
+    scaler.n_samples_seen_ = int(n)
+    scaler.n_features_in_ = len(features)
+    scaler.feature_names_in_ = np.asarray(features, dtype=object)
+
+    ridge = Ridge(alpha=alpha)
+    ridge.coef_, ridge.intercept_ = coef, float(y_mean)
+    ridge.n_features_in_ = len(features)
+    return scaler, ridge
+
+
+# =============================================================
+# 🔁 Warm-start updates per model family
+# =============================================================
+def _update_xgboost(model, X_recent, y_recent):
+    from xgboost import XGBRegressor
+    params = model.get_params()
+    params["n_estimators"] = WARM_XGB_ROUNDS
+    updated = XGBRegressor(**params)
+    # Continue boosting from the previous booster
+    updated.fit(X_recent, y_recent, xgb_model=model.get_booster())
+    return updated, None
+
+
+def _update_random_forest(model, X_recent, y_recent):
+    # Add WARM_RF_TREES trees fitted on the recent window, then retire the oldest ones
+    n_old = len(model.estimators_)
+    model.set_params(warm_start=True, n_estimators=n_old + WARM_RF_TREES)
+    model.fit(X_recent, y_recent)
+    model.estimators_ = model.estimators_[WARM_RF_TREES:]
+    model.set_params(n_estimators=len(model.estimators_), warm_start=False)
+    return model, None
+
+
+def _update_ridge(stats, X_new, y_new, features):
+    stats = merge_ridge_stats(stats, ridge_stats(X_new, y_new))
+    scaler, ridge = ridge_from_stats(stats, features)
+    return ridge, scaler, stats
+
+
+def _score(model, X, y):
+    preds = model.predict(X)
+    return {
+        "RMSE": float(np.sqrt(mean_squared_error(y, preds))),
+        "MAE": float(mean_absolute_error(y, preds)),
+        "R²": float(r2_score(y, preds)) if len(y) > 1 else float("nan"),
+    }
+
+
+def incremental_retrain(df: pd.DataFrame, feature_cols, data_fingerprint=None):
+    """
+    Update the saved best model with rows newer than its `trained_through` mark.
+    `df` must be the prepared training frame (datetime, features, aqi), sorted.
+    Returns a report dict; report["accepted"] is False when a full refit is needed.
+    Everything else the full fit recorded (interval model, fingerprints, drift reference,
+    selection) is carried forward; data_fingerprint, if given, replaces the old one.
+    """
+    model, metadata = load_model_artifact()
+    name = metadata.get("model_name", "")
+    report = {"model_name": name, "accepted": False}
+
+    trained_through = metadata.get("trained_through")
+    if trained_through is None or list(metadata.get("features", [])) != list(feature_cols):
+        report["reason"] = "no trained_through mark or feature set changed"
+        return report
+
+    new = df[df["datetime"] > pd.Timestamp(trained_through)]
+    if len(new) <= INCREMENTAL_HOLDOUT_HOURS:
+        report["reason"] = f"only {len(new)} new rows (holdout needs > {INCREMENTAL_HOLDOUT_HOURS})"
+        return report
+
+    # Newest hours are the holdout; everything before it may be learned
+    holdout = new.tail(INCREMENTAL_HOLDOUT_HOURS)
+    update = new.iloc[:-INCREMENTAL_HOLDOUT_HOURS]
+    learnable = df[df["datetime"] < holdout["datetime"].min()]
+    recent = learnable.tail(WARM_RECENT_HOURS)
+    X_hold, y_hold = holdout[feature_cols], holdout["aqi"]
+
+    before = _score(model, X_hold, y_hold)
+
+    t0 = time.perf_counter()
+    scaler, stats = None, None
+    if name == "XGBoost":
+        updated, _ = _update_xgboost(model, recent[feature_cols], recent["aqi"])
+    elif name == "Random Forest":
+        updated, _ = _update_random_forest(model, recent[feature_cols], recent["aqi"])
+    elif name == "Ridge Regression":
+        stats = load_ridge_stats()
+        if stats is None:
+            report["reason"] = "missing ridge sufficient statistics"
+            return report
+        updated, scaler, stats = _update_ridge(stats, update[feature_cols], update["aqi"], feature_cols)
+    else:
+        report["reason"] = f"no warm-start path for '{name}'"
+        return report
+    incremental_seconds = time.perf_counter() - t0
+
+    if scaler is not None:
+        from sklearn.pipeline import Pipeline
+        after = _score(Pipeline([("scaler", scaler), ("model", updated)]), X_hold, y_hold)
+    else:
+        after = _score(updated, X_hold, y_hold)
+
+    full_fit_seconds = metadata.get("full_fit_seconds")
+    report.update({
+        "new_rows": len(update),
+        "holdout_rows": len(holdout),
+        "holdout_before": before,
+        "holdout_after": after,
+        "incremental_seconds": round(incremental_seconds, 3),
+        "full_fit_seconds": full_fit_seconds,
+        "time_saved_seconds": round(full_fit_seconds - incremental_seconds, 3) if full_fit_seconds is not None else None,
+    })
+
+    # Guard: the update must not be worse than the model it replaces on unseen hours
+    if after["RMSE"] > before["RMSE"] * (1 + INCREMENTAL_TOLERANCE):
+        report["reason"] = f"holdout RMSE degraded {before['RMSE']:.3f} → {after['RMSE']:.3f}"
+        return report
+
+    # The XGBoost quantile companion must follow the booster it brackets
+    if name == "XGBoost" and metadata.get("interval_model_file"):
+        update_interval_model(metadata["interval_model_file"], recent[feature_cols], recent["aqi"], WARM_XGB_ROUNDS)
+
+    carried = {k: v for k, v in metadata.items() if k not in ARTIFACT_KEYS}
+    if data_fingerprint is not None:
+        carried["data_fingerprint"] = data_fingerprint
+    save_model_artifact(
+        updated, name, features=feature_cols, metrics=after, scaler=scaler,
+        extra={
+            **carried,
+            "training_mode": "incremental",
+            "warm_started_from": metadata.get("model_version"),
+            "trained_through": str(update["datetime"].max()),
+            "full_fit_seconds": full_fit_seconds,
+            "incremental_seconds": report["incremental_seconds"],
+            "time_saved_seconds": report["time_saved_seconds"],
+        },
+    )
+    if stats is not None:
+        save_ridge_stats(stats)
+
+    report["accepted"] = True
+    return report
@@ -0,0 +1,238 @@
+# Purpose: Revision-aware incremental ingest. Keeps a per-hour content hash of the raw
+# measurement columns so each fetch knows exactly which hours are new or were revised
+# upstream, then recomputes AQI + window features only for the spans those hours affect.
+
+import os
+import json
+import sqlite3
+import numpy as np
+import pandas as pd
+
+try:
+    from src.config import (
+        REVISION_STATE_PATH, INGEST_STATE_HOURS, REVISION_WINDOW_HOURS,
+        REVISION_CONTEXT_HOURS, AQ_HOURLY, WX_HOURLY, LOCATION
+    )
+    from src.clean_data import clean_data
+    from src.process_features import add_features
+    from src.polars_backend import clean_and_add_features
+except Exception:
+    from config import (
+        REVISION_STATE_PATH, INGEST_STATE_HOURS, REVISION_WINDOW_HOURS,
+        REVISION_CONTEXT_HOURS, AQ_HOURLY, WX_HOURLY, LOCATION
+    )
+    from clean_data import clean_data
+    from process_features import add_features
+    from polars_backend import clean_and_add_features
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RAW_COLS = AQ_HOURLY.split(",") + WX_HOURLY.split(",")
+
+
+def _hours(times):
+    return np.asarray(pd.to_datetime(times), dtype="datetime64[h]").astype(np.int64)
+
+
+def hash_rows(df: pd.DataFrame) -> np.ndarray:
+    """64-bit content hash of the raw measurement columns, one per row (as int64)."""
+    raw = df.reindex(columns=RAW_COLS).apply(pd.to_numeric, errors="coerce").astype(np.float64)
+    return pd.util.hash_pandas_object(raw, index=False).to_numpy().view(np.int64)
+
+
+class IngestState:
+    """SQLite table raw_hours(location, hour) → (content hash, raw row) for the last N hours."""
+
+    def __init__(self, path=None, max_hours=INGEST_STATE_HOURS):
+        self.path = path or os.path.join(BASE_DIR, REVISION_STATE_PATH)
+        self.max_hours = max_hours
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS raw_hours ("
+            " location TEXT NOT NULL, hour INTEGER NOT NULL, hash INTEGER NOT NULL, payload TEXT NOT NULL,"
+            " PRIMARY KEY (location, hour)"
+            ") WITHOUT ROWID"
+        )
+        self.conn.commit()
+
+    def hashes(self, hours, location=LOCATION):
+        """Stored hash per hour (0 where the hour has never been seen)."""
+        if not len(hours):
+            return np.zeros(0, dtype=np.int64)
+        rows = dict(self.conn.execute(
+            "SELECT hour, hash FROM raw_hours WHERE location = ? AND hour >= ? AND hour <= ?",
+            (location, int(hours.min()), int(hours.max()))
+        ).fetchall())
+        return np.array([rows.get(int(h), 0) for h in hours], dtype=np.int64)
+
+    def upsert(self, df: pd.DataFrame, hashes, location=LOCATION):
+        hours = _hours(df["datetime"])
+        payloads = df.reindex(columns=RAW_COLS).to_dict(orient="records")
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO raw_hours VALUES (?, ?, ?, ?)",
+            [(location, int(h), int(k), json.dumps(p, default=float)) for h, k, p in zip(hours, hashes, payloads)]
+        )
+        newest = self.conn.execute("SELECT MAX(hour) FROM raw_hours WHERE location = ?", (location,)).fetchone()[0]
+        self.conn.execute("DELETE FROM raw_hours WHERE location = ? AND hour <= ?",
+                          (location, newest - self.max_hours))
+        self.conn.commit()
+
+    def window(self, start_hour, end_hour, location=LOCATION) -> pd.DataFrame:
+        """Stored raw rows with start_hour <= hour <= end_hour, oldest first."""
+        rows = self.conn.execute(
+            "SELECT hour, payload FROM raw_hours WHERE location = ? AND hour >= ? AND hour <= ? ORDER BY hour",
+            (location, int(start_hour), int(end_hour))
+        ).fetchall()
+        df = pd.DataFrame([json.loads(p) for _, p in rows], columns=RAW_COLS)
+        df.insert(0, "datetime", pd.to_datetime(np.array([h for h, _ in rows], dtype="datetime64[h]")))
+        return df
+
+    def close(self):
+        self.conn.close()
+
+
+def affected_hours(changed, known, window=REVISION_WINDOW_HOURS):
+    """Hours whose features depend on a changed hour: each change invalidates itself + the next `window` hours."""
+    spread = np.unique((np.asarray(changed)[:, None] + np.arange(window + 1)).ravel())
+    return spread[np.isin(spread, known)]
+
+
+def ingest_revisions(processed: pd.DataFrame, location=LOCATION, state=None, log_path=None):
+    """
+    Diff a processed fetch against the stored hashes and rebuild features only where needed.
+    Returns (feature rows to upsert downstream, report dict with new / revised / unchanged /
+    recomputed counts, commit). An empty frame means nothing changed upstream.
+    The new hashes are NOT stored yet: call commit() once the rows were written downstream,
+    so a failed upload leaves those hours "changed" and the next run retries them.
+    """
+    own_state = state is None
+    state = state or IngestState()
+    try:
+        # 1. Hash the fetched hours and compare with what was ingested before
+        fetched = processed.drop_duplicates(subset=["datetime"], keep="last").sort_values("datetime")
+        hours = _hours(fetched["datetime"])
+        new_hashes = hash_rows(fetched)
+        old_hashes = state.hashes(hours, location)
+        is_new = old_hashes == 0
+        is_revised = ~is_new & (old_hashes != new_hashes)
+        changed = hours[is_new | is_revised]
+
+        report = {
+            "run_at": str(pd.Timestamp.now().floor("s")),
+            "location": location,
+            "fetched": int(len(hours)),
+            "new": int(is_new.sum()),
+            "revised": int(is_revised.sum()),
+            "unchanged": int((~is_new & ~is_revised).sum()),
+            "recomputed": 0,
+            "revised_hours": [str(np.datetime64(int(h), "h")) for h in hours[is_revised]],
+        }
+        if not len(changed):
+            _log_report(report, log_path)
+            return pd.DataFrame(), report, lambda: None
+
+        # 2. Rebuild features over the invalidated span from the stored rows overlaid with the
+        #    changed ones (plus enough earlier context for lags, rolling windows and NowCast)
+        rows, row_hashes = fetched[is_new | is_revised], new_hashes[is_new | is_revised]
+        lo, hi = int(changed.min()), int(changed.max()) + REVISION_WINDOW_HOURS
+        stored = state.window(lo - REVISION_CONTEXT_HOURS, hi, location)
+        overlay = rows.reindex(columns=["datetime"] + RAW_COLS).assign(datetime=pd.to_datetime(rows["datetime"]))
+        context = pd.concat([stored, overlay], ignore_index=True)
+        context = context.drop_duplicates(subset=["datetime"], keep="last").sort_values("datetime").reset_index(drop=True)
+        affected = affected_hours(changed, _hours(context["datetime"]))
+
+        featured = clean_and_add_features(context)
+        featured = featured[np.isin(_hours(featured["datetime"]), affected)].reset_index(drop=True)
+        report["recomputed"] = int(len(featured))
+        _log_report(report, log_path)
+
+        # 3. Persist the hashes only after the caller's write succeeded
+        def commit():
+            target = IngestState(state.path, state.max_hours) if own_state else state
+            try:
+                target.upsert(rows, row_hashes, location)
+            finally:
+                if own_state:
+                    target.close()
+
+        return featured, report, commit
+    finally:
+        if own_state:
+            state.close()
+
+
+def _log_path(log_path=None):
+    return log_path or os.path.join(os.path.dirname(os.path.join(BASE_DIR, REVISION_STATE_PATH)), "ingest_log.jsonl")
+
+
+def _log_report(report, log_path=None):
+    path = _log_path(log_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(report) + "\n")
+
+
+def read_ingest_log(log_path=None) -> pd.DataFrame:
+    path = _log_path(log_path)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=["run_at", "location", "fetched", "new", "revised", "unchanged", "recomputed"])
+    return pd.read_json(path, lines=True)
+
+
+# --- Run standalone: two overlapping fetches with upstream corrections ---
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    try:
+        from src.synthetic_api import synthetic_hourly
+    except Exception:
+        from synthetic_api import synthetic_hourly
+
+    times = pd.date_range("2025-03-01", periods=24 * 5, freq="h")
+    full = pd.DataFrame(synthetic_hourly(24.86, 67.0, times, RAW_COLS)).rename(columns={"time": "datetime"})
+    full["datetime"] = pd.to_datetime(full["datetime"])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        state = IngestState(os.path.join(tmp, "state.db"))
+        log = os.path.join(tmp, "log.jsonl")
+
+        # Day 1-4 ingested; then a fetch of days 4-5 (past_days=1) where upstream corrected 3 hours of day 4
+        first, report, commit = ingest_revisions(full.iloc[:96], state=state, log_path=log)
+        assert report["new"] == 96 and len(first) == 96
+        commit()
+
+        refetch = full.iloc[72:].copy()
+        revised_idx = refetch.index[[5, 6, 20]]
+        refetch.loc[revised_idx, "pm2_5"] += 40.0
+        t0 = time.perf_counter()
+        rows, report, commit = ingest_revisions(refetch, state=state, log_path=log)
+        incremental_ms = (time.perf_counter() - t0) * 1000
+
+        # Upload failed → nothing committed, so the same fetch is still seen as changed
+        _, retry, _ = ingest_revisions(refetch, state=state, log_path=log)
+        assert retry["revised"] == 3 and retry["new"] == 24
+        commit()
+
+        assert report["revised"] == 3 and report["new"] == 24 and report["unchanged"] == 21
+        # Revised hours 77, 78, 92 invalidate 77..116; new hours 96..119 are rebuilt as well
+        assert len(rows) == 119 - 77 + 1, len(rows)
+
+        # Features of the rebuilt rows equal a full recompute over the corrected history
+        corrected = full.copy()
+        corrected.loc[revised_idx, "pm2_5"] += 40.0
+        reference = add_features(clean_data(corrected.iloc[77 - REVISION_CONTEXT_HOURS:]))
+        reference = reference.set_index("datetime").loc[rows["datetime"]]
+        assert np.allclose(rows.set_index("datetime")["aqi"], reference["aqi"])
+        assert np.allclose(rows.set_index("datetime")["aqi_rolling_24h"], reference["aqi_rolling_24h"])
+
+        # A refetch with no upstream changes produces nothing to upsert
+        nothing, report, _ = ingest_revisions(refetch, state=state, log_path=log)
+        assert nothing.empty and report["unchanged"] == 48
+        history = read_ingest_log(log)
+        state.close()
+
+    print(history[["fetched", "new", "revised", "unchanged", "recomputed"]].to_string(index=False))
+    print(f"⚡ Revision fetch diffed + {len(rows)} rows rebuilt in {incremental_ms:.1f} ms")
+    print("✅ Only new/revised hours and their dependent windows were recomputed")
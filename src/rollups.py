@@ -0,0 +1,308 @@
+# Purpose: Materialized AQI rollups per location at hour / day / month / year granularity.
+# Each row holds mergeable aggregates (count, sum, sum of squares, min, max and a
+# 1-AQI-unit histogram = exact quantile sketch for integer AQI), so any date range is
+# answered by merging a bounded number of rows instead of grouping the hourly history.
+
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+
+try:
+    from src.config import ROLLUP_STORE_PATH, LOCATION
+except Exception:
+    from config import ROLLUP_STORE_PATH, LOCATION
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+AQI_MAX = 500
+N_BINS = AQI_MAX + 1
+# Level name → numpy datetime unit; coarsest first (query decomposition order)
+LEVELS = {"year": "Y", "month": "M", "day": "D", "hour": "h"}
+PARENT = {"hour": "day", "day": "month", "month": "year"}
+# Upper bounds of the dashboard categories (Good … Very Unhealthy; rest = Hazardous)
+CATEGORY_EDGES = [50, 100, 150, 200, 300]
+CATEGORY_NAMES = ["good", "moderate", "unhealthy_sensitive", "unhealthy", "very_unhealthy", "hazardous"]
+PERCENTILES = [50, 90, 95]
+
+
+def _bucket(times, level):
+    return np.asarray(times, dtype="datetime64[h]").astype(f"datetime64[{LEVELS[level]}]").astype(np.int64)
+
+
+def _bucket_start_hour(buckets, level):
+    return np.asarray(buckets).astype(f"datetime64[{LEVELS[level]}]").astype("datetime64[h]").astype(np.int64)
+
+
+def _empty():
+    return {"count": 0, "sum": 0.0, "sumsq": 0.0, "min": np.inf, "max": -np.inf,
+            "hist": np.zeros(N_BINS, dtype=np.int64)}
+
+
+def summarize(agg, percentiles=PERCENTILES):
+    """Merged aggregate → mean / std / min / max / percentiles / hours per category."""
+    n = agg["count"]
+    out = {"count": int(n)}
+    if not n:
+        out.update({"mean": np.nan, "std": np.nan, "min": np.nan, "max": np.nan})
+        out.update({f"p{q}": np.nan for q in percentiles})
+        out.update({f"hours_{c}": 0 for c in CATEGORY_NAMES})
+        return out
+
+    mean = agg["sum"] / n
+    out.update({
+        "mean": mean,
+        "std": float(np.sqrt(max(agg["sumsq"] / n - mean * mean, 0.0))),
+        "min": float(agg["min"]),
+        "max": float(agg["max"]),
+    })
+    # Nearest-rank percentiles (numpy's "inverted_cdf") from the cumulative histogram
+    cdf = np.cumsum(agg["hist"])
+    for q in percentiles:
+        out[f"p{q}"] = float(np.searchsorted(cdf, np.ceil(q / 100 * n)))
+    below = np.concatenate([[0], cdf[CATEGORY_EDGES], [n]])
+    out.update({f"hours_{c}": int(k) for c, k in zip(CATEGORY_NAMES, np.diff(below))})
+    return out
+
+
+class RollupStore:
+    """SQLite table rollups(location, level, bucket) → aggregates; hour rows are the source of truth."""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(BASE_DIR, ROLLUP_STORE_PATH)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS rollups ("
+            " location TEXT NOT NULL, level TEXT NOT NULL, bucket INTEGER NOT NULL,"
+            " count INTEGER NOT NULL, sum REAL NOT NULL, sumsq REAL NOT NULL,"
+            " min REAL NOT NULL, max REAL NOT NULL, hist BLOB,"
+            " PRIMARY KEY (location, level, bucket)"
+            ") WITHOUT ROWID"
+        )
+        self.conn.commit()
+
+    # --- Maintenance ---
+    def update(self, df: pd.DataFrame, location=LOCATION):
+        """
+        Upsert hourly AQI rows (datetime/datetime_str + aqi), then recompute only the
+        day / month / year buckets they touch from the level below. Revised hours
+        simply overwrite their hour row. Returns the number of hours written.
+        """
+        times = pd.to_datetime(df["datetime"] if "datetime" in df.columns else df["datetime_str"])
+        values = pd.to_numeric(df["aqi"], errors="coerce").to_numpy(dtype=float)
+        ok = ~np.isnan(values)
+        hours = _bucket(times.to_numpy()[ok], "hour")
+        values = values[ok]
+        if not len(hours):
+            return 0
+
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO rollups VALUES (?, 'hour', ?, 1, ?, ?, ?, ?, NULL)",
+            [(location, int(h), v, v * v, v, v) for h, v in zip(hours, values)]
+        )
+        dirty = np.unique(hours)
+        for level in ["day", "month", "year"]:
+            child = {"day": "hour", "month": "day", "year": "month"}[level]
+            parents = np.unique(_bucket(dirty.astype(f"datetime64[{LEVELS[child]}]"), level))
+            self._recompute(location, level, child, parents)
+            dirty = parents
+        self.conn.commit()
+        return len(hours)
+
+    def _recompute(self, location, level, child, parents):
+        lo = _bucket_start_hour(parents.min(), level)
+        hi = _bucket_start_hour(parents.max() + 1, level)
+        lo_child, hi_child = _bucket(np.datetime64(int(lo), "h"), child), _bucket(np.datetime64(int(hi), "h"), child)
+        rows = self._rows(location, child, lo_child, hi_child)
+        if not len(rows["bucket"]):
+            return
+
+        parent_of = _bucket(_bucket_start_hour(rows["bucket"], child).astype("datetime64[h]"), level)
+        wanted = np.isin(parent_of, parents)
+        keys, inv = np.unique(parent_of[wanted], return_inverse=True)
+        k = len(keys)
+
+        count = np.bincount(inv, rows["count"][wanted], minlength=k).astype(np.int64)
+        total = np.bincount(inv, rows["sum"][wanted], minlength=k)
+        sumsq = np.bincount(inv, rows["sumsq"][wanted], minlength=k)
+        mins = np.full(k, np.inf)
+        maxs = np.full(k, -np.inf)
+        np.minimum.at(mins, inv, rows["min"][wanted])
+        np.maximum.at(maxs, inv, rows["max"][wanted])
+        hist = np.zeros((k, N_BINS), dtype=np.int64)
+        np.add.at(hist, inv, rows["hist"][wanted])
+
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(location, level, int(keys[i]), int(count[i]), float(total[i]), float(sumsq[i]),
+              float(mins[i]), float(maxs[i]), hist[i].astype(np.uint32).tobytes()) for i in range(k)]
+        )
+
+    def _rows(self, location, level, lo, hi):
+        """Rows of one level with lo <= bucket < hi as arrays (hour histograms built on the fly)."""
+        rows = self.conn.execute(
+            "SELECT bucket, count, sum, sumsq, min, max, hist FROM rollups"
+            " WHERE location = ? AND level = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+            (location, level, int(lo), int(hi))
+        ).fetchall()
+        out = {
+            "bucket": np.array([r[0] for r in rows], dtype=np.int64),
+            "count": np.array([r[1] for r in rows], dtype=np.int64),
+            "sum": np.array([r[2] for r in rows], dtype=float),
+            "sumsq": np.array([r[3] for r in rows], dtype=float),
+            "min": np.array([r[4] for r in rows], dtype=float),
+            "max": np.array([r[5] for r in rows], dtype=float),
+        }
+        if level == "hour":
+            hist = np.zeros((len(rows), N_BINS), dtype=np.int64)
+            bins = np.clip(np.round(out["sum"]), 0, AQI_MAX).astype(np.int64)
+            hist[np.arange(len(rows)), bins] = 1
+        else:
+            hist = np.frombuffer(b"".join(r[6] for r in rows), dtype=np.uint32).reshape(len(rows), N_BINS)
+        out["hist"] = hist.astype(np.int64)
+        return out
+
+    # --- Queries ---
+    def bounds(self, location=LOCATION):
+        """(first hour, last hour) stored for a location, or None."""
+        lo, hi = self.conn.execute(
+            "SELECT MIN(bucket), MAX(bucket) FROM rollups WHERE location = ? AND level = 'hour'", (location,)
+        ).fetchone()
+        if lo is None:
+            return None
+        return pd.Timestamp(np.datetime64(lo, "h")), pd.Timestamp(np.datetime64(hi, "h"))
+
+    def _decompose(self, a, b, levels=tuple(LEVELS)):
+        """Cover hours [a, b) with whole buckets, coarsest first → [(level, lo, hi), ...]."""
+        if a >= b:
+            return []
+        level, finer = levels[0], levels[1:]
+        if level == "hour":
+            return [("hour", a, b)]
+        unit = LEVELS[level]
+        first = np.datetime64(int(a), "h").astype(f"datetime64[{unit}]")
+        if first.astype("datetime64[h]").astype(np.int64) < a:
+            first += 1
+        last = np.datetime64(int(b), "h").astype(f"datetime64[{unit}]")
+        first_i, last_i = first.astype(np.int64), last.astype(np.int64)
+        if first_i >= last_i:
+            return self._decompose(a, b, finer)
+        start_h = int(first.astype("datetime64[h]").astype(np.int64))
+        end_h = int(last.astype("datetime64[h]").astype(np.int64))
+        return (self._decompose(a, start_h, finer) + [(level, first_i, last_i)]
+                + self._decompose(end_h, b, finer))
+
+    def aggregate(self, start, end, location=LOCATION):
+        """Merged raw aggregate for start <= hour < end."""
+        a = int(np.datetime64(pd.Timestamp(start).floor("h").to_datetime64(), "h").astype(np.int64))
+        b = int(np.datetime64(pd.Timestamp(end).floor("h").to_datetime64(), "h").astype(np.int64))
+        agg = _empty()
+        self.rows_read = 0
+        for level, lo, hi in self._decompose(a, b):
+            rows = self._rows(location, level, lo, hi)
+            self.rows_read += len(rows["bucket"])
+            if not len(rows["bucket"]):
+                continue
+            agg["count"] += int(rows["count"].sum())
+            agg["sum"] += float(rows["sum"].sum())
+            agg["sumsq"] += float(rows["sumsq"].sum())
+            agg["min"] = min(agg["min"], float(rows["min"].min()))
+            agg["max"] = max(agg["max"], float(rows["max"].max()))
+            agg["hist"] += rows["hist"].sum(axis=0)
+        return agg
+
+    def query(self, start, end, location=LOCATION, percentiles=PERCENTILES):
+        """Mean / std / min / max / percentiles / hours per category for start <= t < end."""
+        return summarize(self.aggregate(start, end, location), percentiles)
+
+    def series(self, start, end, freq="D", location=LOCATION):
+        """
+        One row per period ("D" daily, "W" weekly from Monday, "M" monthly) in [start, end).
+        Every period is an independent range query, so partial edge periods are exact.
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        anchors = {"D": "D", "W": "W-MON", "M": "MS"}[freq]
+        edges = pd.date_range(start.normalize(), end, freq=anchors)
+        edges = [start] + [e for e in edges if start < e < end] + [end]
+        rows = [{"period_start": lo, **self.query(lo, hi, location)} for lo, hi in zip(edges[:-1], edges[1:])]
+        return pd.DataFrame(rows)
+
+    def close(self):
+        self.conn.close()
+
+
+def update_rollups(df, location=LOCATION, path=None):
+    """Convenience wrapper used by the feature pipeline after each upload."""
+    store = RollupStore(path)
+    try:
+        n = store.update(df, location)
+        print(f"🧱 Rollups updated → {n} hours for '{location}' ({store.path})")
+        return n
+    finally:
+        store.close()
+
+
+# --- Run standalone ---
+#   python src/rollups.py            → exactness vs pandas + incremental update / query timings
+#   python src/rollups.py --rebuild  → (re)build rollups from data/final/final_selected_features.csv
+if __name__ == "__main__":
+    import sys
+    import time
+    import tempfile
+
+    if "--rebuild" in sys.argv:
+        features = pd.read_csv(os.path.join(BASE_DIR, "data", "final", "final_selected_features.csv"))
+        update_rollups(features)
+        sys.exit(0)
+
+    rng = np.random.default_rng(7)
+    hours = 24 * 365 * 5
+    times = pd.date_range("2021-01-01", periods=hours, freq="h")
+    aqi = np.clip(np.round(90 + 40 * np.sin(np.arange(hours) / 500) + rng.gamma(2, 15, hours)), 0, 500)
+    history = pd.DataFrame({"datetime": times, "aqi": aqi})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RollupStore(os.path.join(tmp, "rollups.db"))
+
+        t0 = time.perf_counter()
+        store.update(history.iloc[:-24])
+        build_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        store.update(history.iloc[-24:])                      # daily pipeline append
+        store.update(history.iloc[-30:-29].assign(aqi=123))   # revised hour
+        history.loc[history.index[-30], "aqi"] = 123
+        append_ms = (time.perf_counter() - t0) * 1000
+
+        def reference(lo, hi):
+            v = history.loc[(history["datetime"] >= lo) & (history["datetime"] < hi), "aqi"].to_numpy()
+            cats = np.diff(np.concatenate([[0], [(v <= e).sum() for e in CATEGORY_EDGES], [len(v)]]))
+            return {"count": len(v), "mean": v.mean(), "min": v.min(), "max": v.max(),
+                    **{f"p{q}": np.percentile(v, q, method="inverted_cdf") for q in PERCENTILES},
+                    **{f"hours_{c}": k for c, k in zip(CATEGORY_NAMES, cats)}}
+
+        query_ms, pandas_ms, rows_read = [], [], []
+        for _ in range(200):
+            a, b = np.sort(rng.integers(0, hours, 2))
+            lo, hi = times[a], times[b] + pd.Timedelta(hours=1)
+            t0 = time.perf_counter()
+            got = store.query(lo, hi)
+            query_ms.append((time.perf_counter() - t0) * 1000)
+            rows_read.append(store.rows_read)
+            t0 = time.perf_counter()
+            ref = reference(lo, hi)
+            pandas_ms.append((time.perf_counter() - t0) * 1000)
+            for k, v in ref.items():
+                assert np.isclose(got[k], v), f"{k}: rollup {got[k]} != pandas {v} for [{lo}, {hi})"
+
+        monthly = store.series("2021-01-01", "2026-01-01", "M")
+        assert monthly["count"].sum() == hours
+        store.close()
+
+    print(f"🧱 Rebuild {hours:,} hours: {build_s:.2f}s | incremental 24h append + revision: {append_ms:.1f} ms")
+    print(f"🔎 200 random ranges: rollup query median {np.median(query_ms):.2f} ms "
+          f"(max {max(rows_read)} rows merged) vs pandas filter {np.median(pandas_ms):.2f} ms")
+    print(monthly.head(3).to_string(index=False))
+    print("✅ Rollup aggregates match pandas exactly")
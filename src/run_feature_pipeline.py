@@ -6,23 +6,25 @@ from datetime import datetime
 
 # --- Import project modules safely ---
 try:
-    from src.config import SAVE_LOCAL, AIR_QUALITY_URL, WEATHER_FORECAST_URL
+    from src.config import SAVE_LOCAL, AIR_QUALITY_URL, WEATHER_FORECAST_URL, LOCATION
     from src.fetch_data import fetch_api_data
     from src.process_data import process_latest_json
-    from src.clean_data import clean_data
-    from src.process_features import add_features
-    from src.upload_to_hopswork import upload_to_hopsworks
+    from src.upload_to_hopswork import upload_to_hopsworks, feature_group_name, FEATURE_GROUP_VERSION
+    from src.raw_archive import archive_raw
+    from src.revision_ingest import ingest_revisions
+    from src.payload_validation import check_fetch
 except ModuleNotFoundError:
-    from config import SAVE_LOCAL, AIR_QUALITY_URL, WEATHER_FORECAST_URL
+    from config import SAVE_LOCAL, AIR_QUALITY_URL, WEATHER_FORECAST_URL, LOCATION
     from fetch_data import fetch_api_data
     from process_data import process_latest_json
-    from clean_data import clean_data
-    from process_features import add_features
-    from upload_to_hopswork import upload_to_hopsworks
+    from upload_to_hopswork import upload_to_hopsworks, feature_group_name, FEATURE_GROUP_VERSION
+    from raw_archive import archive_raw
+    from revision_ingest import ingest_revisions
+    from payload_validation import check_fetch
 
 
 # 1. Pipeline Start 
-print("/n🚀 Starting Daily Feature Pipeline for Karachi AQI/n")
+print(f"/n🚀 Starting Daily Feature Pipeline for {LOCATION.title()} AQI/n")
 
 try:
     # 2. Step 1: Fetch Latest Raw Data
@@ -32,6 +34,17 @@ try:
     aq_json = fetch_api_data(AIR_QUALITY_URL)
     wx_json = fetch_api_data(WEATHER_FORECAST_URL)
 
+    # Fail fast on bad payloads (schema, units, lengths, nulls, ranges, hour gaps) before any
+    # DataFrame is built; rejected / quarantined batches are kept under data/validation/
+    validation = check_fetch(aq_json, wx_json)
+    print(f"🛡️ Payloads validated in {validation['validation_ms']:.1f} ms "
+          f"({validation['hours']['air_quality']} + {validation['hours']['weather']} hours)")
+
+    # Keep the raw responses so past fetches can be replayed without the network
+    if SAVE_LOCAL:
+        entry = archive_raw(aq_json, wx_json)
+        print(f"🗄️ Raw responses archived → {entry['file']}")
+
     # Convert to DataFrames safely
     aq_df = pd.DataFrame(aq_json["hourly"])
     wx_df = pd.DataFrame(wx_json["hourly"])
@@ -50,28 +63,32 @@ try:
     processed_df = process_latest_json(raw_df)
     print(f"✅ Processed data shape: {processed_df.shape}")
 
-    # 4. Step 3: Clean Data (EDA-1 logic) 
-    print("\n🧹 Cleaning processed data...")
-    cleaned_df = clean_data(processed_df)
-    print(f"✅ Cleaned data shape: {cleaned_df.shape}")
-
-    # 5. Step 4: Feature Engineering (EDA-2 logic) 
-    print("\n🧠 Generating engineered features...")
-    featured_df = add_features(cleaned_df)
-    print(f"✅ Feature engineering complete — shape: {featured_df.shape}")
-
-    # 6. Step 5: Upload to Hopsworks
-    print("\n📦 Uploading final dataset to Hopsworks Feature Store...")
-    upload_to_hopsworks(featured_df)
-
-    # 7. Verification Step: Read data back from Feature Store
+    # 4. Step 3 + 4: Diff against previously ingested hours, then clean + engineer
+    #    features only for new / revised hours and the windows that depend on them
+    print("\n🔁 Detecting new and revised hours...")
+    featured_df, revisions, commit_revisions = ingest_revisions(processed_df, location=LOCATION)
+    print(f"✅ {revisions['new']} new, {revisions['revised']} revised, "
+          f"{revisions['unchanged']} unchanged hours → {revisions['recomputed']} feature rows rebuilt")
+    if revisions["revised"]:
+        print(f"✏️ Upstream revised: {', '.join(revisions['revised_hours'])}")
+
+    # 5. Step 5: Upsert the rebuilt rows to Hopsworks (primary key = datetime_str)
+    if featured_df.empty:
+        print("\n⏭️ No upstream changes since the last run — nothing to upload.")
+    else:
+        print("\n📦 Uploading changed rows to Hopsworks Feature Store...")
+        upload_to_hopsworks(featured_df, location=LOCATION)
+        # Only now record the new hashes (a failed upload is retried on the next run)
+        commit_revisions()
+
+    # 6. Verification Step: Read data back from Feature Store
     print("\n🔍 Verifying uploaded data from Feature Store...")
     try:
         import hopsworks
 
         project = hopsworks.login()
         fs = project.get_feature_store()
-        fg = fs.get_feature_group("aqi_features", version=2)
+        fg = fs.get_feature_group(feature_group_name(LOCATION), version=FEATURE_GROUP_VERSION)
 
         df_check = fg.read()  # Read full feature group
         df_check["datetime_str"] = pd.to_datetime(df_check["datetime_str"])
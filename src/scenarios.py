@@ -0,0 +1,226 @@
+# Purpose: Batched what-if scenarios. A base (horizons, features) window plus N perturbation
+# specs become one stacked (N × horizons, features) matrix through broadcasting: sources are
+# scaled / shifted / overridden, dependent features (pm_ratio, temp_humidity_ratio,
+# wind_effect) are re-derived with the feature graph's own formulas, and the model is
+# called once for every scenario.
+
+import numpy as np
+import pandas as pd
+
+try:
+    from src.process_features import FEATURE_GRAPH, resolve_features
+except Exception:
+    from process_features import FEATURE_GRAPH, resolve_features
+
+HORIZON_HOURS = 72
+CALENDAR_FEATURES = ["hour", "day", "month", "weekday", "hour_sin", "hour_cos"]
+DERIVED_FEATURES = ["pm_ratio", "temp_humidity_ratio", "wind_effect"]
+OPS = ("scale", "pct", "add", "set")
+
+
+def _calm_safe_direction(w):
+    # wind_direction_10m is not a model input: recover cos(direction) from wind_effect / speed
+    # (calm hours have no direction → treated as 90°, i.e. no effect)
+    speed = np.where(w["wind_speed_10m"] == 0, np.inf, w["wind_speed_10m"])
+    return np.rad2deg(np.arccos(np.clip(w["wind_effect"] / speed, -1.0, 1.0)))
+
+
+# Source columns that dependent features need but the model window may not carry
+RECOVERABLE = {"wind_direction_10m": (["wind_effect", "wind_speed_10m"], _calm_safe_direction)}
+
+
+def forecast_window(df: pd.DataFrame, features, hours=HORIZON_HOURS):
+    """
+    Base window for the next `hours` hours: the latest feature row carried forward, with the
+    calendar features rebuilt from each future timestamp. Returns (window, future datetimes).
+    """
+    last = pd.to_datetime(df["datetime"]).max()
+    future = pd.Series(pd.date_range(last + pd.Timedelta(hours=1), periods=hours, freq="h"), name="datetime")
+    window = pd.DataFrame(np.repeat(df[features].iloc[-1:].to_numpy(dtype=float), hours, axis=0), columns=features)
+
+    calendar = pd.DataFrame({"datetime": future})
+    for name in resolve_features([f for f in CALENDAR_FEATURES if f in features]):
+        if name in FEATURE_GRAPH:
+            calendar[name] = FEATURE_GRAPH[name]["fn"](calendar)
+            if name in features:
+                window[name] = calendar[name].to_numpy(dtype=float)
+    return window, future
+
+
+def _columns(features):
+    """Model features + any source a dependent feature needs that can be recovered from them."""
+    extra = [c for c in RECOVERABLE if any(c in FEATURE_GRAPH[d]["inputs"] for d in DERIVED_FEATURES if d in features)]
+    return list(features) + [c for c in extra if c not in features]
+
+
+def _empty(n, columns):
+    return {
+        "scale": np.ones((n, len(columns))),
+        "shift": np.zeros((n, len(columns))),
+        "override": np.full((n, len(columns)), np.nan),
+    }
+
+
+def from_specs(specs, features):
+    """
+    specs: {scenario name: {column: (op, value)}} with op in scale / pct / add / set, e.g.
+    {"wind x2": {"wind_speed_10m": ("scale", 2)}, "dry": {"relative_humidity_2m": ("pct", -20)}}.
+    Returns the perturbation arrays (one row per scenario) + a params frame naming them.
+    """
+    columns = _columns(features)
+    index = {c: j for j, c in enumerate(columns)}
+    pert = _empty(len(specs), columns)
+    for i, spec in enumerate(specs.values()):
+        for col, (op, value) in spec.items():
+            if col not in index:
+                raise ValueError(f"❌ Unknown scenario column: '{col}'")
+            if op not in OPS:
+                raise ValueError(f"❌ Unknown scenario op '{op}' (expected one of {OPS})")
+            j = index[col]
+            if op == "scale":
+                pert["scale"][i, j] *= value
+            elif op == "pct":
+                pert["scale"][i, j] *= 1 + value / 100
+            elif op == "add":
+                pert["shift"][i, j] += value
+            else:
+                pert["override"][i, j] = value
+    pert["params"] = pd.DataFrame({"scenario": list(specs)})
+    return pert
+
+
+def from_grid(axes, features):
+    """
+    Cartesian product of per-column settings, built without a per-scenario loop, e.g.
+    {"wind_speed_10m": ("scale", [0.5, 1, 2]), "relative_humidity_2m": ("pct", [-20, 0, 20])}.
+    """
+    columns = _columns(features)
+    mesh = np.meshgrid(*[np.asarray(values, dtype=float) for _, values in axes.values()], indexing="ij")
+    n = mesh[0].size if mesh else 0
+    pert = _empty(n, columns)
+    params = {}
+    for (col, (op, _)), values in zip(axes.items(), mesh):
+        if col not in columns:
+            raise ValueError(f"❌ Unknown scenario column: '{col}'")
+        j, values = columns.index(col), values.ravel()
+        if op == "scale":
+            pert["scale"][:, j] *= values
+        elif op == "pct":
+            pert["scale"][:, j] *= 1 + values / 100
+        elif op == "add":
+            pert["shift"][:, j] += values
+        elif op == "set":
+            pert["override"][:, j] = values
+        else:
+            raise ValueError(f"❌ Unknown scenario op '{op}' (expected one of {OPS})")
+        params[f"{col}_{op}"] = values
+    pert["params"] = pd.DataFrame(params)
+    return pert
+
+
+def build_matrix(window: pd.DataFrame, pert, features):
+    """Stacked (scenarios × horizons, features) matrix, scenario-major."""
+    columns = _columns(features)
+    base = window.reindex(columns=columns).to_numpy(dtype=float)                  # (H, C)
+    for col, (inputs, recover) in RECOVERABLE.items():
+        if col in columns and col not in window.columns:
+            base[:, columns.index(col)] = recover({c: base[:, columns.index(c)] for c in inputs})
+
+    # 1. Apply every scenario's perturbations at once: (N, 1, C) against (1, H, C)
+    X = base[None] * pert["scale"][:, None, :] + pert["shift"][:, None, :]
+    override = pert["override"][:, None, :]
+    X = np.where(np.isnan(override), X, override)
+
+    # 2. Re-derive dependent features whose inputs some scenario touched (unless set directly)
+    touched = (pert["scale"] != 1).any(axis=0) | (pert["shift"] != 0).any(axis=0) | ~np.isnan(pert["override"]).all(axis=0)
+    for name in DERIVED_FEATURES:
+        if name not in features or touched[columns.index(name)]:
+            continue
+        inputs = FEATURE_GRAPH[name]["inputs"]
+        if all(c in columns for c in inputs) and any(touched[columns.index(c)] for c in inputs):
+            X[..., columns.index(name)] = FEATURE_GRAPH[name]["fn"]({c: X[..., columns.index(c)] for c in inputs})
+
+    return X[..., [columns.index(f) for f in features]].reshape(-1, len(features))
+
+
+def predict_scenarios(model, window: pd.DataFrame, pert, features):
+    """(scenarios, horizons) predicted AQI from a single model call."""
+    X = build_matrix(window, pert, features)
+    preds = model.predict(pd.DataFrame(X, columns=features, copy=False))
+    return np.asarray(preds, dtype=float).reshape(len(pert["params"]), len(window))
+
+
+def scenario_summary(preds, pert, baseline=None):
+    """Per-scenario mean / peak / hours above 150, plus the change vs the baseline mean."""
+    summary = pert["params"].copy()
+    summary["mean_AQI"] = preds.mean(axis=1)
+    summary["peak_AQI"] = preds.max(axis=1)
+    summary["hours_unhealthy"] = (preds > 150).sum(axis=1)
+    if baseline is not None:
+        summary["delta_mean_AQI"] = summary["mean_AQI"] - float(np.mean(baseline))
+    return summary
+
+
+def scenario_frame(preds, pert, future):
+    """Long format: one row per (scenario, horizon)."""
+    n, h = preds.shape
+    frame = pert["params"].iloc[np.repeat(np.arange(n), h)].reset_index(drop=True)
+    frame["horizon"] = np.tile(np.arange(1, h + 1), n)
+    frame["datetime"] = np.tile(np.asarray(future), n)
+    frame["predicted_AQI"] = preds.ravel()
+    return frame
+
+
+# --- Run standalone: parity with a per-scenario pandas rebuild + throughput benchmark ---
+if __name__ == "__main__":
+    import os
+    import time
+
+    try:
+        from src.model_artifacts import load_model_artifact
+    except Exception:
+        from model_artifacts import load_model_artifact
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    df = pd.read_csv(os.path.join(base_dir, "data/final/final_selected_features.csv")).sort_values("datetime")
+    model, metadata = load_model_artifact()
+    features = metadata["features"]
+    window, future = forecast_window(df, features)
+
+    specs = {
+        "baseline": {},
+        "wind x2": {"wind_speed_10m": ("scale", 2.0)},
+        "humidity -20%": {"relative_humidity_2m": ("pct", -20)},
+        "dust event": {"pm10": ("scale", 1.8), "pm2_5": ("add", 25.0)},
+        "sea breeze": {"wind_direction_10m": ("set", 225.0), "wind_speed_10m": ("add", 3.0)},
+    }
+    pert = from_specs(specs, features)
+    preds = predict_scenarios(model, window, pert, features)
+    print(scenario_summary(preds, pert, baseline=preds[0]).round(2).to_string(index=False))
+
+    # Reference: rebuild each scenario with pandas + the feature graph, one model call each
+    direction = _calm_safe_direction(window)
+    for i, (name, spec) in enumerate(specs.items()):
+        frame = window.copy()
+        frame["wind_direction_10m"] = direction
+        for col, (op, value) in spec.items():
+            frame[col] = {"scale": frame[col] * value, "pct": frame[col] * (1 + value / 100),
+                          "add": frame[col] + value, "set": pd.Series(value, index=frame.index)}[op]
+        for d in DERIVED_FEATURES:
+            if any(c in spec for c in FEATURE_GRAPH[d]["inputs"]):
+                frame[d] = FEATURE_GRAPH[d]["fn"](frame)
+        assert np.allclose(model.predict(frame[features]), preds[i]), name
+    print("✅ Stacked matrix matches a per-scenario rebuild (dependent features included)")
+
+    # Throughput: a 40 × 25 grid = 1,000 scenarios × 72 hours
+    axes = {"wind_speed_10m": ("scale", np.linspace(0.25, 3, 40)),
+            "relative_humidity_2m": ("pct", np.linspace(-40, 40, 25))}
+    t0 = time.perf_counter()
+    grid = from_grid(axes, features)
+    X = build_matrix(window, grid, features)
+    build_s = time.perf_counter() - t0
+    preds = predict_scenarios(model, window, grid, features)
+    total_s = time.perf_counter() - t0
+    n = len(grid["params"])
+    print(f"⚡ {n:,} scenarios × {len(window)} h: matrix {X.shape} built in {build_s * 1000:.1f} ms, "
+          f"{n / total_s:,.0f} scenarios/s end-to-end with {metadata['model_name']}")
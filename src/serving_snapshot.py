@@ -0,0 +1,267 @@
+# Purpose: Process-wide, background-refreshed snapshot of features + model + forecast
+# shared by every dashboard session (one load per process instead of one per session).
+
+import time
+import threading
+from dataclasses import dataclass, field
+import pandas as pd
+
+try:
+    from src.config import APP_REFRESH_SECONDS, SNAPSHOT_POLL_SECONDS
+except Exception:
+    from config import APP_REFRESH_SECONDS, SNAPSHOT_POLL_SECONDS
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Immutable bundle served to sessions. Treat the DataFrames as read-only."""
+    features: pd.DataFrame
+    forecast: pd.DataFrame = None
+    forecast_meta: dict = None
+    model: object = None
+    model_metadata: dict = None
+    versions: dict = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+
+
+# --- Default loaders (local stores; heavy imports deferred) ---
+def _load_features():
+    try:
+        from src.online_store import OnlineStore
+    except Exception:
+        from online_store import OnlineStore
+    return pd.DataFrame(OnlineStore().get_window(hours=24))
+
+
+def _load_forecast():
+    try:
+        from src.forecast_store import load_latest
+    except Exception:
+        from forecast_store import load_latest
+    forecast, meta = load_latest()
+    return (forecast.copy() if forecast is not None else None), meta
+
+
+def _load_model():
+    try:
+        from src.model_artifacts import load_model_artifact
+    except Exception:
+        from model_artifacts import load_model_artifact
+    return load_model_artifact()
+
+
+def _detect_versions():
+    """Cheap change detection: model version, forecast issue time, newest feature hour."""
+    try:
+        from src.model_artifacts import load_model_metadata
+        from src.forecast_store import load_latest_meta
+        from src.online_store import OnlineStore
+    except Exception:
+        from model_artifacts import load_model_metadata
+        from forecast_store import load_latest_meta
+        from online_store import OnlineStore
+
+    latest = OnlineStore().get_latest()
+    forecast_meta = load_latest_meta()
+    return {
+        "model": load_model_metadata().get("model_version"),
+        "forecast": forecast_meta["issue_time"] if forecast_meta else None,
+        "data": latest["datetime_str"] if latest else None,
+    }
+
+
+class SnapshotManager:
+    """
+    Holds exactly one Snapshot per process.
+      • refresh() rebuilds only the parts whose version changed, then swaps the
+        reference atomically — sessions keep whatever snapshot they already hold
+      • a daemon thread polls versions every `poll_seconds` and pulls remote data
+        (e.g. Hopsworks → local online store) every `remote_seconds`
+      • with_model=False keeps the model out of the snapshot (background refreshes included)
+    """
+
+    def __init__(self, load_features=_load_features, load_forecast=_load_forecast,
+                 load_model=_load_model, detect_versions=_detect_versions,
+                 remote_refresh=None, poll_seconds=SNAPSHOT_POLL_SECONDS,
+                 remote_seconds=APP_REFRESH_SECONDS, with_model=True):
+        self.load_features = load_features
+        self.load_forecast = load_forecast
+        self.load_model = load_model
+        self.detect_versions = detect_versions
+        self.remote_refresh = remote_refresh
+        self.poll_seconds = poll_seconds
+        self.remote_seconds = remote_seconds
+        self.with_model = with_model
+
+        self._snapshot = None
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.stats = {
+            "refresh_count": 0,
+            "swap_count": 0,
+            "refresh_errors": 0,
+            "last_refresh_duration_seconds": None,
+            "last_remote_refresh_duration_seconds": None,
+        }
+
+    def current(self):
+        """Return the current snapshot (None before the first refresh)."""
+        return self._snapshot
+
+    def refresh(self, force=False, with_model=None):
+        """Rebuild changed parts and swap; returns True if a new snapshot was published."""
+        with_model = self.with_model if with_model is None else with_model
+        with self._refresh_lock:
+            t0 = time.perf_counter()
+            try:
+                versions = self.detect_versions()
+                cur = self._snapshot
+                model_missing = with_model and (cur is None or cur.model is None)
+                if cur is not None and not force and versions == cur.versions and not model_missing:
+                    return False
+
+                def changed(key):
+                    return force or cur is None or versions.get(key) != cur.versions.get(key)
+
+                features = self.load_features() if changed("data") else cur.features
+                if changed("forecast"):
+                    forecast, forecast_meta = self.load_forecast()
+                else:
+                    forecast, forecast_meta = cur.forecast, cur.forecast_meta
+
+                if changed("model") or model_missing:
+                    model, model_metadata = self.load_model() if with_model else (None, None)
+                else:
+                    model, model_metadata = cur.model, cur.model_metadata
+
+                new = Snapshot(features=features, forecast=forecast, forecast_meta=forecast_meta,
+                               model=model, model_metadata=model_metadata, versions=versions)
+                self._snapshot = new   # single reference assignment → atomic swap
+                self.stats["swap_count"] += 1
+                return True
+            except Exception as e:
+                self.stats["refresh_errors"] += 1
+                print(f"⚠️ Snapshot refresh failed: {e}")
+                return False
+            finally:
+                self.stats["refresh_count"] += 1
+                self.stats["last_refresh_duration_seconds"] = round(time.perf_counter() - t0, 4)
+
+    def _run(self):
+        next_remote = time.monotonic() + self.remote_seconds if self.remote_refresh else None
+        while not self._stop.is_set():
+            if next_remote is not None and time.monotonic() >= next_remote:
+                t0 = time.perf_counter()
+                try:
+                    self.remote_refresh()
+                except Exception as e:
+                    self.stats["refresh_errors"] += 1
+                    print(f"⚠️ Remote refresh failed: {e}")
+                self.stats["last_remote_refresh_duration_seconds"] = round(time.perf_counter() - t0, 4)
+                next_remote = time.monotonic() + self.remote_seconds
+            self.refresh(with_model=self.with_model)
+            self._stop.wait(self.poll_seconds)
+
+    def start(self):
+        """Start the background refresher once (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="aqi-snapshot", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def metrics(self):
+        snap = self._snapshot
+        return {
+            **self.stats,
+            "snapshot_age_seconds": round(time.time() - snap.created_at, 3) if snap else None,
+            "versions": dict(snap.versions) if snap else {},
+        }
+
+
+_MANAGER = None
+_MANAGER_LOCK = threading.Lock()
+
+
+def get_snapshot_manager(**kwargs):
+    """Process-wide singleton; keyword arguments only apply on first creation."""
+    global _MANAGER
+    if _MANAGER is None:
+        with _MANAGER_LOCK:
+            if _MANAGER is None:
+                _MANAGER = SnapshotManager(**kwargs)
+    return _MANAGER
+
+
+# --- Run standalone concurrency test: many sessions vs. a rapidly swapping snapshot ---
+if __name__ == "__main__":
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+
+    N_SESSIONS, READS_PER_SESSION, N_VERSIONS = 64, 2000, 20
+    version = {"n": 0, "seen": 0}
+    loads = {"features": 0, "forecast": 0, "model": 0}
+
+    # Fake loaders: every part is stamped with the version detected for this refresh
+    def fake_features():
+        loads["features"] += 1
+        time.sleep(0.002)
+        return pd.DataFrame({"v": [version["seen"]] * 24})
+
+    def fake_forecast():
+        loads["forecast"] += 1
+        return pd.DataFrame({"v": [version["seen"]] * 72}), {"issue_time": version["seen"]}
+
+    def fake_model():
+        loads["model"] += 1
+        return ("model", version["seen"] // 5), {"model_version": version["seen"] // 5}
+
+    def fake_versions():
+        version["seen"] = n = version["n"]
+        return {"model": n // 5, "forecast": n, "data": n}
+
+    manager = get_snapshot_manager(load_features=fake_features, load_forecast=fake_forecast,
+                                   load_model=fake_model, detect_versions=fake_versions,
+                                   poll_seconds=0.001)
+    assert get_snapshot_manager() is manager, "singleton broken"
+    manager.refresh()
+    manager.start()
+
+    def session(_):
+        torn = 0
+        for _ in range(READS_PER_SESSION):
+            snap = get_snapshot_manager().current()
+            # A session must never see parts from different versions
+            if not (snap.features["v"].iat[0] == snap.forecast["v"].iat[0] == snap.versions["data"]):
+                torn += 1
+            if random.random() < 0.01:
+                time.sleep(0.0005)
+        return torn
+
+    def publisher():
+        for _ in range(N_VERSIONS):
+            time.sleep(0.01)
+            version["n"] += 1
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=N_SESSIONS + 1) as pool:
+        pub = pool.submit(publisher)
+        torn = sum(pool.map(session, range(N_SESSIONS)))
+        pub.result()
+    time.sleep(0.05)
+    elapsed = time.perf_counter() - t0
+    manager.stop()
+
+    m = manager.metrics()
+    print(f"👥 {N_SESSIONS} sessions × {READS_PER_SESSION} reads in {elapsed:.2f}s "
+          f"({N_SESSIONS * READS_PER_SESSION / elapsed:,.0f} reads/s)")
+    print(f"🔄 Swaps: {m['swap_count']} | loads: {loads} | torn reads: {torn}")
+    print(f"📈 Metrics: {m}")
+    assert torn == 0, "sessions observed an inconsistent snapshot"
+    assert loads["features"] <= N_VERSIONS + 1, "features loaded more than once per version"
+    assert loads["model"] <= N_VERSIONS // 5 + 1, "model reloaded without a version change"
+    print("✅ Concurrency test passed")
@@ -0,0 +1,138 @@
+# Purpose: Local stand-in for the Open-Meteo forecast / air-quality / archive APIs that
+# generates synthetic `hourly` payloads for any coordinates (single or comma-separated lists)
+# and date range (load testing, grid benchmarks).
+
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import pandas as pd
+
+try:
+    from src.config import HOURLY_UNITS
+except Exception:
+    from config import HOURLY_UNITS
+
+# variable → (mean, diurnal amplitude, noise amplitude)
+PROFILES = {
+    "pm10": (70.0, 25.0, 30.0),
+    "pm2_5": (35.0, 12.0, 15.0),
+    "carbon_monoxide": (450.0, 150.0, 120.0),
+    "nitrogen_dioxide": (20.0, 10.0, 8.0),
+    "ozone": (60.0, 30.0, 20.0),
+    "sulphur_dioxide": (10.0, 4.0, 5.0),
+    "temperature_2m": (27.0, 5.0, 2.0),
+    "relative_humidity_2m": (60.0, 15.0, 10.0),
+    "wind_speed_10m": (12.0, 5.0, 6.0),
+    "wind_direction_10m": (180.0, 90.0, 180.0),
+}
+
+
+def synthetic_hourly(lat, lon, times: pd.DatetimeIndex, variables):
+    """
+    Deterministic values per (coordinate, hour, variable): overlapping requests
+    agree, so fetches at different times look like a consistent history.
+    """
+    t = times.to_numpy().astype("datetime64[h]").astype(np.int64).astype(np.float64)
+    hourly = {"time": times.strftime("%Y-%m-%dT%H:%M").tolist()}
+    for i, var in enumerate(variables):
+        mean, amp, noise_amp = PROFILES.get(var, (10.0, 2.0, 2.0))
+        seed = (lat * 12.9898 + lon * 78.233 + i * 37.719) % 1000
+        noise = np.modf(np.abs(np.sin(t * 12.9898 + seed)) * 43758.5453)[0] - 0.5
+        season = 0.2 * mean * np.cos(2 * np.pi * t / (24 * 365.25) + seed)
+        values = mean + season + amp * np.sin(2 * np.pi * t / 24 + seed) + noise_amp * noise
+        if var == "wind_direction_10m":
+            values = np.mod(values, 360)
+        hourly[var] = np.round(np.clip(values, 0, None), 1).tolist()
+    return hourly
+
+
+def _time_range(qs):
+    """Hours covered by a request (start_date/end_date, or past_days + forecast_days)."""
+    if "start_date" in qs:
+        start = pd.Timestamp(qs["start_date"][0])
+        end = pd.Timestamp(qs.get("end_date", qs["start_date"])[0]) + pd.Timedelta(hours=23)
+    else:
+        today = pd.Timestamp(datetime.utcnow().date())
+        start = today - pd.Timedelta(days=int(qs.get("past_days", ["0"])[0]))
+        end = today + pd.Timedelta(days=int(qs.get("forecast_days", ["7"])[0])) - pd.Timedelta(hours=1)
+    return pd.date_range(start, end, freq="h")
+
+
+def _make_handler(stats):
+    class SyntheticHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if not url.path.endswith(("/air-quality", "/forecast", "/archive")):
+                self.send_error(404)
+                return
+            qs = parse_qs(url.query)
+            # Comma-separated coordinate lists → one payload per location (JSON list)
+            lats = [float(v) for v in qs.get("latitude", ["0"])[0].split(",")]
+            lons = [float(v) for v in qs.get("longitude", ["0"])[0].split(",")]
+            variables = [v for v in qs.get("hourly", [""])[0].split(",") if v]
+
+            t0 = datetime.now()
+            times = _time_range(qs)
+            payloads = [{
+                "latitude": lat, "longitude": lon,
+                "generationtime_ms": 0.0, "utc_offset_seconds": 0, "timezone": "GMT",
+                "hourly_units": {k: HOURLY_UNITS.get(k, "") for k in ["time"] + variables},
+                "hourly": synthetic_hourly(lat, lon, times, variables),
+            } for lat, lon in zip(lats, lons)]
+            body = json.dumps(payloads if len(payloads) > 1 else payloads[0]).encode()
+
+            with stats["lock"]:
+                stats["requests"] += 1
+                stats["hours"] += len(times) * len(payloads)
+                stats["bytes"] += len(body)
+                stats["seconds"] += (datetime.now() - t0).total_seconds()
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return SyntheticHandler
+
+
+def start_synthetic_server(port=0):
+    """
+    Start the stand-in in a background thread.
+    Returns (server, air_quality_base, weather_forecast_base, weather_archive_base);
+    server.stats counts requests / hours / bytes served.
+    """
+    stats = {"requests": 0, "hours": 0, "bytes": 0, "seconds": 0.0, "lock": threading.Lock()}
+    server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(stats))
+    server.stats = stats
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    host, port = server.server_address
+    base = f"http://{host}:{port}/v1"
+    return server, f"{base}/air-quality", f"{base}/forecast", f"{base}/archive"
+
+
+# --- Run standalone: serve synthetic payloads until interrupted ---
+if __name__ == "__main__":
+    import time
+    import requests
+
+    server, aq_base, wx_base, archive_base = start_synthetic_server(port=8766)
+    end = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    probe = requests.get(f"{archive_base}?latitude=24.86&longitude=67.0"
+                         f"&start_date=2024-01-01&end_date={end}&hourly=temperature_2m").json()
+    print(f"🧪 Probe: {len(probe['hourly']['time'])} archive hours")
+    print(f"AIR_QUALITY_BASE={aq_base}")
+    print(f"WEATHER_FORECAST_BASE={wx_base}")
+    print(f"WEATHER_ARCHIVE_BASE={archive_base}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
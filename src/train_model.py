@@ -4,13 +4,50 @@ import hopsworks
 import pandas as pd
 import numpy as np
 import os
+import time
 from dotenv import load_dotenv
+from joblib import dump
 from sklearn.preprocessing import StandardScaler
+from sklearn.pipeline import Pipeline
 from sklearn.linear_model import Ridge
 from sklearn.ensemble import RandomForestRegressor
 from xgboost import XGBRegressor
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 
+try:
+    from src.process_features import MODEL_FEATURES
+    from src.model_artifacts import save_model_artifact, MODEL_DIR, model_filename
+    from src.retrain_incremental import incremental_retrain, ridge_stats, save_ridge_stats
+    from src.config import INTERVAL_COVERAGE
+    from src.prediction_intervals import fit_interval_model
+    from src.drift_monitor import build_reference, save_reference, drift_detected
+    from src.model_selection import profile_model, select_model, selection_config, selection_metadata
+    from src.training_cache import (
+        config_fingerprint, find_cached_model, matrix_key, load_split_matrices,
+        save_split_matrices, training_matrix, matrix_frame
+    )
+except ModuleNotFoundError:
+    from process_features import MODEL_FEATURES
+    from model_artifacts import save_model_artifact, MODEL_DIR, model_filename
+    from retrain_incremental import incremental_retrain, ridge_stats, save_ridge_stats
+    from config import INTERVAL_COVERAGE
+    from prediction_intervals import fit_interval_model
+    from drift_monitor import build_reference, save_reference, drift_detected
+    from model_selection import profile_model, select_model, selection_config, selection_metadata
+    from training_cache import (
+        config_fingerprint, find_cached_model, matrix_key, load_split_matrices,
+        save_split_matrices, training_matrix, matrix_frame
+    )
+
+# 0. Out-of-core mode: stream the on-disk dataset instead of fg.read()
+if os.getenv("TRAIN_MODE", "in_memory").lower() == "out_of_core":
+    try:
+        from src.train_out_of_core import train_out_of_core
+    except ModuleNotFoundError:
+        from train_out_of_core import train_out_of_core
+    train_out_of_core()
+    raise SystemExit(0)
+
 # 1. Load API Key and Connect to Hopsworks 
 load_dotenv()
 api_key = os.getenv("HOPSWORKS_API_KEY")
@@ -29,52 +66,16 @@ except Exception as e:
 
 print("Initial shape:", df.shape)
 
-# 2. Prepare datetime and ensure correct type
-if "datetime_str" in df.columns:
-    df["datetime"] = pd.to_datetime(df["datetime_str"])
-    df.drop(columns=["datetime_str"], inplace=True)
-
-# 3. Sort chronologically for time-based split
-df = df.sort_values(by="datetime").reset_index(drop=True)
-
-# 4. Drop high-leakage AQI features
-leakage_features = [col for col in df.columns if "rolling" in col or "lag" in col]
-for col in leakage_features:
-    df.drop(columns=[col], inplace=True)
-    print(f"⚠️ Dropped potential leakage feature: {col}")
-
-# 5. Add ±5% random noise to pollutant readings (simulate sensor variability)
-np.random.seed(42)
-pollutant_cols = ["pm10", "pm2_5", "ozone", "nitrogen_dioxide", "sulphur_dioxide", "carbon_monoxide"]
-for col in pollutant_cols:
-    if col in df.columns:
-        df[col] = df[col] * (1 + np.random.normal(0, 0.05, len(df)))
-print("🌫️ Added ±5% Gaussian noise to pollutant columns for realistic variation")
-
-# 6. Remove duplicates & check missing values
-df = df.drop_duplicates().reset_index(drop=True)
-print("\n🔍 Missing values after cleaning:")
-print(df.isna().sum())
-
-# 7. Time-based split to prevent leakage
-split_index = int(len(df) * 0.8)
-train_df = df.iloc[:split_index]
-test_df = df.iloc[split_index:]
-
-# Drop datetime from model features (after split) 
-X_train = train_df.drop(columns=["aqi", "datetime"])
-y_train = train_df["aqi"]
-X_test = test_df.drop(columns=["aqi", "datetime"])
-y_test = test_df["aqi"]
-
-print(f"✅ Time-based split complete → Train: {X_train.shape}, Test: {X_test.shape}")
-
-# 8. Preprocessing (Scaling for Ridge only) 
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
+# 2-4. Parse datetime, sort chronologically and keep only the model's feature set (leakage
+#      features are excluded in MODEL_FEATURES) — materialized once per data version as a
+#      memory-mapped float32 matrix that later runs and backtest workers open zero-copy
+feature_cols = [col for col in MODEL_FEATURES if col in df.columns]
+matrix = training_matrix(df, feature_cols)
+df = matrix_frame(matrix)
+print(f"🗂️ Training matrix {matrix['key']} → {matrix['rows']} rows (memory-mapped)")
+print(f"🧩 Using {len(feature_cols)} model features: {feature_cols}")
 
-# 9. Model Training 
+# 4b. Candidate models — their hyperparameters are part of the training fingerprint
 models = {
     "Ridge Regression": Ridge(alpha=1.0),
     "Random Forest": RandomForestRegressor(n_estimators=200, random_state=42),
@@ -88,52 +89,170 @@ models = {
         tree_method="hist"
     )
 }
+train_mode = os.getenv("TRAIN_MODE", "in_memory").lower()
+prep_config = {"features": feature_cols, "noise_seed": 42, "noise_std": 0.05, "train_fraction": 0.8}
+data_fp = matrix["data_fingerprint"]
+config_fp = config_fingerprint({
+    "prep": prep_config,
+    "models": {name: m.get_params() for name, m in models.items()},
+    "interval_coverage": INTERVAL_COVERAGE,
+    "selection": selection_config(),
+})
+print(f"🔑 Data fingerprint: {data_fp} | config fingerprint: {config_fp}")
+
+# 4c. Same data + same config as the saved model → reuse it, skip fitting
+#     (unless the feature pipeline's drift monitor says the inputs have shifted)
+drifted, drift_scores = drift_detected()
+if drifted:
+    shifted = drift_scores.loc[drift_scores["status"] == "drift", "feature"].tolist()
+    print(f"🌊 Feature drift detected in {shifted} → forcing a full retrain")
+    train_mode = "in_memory" if train_mode == "incremental" else train_mode
+
+cached_model = find_cached_model(data_fp, config_fp) if not drifted else None
+if cached_model is not None:
+    print(f"♻️ Training data and config unchanged → reusing {cached_model['model_name']} "
+          f"(version {cached_model['model_version']})")
+    print(f"📊 Metrics: {cached_model['metrics']}")
+    raise SystemExit(0)
+
+# Prepared split matrices only depend on data + preprocessing (not hyperparameters)
+split_key = matrix_key(data_fp, prep_config)
+cached_split = load_split_matrices(split_key) if train_mode != "incremental" else None
+
+if cached_split is not None:
+    X_train = pd.DataFrame(cached_split["X_train"], columns=feature_cols)
+    X_test = pd.DataFrame(cached_split["X_test"], columns=feature_cols)
+    y_train = pd.Series(cached_split["y_train"], name="aqi")
+    y_test = pd.Series(cached_split["y_test"], name="aqi")
+    trained_through = str(pd.Timestamp(cached_split["trained_through"][0]))
+    print(f"♻️ Reusing cached split matrices → Train: {X_train.shape}, Test: {X_test.shape}")
+else:
+    # 5. Add ±5% random noise to pollutant readings (simulate sensor variability)
+    np.random.seed(42)
+    pollutant_cols = ["pm10", "pm2_5", "ozone", "nitrogen_dioxide", "sulphur_dioxide", "carbon_monoxide"]
+    for col in pollutant_cols:
+        if col in df.columns:
+            df[col] = df[col] * (1 + np.random.normal(0, 0.05, len(df)))
+    print("🌫️ Added ±5% Gaussian noise to pollutant columns for realistic variation")
+
+    # 6. Remove duplicates & check missing values
+    df = df.drop_duplicates().reset_index(drop=True)
+    print("\n🔍 Missing values after cleaning:")
+    print(df.isna().sum())
 
+    # 6b. Incremental mode: warm-start the current model, full refit only if the holdout degrades
+    if train_mode == "incremental":
+        report = incremental_retrain(df, feature_cols, data_fingerprint=data_fp)
+        print(f"\n🔁 Incremental retrain report: {report}")
+        if report["accepted"]:
+            if report.get("time_saved_seconds") is not None:
+                print(f"⏱️ Training time saved vs full refit: {report['time_saved_seconds']:.2f}s")
+            raise SystemExit(0)
+        print(f"⚠️ Falling back to full refit: {report.get('reason')}")
+
+    # 7. Time-based split to prevent leakage
+    split_index = int(len(df) * 0.8)
+    train_df = df.iloc[:split_index]
+    test_df = df.iloc[split_index:]
+
+    # Drop datetime from model features (after split) 
+    X_train = train_df[feature_cols]
+    y_train = train_df["aqi"]
+    X_test = test_df[feature_cols]
+    y_test = test_df["aqi"]
+    trained_through = str(train_df["datetime"].max())
+
+    save_split_matrices(split_key, {
+        "X_train": X_train.to_numpy(dtype=float), "X_test": X_test.to_numpy(dtype=float),
+        "y_train": y_train.to_numpy(dtype=float), "y_test": y_test.to_numpy(dtype=float),
+        "trained_through": np.array([trained_through], dtype="datetime64[s]"),
+    })
+
+print(f"✅ Time-based split complete → Train: {X_train.shape}, Test: {X_test.shape}")
+
+# 8. Preprocessing (Scaling for Ridge only) 
+scaler = StandardScaler()
+X_train_scaled = scaler.fit_transform(X_train)
+X_test_scaled = scaler.transform(X_test)
+
+# 9. Model Training (+ serving profile of each candidate, measured as it will be served)
 results = {}
+fit_seconds = {}
+profiles = {}
 
 print("\n🚀 Training Models...\n")
 for name, model in models.items():
+    t0 = time.perf_counter()
     if name == "Ridge Regression":
         model.fit(X_train_scaled, y_train)
+        fit_seconds[name] = time.perf_counter() - t0
         preds = model.predict(X_test_scaled)
+        served = Pipeline([("scaler", scaler), ("model", model)])
     else:
         model.fit(X_train, y_train)
+        fit_seconds[name] = time.perf_counter() - t0
         preds = model.predict(X_test)
+        served = model
 
     rmse = np.sqrt(mean_squared_error(y_test, preds))
     mae = mean_absolute_error(y_test, preds)
     r2 = r2_score(y_test, preds)
 
     results[name] = {"RMSE": rmse, "MAE": mae, "R²": r2}
-    print(f"✅ {name} → RMSE: {rmse:.3f}, MAE: {mae:.3f}, R²: {r2:.3f}")
+    profiles[name] = profile_model(served, X_test)
+    print(f"✅ {name} → RMSE: {rmse:.3f}, MAE: {mae:.3f}, R²: {r2:.3f} | "
+          f"{profiles[name]['size_mb']:.2f} MB, 1-row {profiles[name]['single_ms']:.1f} ms")
 
-# 10. Compare Results
+# 10. Compare Results: accuracy vs serving cost, within hard latency / size budgets
 results_df = pd.DataFrame(results).T.sort_values(by="RMSE")
+best_model_name, selection_df = select_model(results_df, pd.DataFrame(profiles).T)
 print("\n📊 Model Comparison:\n")
-print(results_df)
+print(selection_df.round(3))
 
 # 11. Save Best Model (with safety checks & confirmation) 
-from joblib import dump
-
-best_model_name = results_df.index[0].strip()
+best_model_name = best_model_name.strip()
 print(f"\n🏆 Best Model Selected: {best_model_name}")
+if best_model_name != results_df.index[0]:
+    print(f"⚖️ {results_df.index[0]} has the lowest RMSE but loses on serving cost / budgets")
 
-# Ensure the models directory exists
-model_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../models"))
-os.makedirs(model_dir, exist_ok=True)
-
-# Define file paths
-model_path = os.path.join(model_dir, f"best_model_{best_model_name.replace(' ', '_').lower()}.pkl")
-scaler_path = os.path.join(model_dir, "scaler.pkl")
-
+model_path = os.path.join(MODEL_DIR, model_filename(best_model_name))
 print(f"📁 Model will be saved at: {model_path}")
 
-# Try saving model
+# Try saving model + metadata (feature list is reused at inference time)
 try:
-    dump(models[best_model_name], model_path)
+    # Boosted trees have no member spread → companion quantile model for prediction intervals
+    interval_extra = {}
+    if best_model_name == "XGBoost":
+        interval_model = fit_interval_model(models["XGBoost"].get_params(), X_train, y_train, INTERVAL_COVERAGE)
+        interval_extra["interval_model_file"] = "interval_model_xgboost.pkl"
+        os.makedirs(MODEL_DIR, exist_ok=True)
+        dump(interval_model, os.path.join(MODEL_DIR, interval_extra["interval_model_file"]))
+        print(f"📏 Quantile interval model saved ({INTERVAL_COVERAGE:.0%} coverage)")
+
+    saved = save_model_artifact(
+        models[best_model_name],
+        best_model_name,
+        features=feature_cols,
+        metrics=results[best_model_name],
+        scaler=scaler if best_model_name == "Ridge Regression" else None,
+        extra={
+            "training_mode": "full",
+            "trained_through": trained_through,
+            "data_fingerprint": data_fp,
+            "config_fingerprint": config_fp,
+            "full_fit_seconds": round(fit_seconds[best_model_name], 3),
+            "drift_reference_file": "drift_reference.json",
+            "selection": selection_metadata(best_model_name, selection_df),
+            **interval_extra,
+        },
+    )
+    # Fixed bins + training histograms the drift monitor compares live batches against
+    save_reference(build_reference(X_train, feature_cols), saved["model_version"])
+    print("📐 Drift reference histograms saved")
     if best_model_name == "Ridge Regression":
-        dump(scaler, scaler_path)
-        print(f"💾 Scaler also saved → {scaler_path}")
+        # Sufficient statistics let incremental runs update Ridge without refitting
+        save_ridge_stats(ridge_stats(X_train, y_train))
+        print(f"💾 Scaler also saved → {os.path.join(MODEL_DIR, 'scaler.pkl')}")
     print(f"✅ Model saved successfully at {model_path}")
 except Exception as e:
     print("⚠️ Error saving model:", e)
@@ -142,7 +261,7 @@ except Exception as e:
 print("\n📊 Model Performance Summary ---")
 print(results_df)
 print("\nAQI range:", y_train.min(), "to", y_train.max())
-print("Test RMSE % of range:", (results_df.iloc[0]['RMSE'] / (y_train.max() - y_train.min())) * 100)
+print("Test RMSE % of range:", (results_df.loc[best_model_name, 'RMSE'] / (y_train.max() - y_train.min())) * 100)
 
 train_preds = models["Random Forest"].predict(X_train)
 train_rmse = np.sqrt(mean_squared_error(y_train, train_preds))
@@ -0,0 +1,214 @@
+# Purpose: Out-of-core training — stream the feature dataset from disk in bounded chunks
+# (streaming scaler, partial_fit linear baseline, XGBoost external memory).
+
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import xgboost as xgb
+from sklearn.preprocessing import StandardScaler
+from sklearn.linear_model import SGDRegressor
+
+try:
+    from src.config import TRAIN_CHUNK_ROWS
+    from src.process_features import MODEL_FEATURES
+    from src.model_artifacts import save_model_artifact
+    from src.feature_dataset import (
+        append_to_dataset, count_rows, dataset_dir, dataset_files, iter_chunks
+    )
+except ModuleNotFoundError:
+    from config import TRAIN_CHUNK_ROWS
+    from process_features import MODEL_FEATURES
+    from model_artifacts import save_model_artifact
+    from feature_dataset import (
+        append_to_dataset, count_rows, dataset_dir, dataset_files, iter_chunks
+    )
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POLLUTANT_COLS = ["pm10", "pm2_5", "ozone", "nitrogen_dioxide", "sulphur_dioxide", "carbon_monoxide"]
+
+
+# =============================================================
+# 🧹 Chunk preprocessing
+# =============================================================
+def prepare_chunk(chunk, features, rng):
+    """Per-chunk version of train_model.py's preprocessing (noise + duplicate drop)."""
+    chunk = chunk.copy()
+    for col in POLLUTANT_COLS:
+        if col in chunk.columns:
+            chunk[col] = chunk[col] * (1 + rng.normal(0, 0.05, len(chunk)))
+    chunk = chunk.drop_duplicates()
+    return chunk[features].astype(np.float32), chunk["aqi"].astype(np.float32)
+
+
+# =============================================================
+# 🌊 Streaming learners
+# =============================================================
+class ChunkIter(xgb.DataIter):
+    """xgboost.DataIter over the on-disk dataset (external-memory DMatrix)."""
+
+    def __init__(self, features, path, chunk_rows, start, stop, seed, cache_dir):
+        self.features = features
+        self.args = (path, chunk_rows, start, stop)
+        self.seed = seed
+        self._it = None
+        super().__init__(cache_prefix=os.path.join(cache_dir, "xgb_cache"))
+
+    def reset(self):
+        self._rng = np.random.default_rng(self.seed)
+        self._it = iter_chunks(self.features + ["aqi"], *self.args)
+
+    def next(self, input_data):
+        if self._it is None:
+            self.reset()
+        try:
+            chunk = next(self._it)
+        except StopIteration:
+            return False
+        X, y = prepare_chunk(chunk, self.features, self._rng)
+        input_data(data=X, label=y)
+        return True
+
+
+def fit_streaming_scaler(features, path, chunk_rows, stop):
+    scaler = StandardScaler()
+    for chunk in iter_chunks(features, path, chunk_rows, 0, stop):
+        scaler.partial_fit(chunk[features].astype(np.float32))
+    return scaler
+
+
+def fit_linear(features, path, chunk_rows, stop, scaler, epochs=3, seed=42):
+    """Ridge-equivalent (L2) linear baseline trained with SGD partial_fit."""
+    model = SGDRegressor(penalty="l2", alpha=1e-4, learning_rate="invscaling",
+                         eta0=0.01, random_state=seed)
+    for epoch in range(epochs):
+        rng = np.random.default_rng(seed + epoch)
+        for chunk in iter_chunks(features + ["aqi"], path, chunk_rows, 0, stop):
+            X, y = prepare_chunk(chunk, features, rng)
+            model.partial_fit(scaler.transform(X), y)
+    return model
+
+
+def fit_xgboost(features, path, chunk_rows, stop, cache_dir, seed=42):
+    it = ChunkIter(features, path, chunk_rows, 0, stop, seed, cache_dir)
+    ext = getattr(xgb, "ExtMemQuantileDMatrix", None)
+    dtrain = ext(it, max_bin=256) if ext is not None else xgb.DMatrix(it)
+
+    params = {
+        "objective": "reg:squarederror",
+        "eta": 0.1,
+        "max_depth": 6,
+        "subsample": 0.8,
+        "colsample_bytree": 0.8,
+        "tree_method": "hist",
+        "seed": seed,
+    }
+    booster = xgb.train(params, dtrain, num_boost_round=200)
+
+    # Wrap in the sklearn estimator so inference keeps calling model.predict(DataFrame)
+    model = xgb.XGBRegressor()
+    model.load_model(bytearray(booster.save_raw(raw_format="ubj")))
+    return model
+
+
+def evaluate_streaming(predict, features, path, chunk_rows, start, stop=None):
+    """RMSE / MAE / R² from running sums over test chunks."""
+    n = sse = sae = sy = syy = 0.0
+    rng = np.random.default_rng(0)
+    for chunk in iter_chunks(features + ["aqi"], path, chunk_rows, start, stop):
+        X, y = prepare_chunk(chunk, features, rng)
+        err = y.to_numpy(dtype=float) - predict(X)
+        n += len(y)
+        sse += float(np.sum(err ** 2))
+        sae += float(np.sum(np.abs(err)))
+        sy += float(y.sum())
+        syy += float((y.astype(float) ** 2).sum())
+    sst = syy - sy * sy / n
+    return {"RMSE": np.sqrt(sse / n), "MAE": sae / n, "R²": 1 - sse / sst if sst > 0 else float("nan")}
+
+
+def train_out_of_core(path=None, chunk_rows=TRAIN_CHUNK_ROWS, save=True):
+    """Train the linear baseline + XGBoost without materializing the dataset."""
+    total = count_rows(path)
+    if total == 0:
+        raise FileNotFoundError(f"❌ No Parquet parts found in {dataset_dir(path)}")
+
+    schema_cols = pq.ParquetFile(dataset_files(path)[0]).schema_arrow.names
+    features = [c for c in MODEL_FEATURES if c in schema_cols]
+    split = int(total * 0.8)
+    print(f"📦 {total} rows on disk → train [0, {split}) / test [{split}, {total}), chunk={chunk_rows}")
+
+    results, models = {}, {}
+    scaler = fit_streaming_scaler(features, path, chunk_rows, split)
+    linear = fit_linear(features, path, chunk_rows, split, scaler)
+    models["Linear SGD"] = linear
+    results["Linear SGD"] = evaluate_streaming(
+        lambda X: linear.predict(scaler.transform(X)), features, path, chunk_rows, split)
+
+    cache_dir = tempfile.mkdtemp(prefix="xgb_extmem_")
+    try:
+        xgb_model = fit_xgboost(features, path, chunk_rows, split, cache_dir)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    models["XGBoost"] = xgb_model
+    results["XGBoost"] = evaluate_streaming(xgb_model.predict, features, path, chunk_rows, split)
+
+    results_df = pd.DataFrame(results).T.sort_values(by="RMSE")
+    print("\n📊 Out-of-core Model Comparison:\n")
+    print(results_df)
+
+    best = results_df.index[0]
+    if save:
+        save_model_artifact(
+            models[best], best, features=features, metrics=results[best],
+            scaler=scaler if best == "Linear SGD" else None,
+            extra={"training_mode": "out_of_core", "chunk_rows": chunk_rows, "train_rows": split},
+        )
+        print(f"🏆 Saved best out-of-core model: {best}")
+    return results_df
+
+
+def _peak_rss_mb():
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+# --- Run standalone ---
+#   python src/train_out_of_core.py            → train from FEATURE_DATASET_PATH
+#   python src/train_out_of_core.py --bench    → peak RSS vs dataset size
+#   (internal) --child <dataset> <chunk_rows>  → one benchmark run, prints peak RSS
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        i = sys.argv.index("--child")
+        train_out_of_core(sys.argv[i + 1], int(sys.argv[i + 2]), save=False)
+        print(f"PEAK_RSS_MB {_peak_rss_mb():.1f}")
+
+    elif "--bench" in sys.argv:
+        import subprocess
+        src_csv = os.path.join(BASE_DIR, "data", "final", "final_selected_features.csv")
+        base = pd.read_csv(src_csv)
+        chunk_rows = TRAIN_CHUNK_ROWS
+
+        print(f"\n🧪 Peak RSS vs dataset size (chunk_rows={chunk_rows})")
+        for factor in [1, 4, 16]:
+            with tempfile.TemporaryDirectory() as tmp:
+                # Build a synthetic multi-year history by tiling the real one
+                for rep in range(factor):
+                    part = base.copy()
+                    part["datetime"] = pd.to_datetime(part["datetime"]) + pd.DateOffset(years=2 * rep)
+                    append_to_dataset(part, tmp, chunk_rows)
+                rows = count_rows(tmp)
+                proc = subprocess.run([sys.executable, __file__, "--child", tmp, str(chunk_rows)],
+                                      capture_output=True, text=True)
+                peak = [l for l in proc.stdout.splitlines() if l.startswith("PEAK_RSS_MB")]
+                if not peak:
+                    print(proc.stdout[-1500:], proc.stderr[-1500:])
+                    sys.exit(1)
+                print(f"  {rows:>9,} rows → peak RSS {float(peak[0].split()[1]):8.1f} MB")
+
+    else:
+        train_out_of_core()
@@ -0,0 +1,249 @@
+# Purpose: Skip redundant retrains — fingerprint the training data + configuration and
+# reuse the saved model (or the prepared split matrices) when nothing relevant changed.
+# Also materializes the sorted float32 training matrix once per data version (memory-mapped).
+
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+
+try:
+    from src.config import TRAIN_CACHE_PATH, TRAIN_MATRIX_KEEP
+    from src.model_artifacts import load_model_metadata, MODEL_DIR
+except ModuleNotFoundError:
+    from config import TRAIN_CACHE_PATH, TRAIN_MATRIX_KEEP
+    from model_artifacts import load_model_metadata, MODEL_DIR
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def data_fingerprint(df: pd.DataFrame, key_cols=("datetime",), value_cols=None) -> str:
+    """
+    "<rows>-<hash>": cheap row count + SHA-256 of the sorted per-row hashes of the key/value
+    columns. Row order coming back from the feature store does not change the fingerprint
+    (sorting the 64-bit row hashes is much cheaper than sorting the frame by its key).
+    """
+    key_cols = [c for c in key_cols if c in df.columns]
+    value_cols = [c for c in (value_cols or df.columns) if c not in key_cols]
+    cols = key_cols + sorted(value_cols)
+
+    row_hashes = np.sort(pd.util.hash_pandas_object(df[cols], index=False).to_numpy())
+    digest = hashlib.sha256(",".join(cols).encode())
+    digest.update(row_hashes.tobytes())
+    return f"{len(df)}-{digest.hexdigest()[:24]}"
+
+
+def config_fingerprint(config: dict) -> str:
+    """Stable hash of a (nested) training configuration."""
+    payload = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+# =============================================================
+# 🏷️ Model-level cache: data + full config → saved artifact
+# =============================================================
+def find_cached_model(data_fp: str, config_fp: str, model_dir=MODEL_DIR):
+    """Return the saved model's metadata if it was trained on exactly this data + config."""
+    metadata = load_model_metadata(model_dir)
+    if metadata.get("data_fingerprint") != data_fp or metadata.get("config_fingerprint") != config_fp:
+        return None
+    if not os.path.exists(os.path.join(model_dir, metadata["model_file"])):
+        return None
+    return metadata
+
+
+# =============================================================
+# 🧮 Matrix-level cache: data + preprocessing config → split matrices
+#    (hyperparameter-only changes refit but skip preparation)
+# =============================================================
+def _matrix_path(key: str, path=None):
+    return os.path.join(path or os.path.join(BASE_DIR, TRAIN_CACHE_PATH), f"split_{key}.npz")
+
+
+def matrix_key(data_fp: str, prep_config: dict) -> str:
+    return config_fingerprint({"data": data_fp, "prep": prep_config})
+
+
+def load_split_matrices(key: str, path=None):
+    """Return the cached dict of arrays for `key`, or None."""
+    file = _matrix_path(key, path)
+    if not os.path.exists(file):
+        return None
+    with np.load(file, allow_pickle=False) as f:
+        return {k: f[k] for k in f.files}
+
+
+def save_split_matrices(key: str, arrays: dict, path=None):
+    file = _matrix_path(key, path)
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    tmp = file + ".tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, file)
+    return file
+
+
+# =============================================================
+# 🗂️ Materialized training matrix: contiguous float32 X + target + time index
+#    as .npy files, memory-mapped read-only so processes share the page cache
+# =============================================================
+def _matrix_dir(key: str, path=None):
+    return os.path.join(path or os.path.join(BASE_DIR, TRAIN_CACHE_PATH), f"matrix_{key}")
+
+
+def _times(df: pd.DataFrame):
+    return pd.to_datetime(df["datetime_str"] if "datetime_str" in df.columns else df["datetime"])
+
+
+def training_matrix_key(df: pd.DataFrame, features, target="aqi", times=None):
+    """Data fingerprint (over time + features + target) and the matrix key derived from it."""
+    # Hash parsed timestamps (int64) rather than datetime strings: same identity, far cheaper
+    frame = df[list(features) + [target]].assign(datetime=(_times(df) if times is None else times).to_numpy())
+    data_fp = data_fingerprint(frame)
+    return data_fp, config_fingerprint({"data": data_fp, "features": list(features), "target": target})
+
+
+def materialize_matrix(df: pd.DataFrame, features, target="aqi", path=None, keep=TRAIN_MATRIX_KEEP):
+    """
+    Parse time, sort, keep `features` (leakage columns never make it in) and write
+    X.npy (float32, C-contiguous), y.npy, time.npy + meta.json. Returns the key.
+    """
+    times = _times(df)
+    data_fp, key = training_matrix_key(df, features, target, times)
+    out = _matrix_dir(key, path)
+    if os.path.exists(os.path.join(out, "meta.json")):
+        return key
+
+    order = np.argsort(times.to_numpy(), kind="stable")
+    arrays = {
+        "X": np.ascontiguousarray(df[list(features)].to_numpy(dtype=np.float32)[order]),
+        "y": df[target].to_numpy(dtype=np.float64)[order],
+        "time": times.to_numpy().astype("datetime64[s]")[order],
+    }
+
+    # Write next to the final directory, then swap it in (readers never see a partial matrix)
+    tmp = f"{out}.tmp{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+    for name, arr in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), arr)
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"key": key, "data_fingerprint": data_fp, "features": list(features),
+                   "target": target, "rows": len(order)}, f)
+    try:
+        os.replace(tmp, out)
+    except OSError:                        # another process materialized it first
+        shutil.rmtree(tmp, ignore_errors=True)
+    _prune_matrices(path, keep)
+    return key
+
+
+def open_matrix(key: str, path=None):
+    """Read-only memory maps of a materialized matrix (zero-copy), or None if absent."""
+    folder = _matrix_dir(key, path)
+    meta_file = os.path.join(folder, "meta.json")
+    if not os.path.exists(meta_file):
+        return None
+    with open(meta_file) as f:
+        matrix = json.load(f)
+    for name in ("X", "y", "time"):
+        matrix[name] = np.load(os.path.join(folder, f"{name}.npy"), mmap_mode="r")
+    os.utime(meta_file)                    # recently used matrices survive pruning
+    return matrix
+
+
+def training_matrix(df: pd.DataFrame, features, target="aqi", path=None):
+    """Open the matrix for this data + feature list, materializing it on first use."""
+    return open_matrix(materialize_matrix(df, features, target, path), path)
+
+
+def matrix_frame(matrix) -> pd.DataFrame:
+    """datetime + features + target as a DataFrame over the mapped arrays (no feature copy)."""
+    frame = pd.DataFrame(matrix["X"], columns=matrix["features"], copy=False)
+    frame.insert(0, "datetime", pd.to_datetime(np.asarray(matrix["time"])))
+    frame[matrix["target"]] = np.asarray(matrix["y"])
+    return frame
+
+
+def matrix_fold(key: str, train_end: int, test_end: int, path=None):
+    """(X_train, y_train, X_test, y_test) row-range views of a matrix, for CV / backtest workers."""
+    m = open_matrix(key, path)
+    return m["X"][:train_end], m["y"][:train_end], m["X"][train_end:test_end], m["y"][train_end:test_end]
+
+
+def _prune_matrices(path=None, keep=TRAIN_MATRIX_KEEP):
+    root = path or os.path.join(BASE_DIR, TRAIN_CACHE_PATH)
+    folders = [os.path.join(root, d) for d in os.listdir(root)
+               if d.startswith("matrix_") and os.path.exists(os.path.join(root, d, "meta.json"))]
+    folders.sort(key=lambda d: os.path.getmtime(os.path.join(d, "meta.json")), reverse=True)
+    for old in folders[keep:]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def _fold_rmse(args):
+    """Backtest worker: fit Ridge on one expanding-window fold of the shared matrix."""
+    from sklearn.linear_model import Ridge
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    key, train_end, test_end, path = args
+    X_train, y_train, X_test, y_test = matrix_fold(key, train_end, test_end, path)
+    preds = make_pipeline(StandardScaler(), Ridge(alpha=1.0)).fit(X_train, y_train).predict(X_test)
+    return float(np.sqrt(np.mean((preds - y_test) ** 2)))
+
+
+# --- Run standalone: build once, reopen zero-copy, share across backtest processes ---
+if __name__ == "__main__":
+    import tempfile
+    import time
+    from multiprocessing import Pool
+
+    try:
+        from src.process_features import MODEL_FEATURES
+    except Exception:
+        from process_features import MODEL_FEATURES
+
+    raw = pd.read_csv(os.path.join(BASE_DIR, "data/final/final_selected_features.csv"))
+    raw = raw.rename(columns={"datetime": "datetime_str"}).sample(frac=1.0, random_state=0)  # store order
+    raw = pd.concat([raw] * 20, ignore_index=True)
+    raw["datetime_str"] = (pd.to_datetime(raw["datetime_str"])
+                           + pd.to_timedelta(np.repeat(np.arange(20), len(raw) // 20) * 700, unit="D")).astype(str)
+    features = [c for c in MODEL_FEATURES if c in raw.columns]
+
+    def prepare(df):
+        # What train_model.py / predict_evaluate.py did on every run
+        df = df.copy()
+        df["datetime"] = pd.to_datetime(df["datetime_str"])
+        df = df.drop(columns=["datetime_str"]).sort_values("datetime").reset_index(drop=True)
+        return df[features].to_numpy(dtype=float), df["aqi"].to_numpy(dtype=float)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        X_ref, y_ref = prepare(raw)
+        prepare_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        key = materialize_matrix(raw, features, path=tmp)
+        build_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        _, same_key = training_matrix_key(raw, features)
+        key_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        matrix = open_matrix(same_key, path=tmp)
+        open_s = time.perf_counter() - t0
+
+        assert matrix["X"].dtype == np.float32 and matrix["X"].flags["C_CONTIGUOUS"]
+        assert np.array_equal(matrix["X"], X_ref.astype(np.float32)) and np.array_equal(matrix["y"], y_ref)
+        assert training_matrix_key(raw.sample(frac=1.0, random_state=1), features)[1] == key  # row order ignored
+
+        n = matrix["rows"]
+        folds = [(key, int(n * f), int(n * (f + 0.1)), tmp) for f in (0.5, 0.6, 0.7, 0.8)]
+        with Pool(2) as pool:
+            shared = pool.map(_fold_rmse, folds)
+        assert np.allclose(shared, [_fold_rmse(f) for f in folds])
+
+    print(f"📦 {n:,} rows × {len(features)} features ({matrix['X'].nbytes / 2**20:.1f} MB float32)")
+    print(f"⏱️ parse + sort + convert every run: {prepare_s * 1000:.0f} ms | "
+          f"materialize once: {build_s * 1000:.0f} ms | "
+          f"fingerprint {key_s * 1000:.0f} ms + open memory-mapped {open_s * 1000:.2f} ms")
+    print(f"🧪 Backtest folds in 2 worker processes over the shared mapping: RMSE {np.round(shared, 2).tolist()}")
+    print("✅ Memory-mapped matrix matches the per-run preparation")
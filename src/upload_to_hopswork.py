@@ -6,12 +6,34 @@ from dotenv import load_dotenv
 from datetime import datetime
 
 try:
-    from src.config import SAVE_LOCAL
+    from src.config import SAVE_LOCAL, LOCATION
+    from src.online_store import write_online_features
+    from src.feature_dataset import append_to_dataset
+    from src.rollups import update_rollups
+    from src.downsample import update_series
+    from src.drift_monitor import monitor_batch
 except Exception:
-    from config import SAVE_LOCAL
+    from config import SAVE_LOCAL, LOCATION
+    from online_store import write_online_features
+    from feature_dataset import append_to_dataset
+    from rollups import update_rollups
+    from downsample import update_series
+    from drift_monitor import monitor_batch
 
 
-def upload_to_hopsworks(df: pd.DataFrame = None):
+FEATURE_GROUP_VERSION = 2
+
+
+def feature_group_name(location: str = LOCATION) -> str:
+    """
+    aqi_features is keyed on datetime_str alone → one group per location:
+    the default location keeps 'aqi_features' (what training / prediction read),
+    any other location gets 'aqi_features_<location>' so hours never overwrite each other.
+    """
+    return "aqi_features" if location == LOCATION else f"aqi_features_{location}"
+
+
+def upload_to_hopsworks(df: pd.DataFrame = None, location: str = LOCATION):
     """
     Upload final processed feature DataFrame to Hopsworks Feature Store.
     If df is not provided, it loads the latest 'final_selected_features.csv'.
@@ -62,16 +84,15 @@ def upload_to_hopsworks(df: pd.DataFrame = None):
         if col in df.columns:
             df[col] = df[col].astype(np.int64)
 
-    # 7. Define Feature Group metadata
-    FEATURE_GROUP_NAME = "aqi_features"
-    FEATURE_GROUP_VERSION = 2
+    # 7. Define Feature Group metadata (one group per location)
+    FEATURE_GROUP_NAME = feature_group_name(location)
 
     # 8. Get or create Feature Group
     fg = fs.get_or_create_feature_group(
         name=FEATURE_GROUP_NAME,
         version=FEATURE_GROUP_VERSION,
         primary_key=["datetime_str"],
-        description="Karachi AQI selected features (daily ingestion)",
+        description=f"{location.title()} AQI selected features (daily ingestion)",
         online_enabled=True
     )
 
@@ -80,13 +101,41 @@ def upload_to_hopsworks(df: pd.DataFrame = None):
     fg.insert(df, write_options={"wait_for_job": True})
     print(f"✅ Successfully uploaded {len(df)} rows to Feature Group → '{FEATURE_GROUP_NAME}_v{FEATURE_GROUP_VERSION}'")
 
-    # 10. local snapshot
+    # 10. Mirror latest hours into the local online store (point lookups)
+    try:
+        write_online_features(df, location)
+    except Exception as e:
+        print(f"⚠️ Could not update online store: {e}")
+
+    # 10b. Fold the new hours into the hour / day / month / year AQI rollups
+    try:
+        update_rollups(df, location)
+    except Exception as e:
+        print(f"⚠️ Could not update rollups: {e}")
+
+    # 10c. Update the 'actual' chart pyramid (only tail buckets are rebuilt)
+    try:
+        update_series("actual", df["datetime_str"], df["aqi"], location)
+    except Exception as e:
+        print(f"⚠️ Could not update actual pyramid: {e}")
+
+    # 10d. Fold the batch into the drift window and report per-feature PSI / KS
+    try:
+        monitor_batch(df, location)
+    except Exception as e:
+        print(f"⚠️ Could not update drift monitor: {e}")
+
+    # 11. local snapshot
     if SAVE_LOCAL:
         BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         out_path = os.path.join(BASE_DIR, "data", "final", "uploaded_snapshot.csv")
         os.makedirs(os.path.dirname(out_path), exist_ok=True)
         df.to_csv(out_path, index=False)
         print(f"💾 Snapshot saved locally → {out_path}")
+
+        # Append to the chunked on-disk dataset used by out-of-core training
+        part_path = append_to_dataset(df)
+        print(f"💾 Appended to feature dataset → {part_path}")
     else:
         print("⚙️ Skipping local snapshot save (cloud mode).")
 
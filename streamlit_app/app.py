@@ -1,12 +1,14 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import hopsworks
 import os
-from joblib import load
+import sys
 from datetime import timedelta
-from dotenv import load_dotenv
-import matplotlib.pyplot as plt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from config import APP_FAST_START
+from serving_snapshot import get_snapshot_manager
+from utils import refresh_local_snapshot, load_model
 
 # PAGE CONFIG 
 st.set_page_config(
@@ -62,17 +64,38 @@ st.markdown("""
 st.markdown("<h1 class='main-title'>🌆 Karachi AQI Prediction Dashboard</h1>", unsafe_allow_html=True)
 st.markdown("<p class='subtitle'>Real-time and 3-day Air Quality predictions powered by ML & Hopsworks Feature Store.</p>", unsafe_allow_html=True)
 
-# CONNECT TO HOPSWORKS
-load_dotenv()
-api_key = os.getenv("HOPSWORKS_API_KEY")
-
-try:
-    project = hopsworks.login(api_key_value=api_key)
-    fs = project.get_feature_store()
-    fg = fs.get_feature_group("aqi_features", version=2)
-    df = fg.read()
-    st.success("✅ Connected to Hopsworks and fetched latest data.")
-except Exception as e:
+# SHARED SNAPSHOT: one process-wide copy of features + forecast + model for all sessions,
+# refreshed in the background (Hopsworks → local online store → snapshot swap).
+# The model is only needed when there is no issued forecast to serve → loaded on demand
+manager = get_snapshot_manager(remote_refresh=refresh_local_snapshot)
+manager.with_model = False
+
+if manager.current() is None or not APP_FAST_START:
+    if not APP_FAST_START:
+        try:
+            refresh_local_snapshot()
+        except Exception as e:
+            st.error(f"⚠ Could not refresh data from Hopsworks: {e}")
+    manager.refresh(force=not APP_FAST_START)
+
+    if manager.current() is None or manager.current().features.empty:
+        # First start on this machine → nothing local yet, fetch once (blocking)
+        with st.spinner("Fetching latest data from Hopsworks..."):
+            try:
+                refresh_local_snapshot()
+                manager.refresh(force=True)
+            except Exception:
+                pass
+
+if APP_FAST_START:
+    manager.start()
+
+snapshot = manager.current()
+
+if snapshot is not None and not snapshot.features.empty:
+    df = snapshot.features.copy()
+    st.success("✅ Loaded latest features from the shared local snapshot.")
+else:
     st.error("⚠ Could not fetch data from Hopsworks. Using local fallback.")
     df = pd.read_csv("../data/final/final_selected_features.csv")
 
@@ -81,27 +104,64 @@ if "datetime_str" in df.columns:
     df["datetime"] = pd.to_datetime(df["datetime_str"])
     df.drop(columns=["datetime_str"], inplace=True)
 
+df["datetime"] = pd.to_datetime(df["datetime"])
 df = df.sort_values("datetime").reset_index(drop=True)
 
-# Drop leakage features
-leakage_features = ["aqi_rolling_24h", "aqi_lag_1h", "high_pollution_flag"]
-df.drop(columns=[col for col in leakage_features if col in df.columns], inplace=True, errors="ignore")
+# LATEST ISSUED FORECAST (from the shared snapshot, written by predict_evaluate.py)
+forecast = snapshot.forecast if snapshot is not None else None
+forecast_meta = snapshot.forecast_meta if snapshot is not None else None
+
+if forecast is not None:
+    today_aqi = float(forecast["predicted_AQI"].iloc[0])  # horizon 0 = current hour
+    band_cols = [c for c in ("lower_AQI", "upper_AQI") if c in forecast.columns]
+    future_results = forecast.loc[forecast["horizon"] >= 1, ["datetime", "predicted_AQI"] + band_cols].reset_index(drop=True)
+    st.success(f"✅ Serving forecast issued {forecast_meta['issue_time']} (model {forecast_meta['model_version']}).")
+else:
+    # No stored forecast yet → predict on the fly
+    try:
+        if snapshot is not None and snapshot.model is not None:
+            model, metadata = snapshot.model, snapshot.model_metadata
+        else:
+            model, metadata = load_model()
+        st.success(f"✅ Loaded latest trained {metadata['model_name']} model.")
+    except Exception as e:
+        st.error(f"⚠ Could not load model: {e}")
+        st.stop()
+
+    # Define features (exactly the columns the model was trained on)
+    X = df[metadata["features"]]
 
-# Define features
-X = df.drop(columns=["aqi", "datetime"], errors="ignore")
+    # CURRENT AQI
+    today_data = X.iloc[-1:]
+    today_aqi = model.predict(today_data)[0]
 
-# LOAD TRAINED MODEL
-try:
-    model_path = os.path.join(os.path.dirname(__file__), "../models/best_model_random_forest.pkl")
-    model = load(model_path)
-    st.success("✅ Loaded latest trained Random Forest model.")
-except Exception as e:
-    st.error(f"⚠ Could not load model: {e}")
-    st.stop()
+    # FUTURE PREDICTIONS
+    last_date = df["datetime"].max()
+    future_dates = [last_date + timedelta(hours=i) for i in range(1, 73)]
+    base_features = X.iloc[-1].copy()
 
-# CURRENT AQI
-today_data = X.iloc[-1:]
-today_aqi = model.predict(today_data)[0]
+    # ±5% random variation
+    vary_cols = [
+        "pm10", "pm2_5", "carbon_monoxide", "nitrogen_dioxide",
+        "ozone", "sulphur_dioxide", "temperature_2m",
+        "relative_humidity_2m", "wind_speed_10m"
+    ]
+
+    future_data = pd.DataFrame([base_features for _ in range(72)])
+    for col in vary_cols:
+        if col in future_data.columns:
+            noise = np.random.normal(0, 0.05, size=72)
+            future_data[col] = future_data[col] * (1 + noise)
+
+    future_data["datetime"] = future_dates
+    from prediction_intervals import predict_with_intervals
+    future_band = predict_with_intervals(
+        model, metadata, future_data.drop(columns=["datetime"], errors="ignore")
+    ).reset_index(drop=True)
+
+    future_results = pd.concat([pd.DataFrame({"datetime": future_dates}), future_band], axis=1)
+
+future_results["date"] = future_results["datetime"].dt.date
 
 st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
 st.subheader("🌤 Current AQI Prediction")
@@ -136,39 +196,16 @@ st.markdown(
 # FUTURE PREDICTIONS
 st.subheader("📅 AQI Forecast for Next 3 Days")
 
-last_date = df["datetime"].max()
-future_dates = [last_date + timedelta(hours=i) for i in range(1, 73)]
-base_features = X.iloc[-1].copy()
-
-# ±5% random variation
-vary_cols = [
-    "pm10", "pm2_5", "carbon_monoxide", "nitrogen_dioxide",
-    "ozone", "sulphur_dioxide", "temperature_2m",
-    "relative_humidity_2m", "wind_speed_10m"
-]
-
-future_data = pd.DataFrame([base_features for _ in range(72)])
-for col in vary_cols:
-    if col in future_data.columns:
-        noise = np.random.normal(0, 0.05, size=72)
-        future_data[col] = future_data[col] * (1 + noise)
-
-future_data["datetime"] = future_dates
-future_preds = model.predict(future_data.drop(columns=["datetime"], errors="ignore"))
-
-future_results = pd.DataFrame({
-    "datetime": future_dates,
-    "predicted_AQI": future_preds
-})
-future_results["date"] = future_results["datetime"].dt.date
-
 # VISUALS 
 col1, col2 = st.columns(2)
 
 with col1:
     st.markdown("<div class='chart-card'>", unsafe_allow_html=True)
     st.write("📈 **Hourly AQI Trend (Next 3 Days)**")
-    st.line_chart(future_results.set_index("datetime")["predicted_AQI"], use_container_width=True)
+    # Show the prediction interval around the point forecast when the forecast carries one
+    trend_cols = [c for c in ("lower_AQI", "predicted_AQI", "upper_AQI")
+                  if c in future_results.columns and future_results[c].notna().all()]
+    st.line_chart(future_results.set_index("datetime")[trend_cols], use_container_width=True)
     st.markdown("</div>", unsafe_allow_html=True)
 
 with col2:
@@ -187,13 +224,124 @@ st.markdown("---")
 avg_aqi_today = df.tail(24)["aqi"].mean() if "aqi" in df.columns else None
 avg_pred_aqi_next = future_results.head(24)["predicted_AQI"].mean()
 
+# Trend threshold: the forecast's own uncertainty (mean half-width of the next-24h
+# interval) when available, otherwise the fixed ±5 AQI
+margin = 5
+if {"lower_AQI", "upper_AQI"} <= set(future_results.columns):
+    next_24h = future_results.head(24)
+    half_width = ((next_24h["upper_AQI"] - next_24h["lower_AQI"]) / 2).mean()
+    if pd.notna(half_width):
+        margin = half_width
+
 if avg_aqi_today and avg_pred_aqi_next:
-    if avg_pred_aqi_next > avg_aqi_today + 5:
+    if avg_pred_aqi_next > avg_aqi_today + margin:
         st.warning("🚨 Air quality expected to worsen slightly in the next 24 hours.")
-    elif avg_pred_aqi_next < avg_aqi_today - 5:
+    elif avg_pred_aqi_next < avg_aqi_today - margin:
         st.info("🌿 Air quality expected to improve slightly in the next 24 hours.")
     else:
         st.success("✅ Air quality expected to remain stable in the next 24 hours.")
 
-# FOOTER 
+# WHY THIS AQI? (attributions stored with the issued forecast by predict_evaluate.py)
+from attributions import load_attributions, top_contributors
+
+attributions = (load_attributions(forecast_meta["issue_time"], forecast_meta["model_version"])
+                if forecast_meta is not None else None)
+if attributions is not None:
+    st.markdown("---")
+    st.subheader("🔍 Why This AQI?")
+    explain_horizon = st.slider("Hours ahead", 0, int(attributions["horizon"].max()), 0)
+    explained = attributions.loc[attributions["horizon"] == explain_horizon].iloc[0]
+    top = top_contributors(attributions, horizon=explain_horizon)
+    st.caption(f"{explained['target_time']} · predicted AQI {explained['predicted_aqi']:.1f} = "
+               f"typical {explained['base_value']:.1f} + feature contributions (top {len(top)} shown)")
+    st.bar_chart(top.set_index("feature")["contribution"], horizontal=True)
+
+# NEIGHBOURHOOD GRID (written by src/aqi_grid.py)
+from aqi_grid import load_grid, grid_frame
+
+grid = load_grid()
+if grid is not None:
+    st.markdown("---")
+    st.subheader("🗺️ Neighbourhood AQI Grid")
+    hour_index = st.slider("Forecast hour", 0, len(grid["times"]) - 1, 0)
+    grid_df = grid_frame(grid, hour_index)
+    grid_df["color"] = [get_aqi_category(v)[1] for v in grid_df["aqi"]]
+    st.caption(f"{grid['times'][hour_index]} · {grid['meta']['points']} points · "
+               f"issued {grid['meta']['issued_at']}")
+    st.map(grid_df, latitude="lat", longitude="lon", color="color", size=250)
+
+# HISTORICAL AQI (materialized rollups written by the feature pipeline)
+from rollups import RollupStore
+from config import ROLLUP_STORE_PATH
+
+rollup_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ROLLUP_STORE_PATH)
+if os.path.exists(rollup_path):
+    st.markdown("---")
+    st.subheader("📆 Historical AQI")
+    rollups = RollupStore(rollup_path)
+    first_hour, last_hour = rollups.bounds() or (pd.Timestamp.now(), pd.Timestamp.now())
+    hist_range = st.date_input("Date range", (max(first_hour, last_hour - timedelta(days=90)).date(),
+                                              last_hour.date()),
+                               min_value=first_hour.date(), max_value=last_hour.date())
+    period = st.radio("Group by", ["Day", "Week", "Month"], horizontal=True)
+    if len(hist_range) == 2:
+        hist_start = pd.Timestamp(hist_range[0])
+        hist_end = pd.Timestamp(hist_range[1]) + timedelta(days=1)
+        summary = rollups.query(hist_start, hist_end)
+        if summary["count"]:
+            h1, h2, h3, h4 = st.columns(4)
+            h1.metric("Mean AQI", f"{summary['mean']:.0f}")
+            h2.metric("Median / P95", f"{summary['p50']:.0f} / {summary['p95']:.0f}")
+            h3.metric("Worst hour", f"{summary['max']:.0f}")
+            h4.metric("Unhealthy+ hours", sum(summary[f"hours_{c}"] for c in
+                                              ["unhealthy", "very_unhealthy", "hazardous"]))
+            hist_series = rollups.series(hist_start, hist_end, period[0])
+            st.line_chart(hist_series.set_index("period_start")[["mean", "p95", "max"]])
+        else:
+            st.info("No historical AQI in the selected range.")
+    rollups.close()
+
+# ACTUAL VS PREDICTED (downsampled pyramids, payload sized to the chart width)
+from downsample import overlay, series_path, latest_time
+
+if os.path.exists(series_path("actual")):
+    st.markdown("---")
+    st.subheader("📈 Actual vs Predicted AQI")
+    span = st.select_slider("Window", ["7 days", "30 days", "90 days", "1 year", "All"], value="All")
+    history_start = None if span == "All" else latest_time() - timedelta(days={
+        "7 days": 7, "30 days": 30, "90 days": 90, "1 year": 365}[span])
+    chart_df = overlay(history_start, width=1200)
+    st.line_chart(chart_df, use_container_width=True)
+    st.caption(f"{len(chart_df):,} points plotted")
+
+# WHAT-IF SCENARIOS (batched: every scenario × 72 hours scored in one model call)
+st.markdown("---")
+st.subheader("🧪 What-if Scenarios")
+if st.checkbox("Explore weather / pollution scenarios"):
+    from scenarios import forecast_window, from_specs, predict_scenarios, scenario_summary
+
+    if snapshot is not None and snapshot.model is not None:
+        model, metadata = snapshot.model, snapshot.model_metadata
+    else:
+        model, metadata = load_model()
+    s1, s2, s3 = st.columns(3)
+    wind_scale = s1.slider("Wind speed ×", 0.25, 3.0, 2.0, 0.25)
+    humidity_pct = s2.slider("Humidity change (%)", -50, 50, -20, 5)
+    pm_pct = s3.slider("PM2.5 / PM10 change (%)", -50, 100, 0, 10)
+
+    window, future = forecast_window(df, metadata["features"])
+    pert = from_specs({
+        "Baseline": {},
+        f"Wind ×{wind_scale:g}": {"wind_speed_10m": ("scale", wind_scale)},
+        f"Humidity {humidity_pct:+d}%": {"relative_humidity_2m": ("pct", humidity_pct)},
+        f"PM {pm_pct:+d}%": {"pm2_5": ("pct", pm_pct), "pm10": ("pct", pm_pct)},
+        "Combined": {"wind_speed_10m": ("scale", wind_scale), "relative_humidity_2m": ("pct", humidity_pct),
+                     "pm2_5": ("pct", pm_pct), "pm10": ("pct", pm_pct)},
+    }, metadata["features"])
+    scenario_preds = predict_scenarios(model, window, pert, metadata["features"])
+    st.line_chart(pd.DataFrame(scenario_preds.T, index=future, columns=pert["params"]["scenario"]))
+    st.dataframe(scenario_summary(scenario_preds, pert, baseline=scenario_preds[0]).round(1),
+                 hide_index=True, use_container_width=True)
+
+# FOOTER
 st.markdown("<p class='footer'>Developed by Mariam Khan | Powered by Hopsworks ✨</p>", unsafe_allow_html=True)
\ No newline at end of file
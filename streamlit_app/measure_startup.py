@@ -0,0 +1,82 @@
+# Purpose: Measure dashboard cold start — time-to-first-render and import-time breakdown.
+# Usage: python streamlit_app/measure_startup.py [--slow]   (--slow → APP_FAST_START=false)
+
+import os
+import sys
+import json
+import subprocess
+from collections import defaultdict
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs in a fresh interpreter so every import is cold.
+# AppTest executes app.py exactly like a browser session's first run / rerun.
+RUNNER = r"""
+import time, json
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=300)
+at.run()
+t1 = time.perf_counter()
+at.run()
+t2 = time.perf_counter()
+print("STARTUP_JSON " + json.dumps({
+    "first_render_s": t1 - t0,
+    "rerun_s": t2 - t1,
+    "exceptions": [str(e.value) for e in at.exception],
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """Sum cumulative import time (µs) per top-level package from `-X importtime` output."""
+    totals = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            cumulative = int(cumulative)
+        except ValueError:
+            continue  # header line
+        # Only outermost imports (no indentation) → no double counting
+        if name.startswith(" ") and not name.startswith("  "):
+            totals[name.strip().split(".")[0]] += cumulative
+    return totals
+
+
+def main():
+    env = dict(os.environ)
+    if "--slow" in sys.argv:
+        env["APP_FAST_START"] = "false"
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", RUNNER],
+        cwd=APP_DIR, env=env, capture_output=True, text=True
+    )
+    result_line = [l for l in proc.stdout.splitlines() if l.startswith("STARTUP_JSON ")]
+    if not result_line:
+        print("❌ App run failed:")
+        print(proc.stdout[-2000:])
+        print(proc.stderr[-2000:])
+        sys.exit(1)
+
+    result = json.loads(result_line[-1][len("STARTUP_JSON "):])
+    imports = parse_importtime(proc.stderr)
+    total_import = sum(imports.values()) / 1e6
+
+    mode = "slow (blocking)" if "--slow" in sys.argv else "fast-start"
+    print(f"\n⏱️ Dashboard startup ({mode})")
+    print(f"Time to first render : {result['first_render_s']:.2f} s")
+    print(f"Rerun (interaction)  : {result['rerun_s']:.2f} s")
+    print(f"Total import time    : {total_import:.2f} s")
+    if result["exceptions"]:
+        print(f"⚠️ App raised: {result['exceptions']}")
+
+    print("\n📦 Import-time breakdown (top 15, cumulative)")
+    for name, us in sorted(imports.items(), key=lambda kv: -kv[1])[:15]:
+        print(f"  {name:<24} {us / 1e3:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
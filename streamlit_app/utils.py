@@ -1,20 +1,44 @@
-import hopsworks
-import pandas as pd
 import os
-from dotenv import load_dotenv
-from joblib import load
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from online_store import OnlineStore
+
+# Heavy SDKs (hopsworks, joblib) are imported inside the functions that need them,
+# so the dashboard can render from local snapshots before they are loaded.
 
-load_dotenv()
 
 def load_feature_data():
+    import hopsworks
+    from dotenv import load_dotenv
+
+    load_dotenv()
     api_key = os.getenv("HOPSWORKS_API_KEY")
     project = hopsworks.login(api_key_value=api_key)
     fs = project.get_feature_store()
-    fg = fs.get_feature_group("aqi_features", version=1)
+    fg = fs.get_feature_group("aqi_features", version=2)
     df = fg.read()
     df["datetime"] = pd.to_datetime(df["datetime_str"])
     return df.sort_values("datetime")
 
+
 def load_model():
-    model_path = os.path.join("models", "best_model_random_forest.pkl")
-    return load(model_path)
\ No newline at end of file
+    from model_artifacts import load_model_artifact
+    return load_model_artifact()
+
+
+def load_local_window(hours=24):
+    """Latest feature rows from the local online store ([] if empty/unavailable)."""
+    try:
+        return OnlineStore().get_window(hours=hours)
+    except Exception:
+        return []
+
+
+def refresh_local_snapshot():
+    """Pull the feature group from Hopsworks and mirror the latest hours locally."""
+    df = load_feature_data()
+    n = OnlineStore().write(df.drop(columns=["datetime"]))
+    print(f"🔄 Local feature snapshot refreshed ({n} rows)")
+    return n